@@ -0,0 +1,135 @@
+"""Cost report lookups against a large cost_log.
+
+Usage:
+    python benchmarks/bench_cost_lookups.py
+    python benchmarks/bench_cost_lookups.py --rows 1000000 --sessions 10000 --lookups 200
+
+Seeds ``--rows`` cost_log rows spread over ``--sessions`` sessions in a
+temporary SQLite database, backfilling the running aggregates with the same
+statements migration 3 uses, then times one session's cost report four ways:
+
+    group by, no index   the report as first written (SUM / GROUP BY over
+                         cost_log, every row loaded), forced to scan the table
+                         the way it did before migration 2's index
+    group by, indexed    the same queries using the (session_id, state,
+                         cost_usd) index
+    get_cost_summary     Database.get_cost_summary over the aggregates
+    get_cost_report      CostTracker.get_cost_report, what /api/cost serves
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from cost_tracker import CostTracker  # noqa: E402
+from database import MIGRATIONS, Database  # noqa: E402
+
+STATES = ["greatness_mirror", "chapter_before", "chapter_after", "sales_page"]
+MODELS = ["anthropic/claude-3-haiku", "meta-llama/llama-3.1-8b-instruct"]
+
+
+def seed(path: str, rows: int, sessions: int):
+    """Fill cost_log and its aggregates directly, in one transaction."""
+    conn = sqlite3.connect(path)
+    start = time.perf_counter()
+    conn.executemany(
+        """INSERT INTO cost_log (session_id, state, prompt_tokens, completion_tokens, cost_usd, model)
+           VALUES (?, ?, ?, ?, ?, ?)""",
+        ((f"session-{i % sessions}", STATES[i % len(STATES)], 900, 400, 0.0006, MODELS[i % len(MODELS)])
+         for i in range(rows))
+    )
+    backfill = next(statements for version, _, statements in MIGRATIONS if version == 3)
+    for statement in backfill:
+        if statement.strip().startswith("INSERT"):
+            conn.execute(statement)
+    conn.commit()
+    conn.close()
+    print(f"Seeded {rows} cost rows over {sessions} sessions in {time.perf_counter() - start:.1f} s")
+
+
+def legacy_cost_report(conn: sqlite3.Connection, session_id: str, indexed: bool) -> dict:
+    """The report as CostTracker built it before the aggregates: three queries, every row loaded."""
+    table = "cost_log" if indexed else "cost_log NOT INDEXED"
+    total = conn.execute(
+        f"SELECT SUM(cost_usd) FROM {table} WHERE session_id = ?", (session_id,)
+    ).fetchone()[0] or 0.0
+    by_state = dict(conn.execute(
+        f"SELECT state, SUM(cost_usd) FROM {table} WHERE session_id = ? GROUP BY state", (session_id,)
+    ).fetchall())
+    log = conn.execute(
+        f"""SELECT state, prompt_tokens, completion_tokens, cost_usd, model
+            FROM {table} WHERE session_id = ? ORDER BY timestamp""",
+        (session_id,)
+    ).fetchall()
+
+    by_model = {}
+    for _, _, _, cost, model in log:
+        by_model[model] = by_model.get(model, 0.0) + cost
+    prompt_tokens = sum(row[1] for row in log)
+    completion_tokens = sum(row[2] for row in log)
+    return {
+        "total_cost_usd": total,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "cost_by_state": by_state,
+        "cost_by_model": by_model,
+        "num_api_calls": len(log)
+    }
+
+
+async def timed(name: str, lookup: Callable[[str], Awaitable], session_ids: List[str]):
+    latencies = []
+    for session_id in session_ids:
+        start = time.perf_counter()
+        await lookup(session_id)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+    print(f"{name:<20} {len(latencies):>8} {p50:>10.3f} ms {p99:>10.3f} ms")
+
+
+async def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "game.db")
+        Database(path).close()
+        seed(path, args.rows, args.sessions)
+
+        rng = random.Random(0)
+        session_ids = [f"session-{rng.randrange(args.sessions)}" for _ in range(args.lookups)]
+        conn = sqlite3.connect(path)
+
+        async def scan(session_id):
+            return legacy_cost_report(conn, session_id, indexed=False)
+
+        async def indexed(session_id):
+            return legacy_cost_report(conn, session_id, indexed=True)
+
+        print(f"{'lookup':<20} {'calls':>8} {'p50':>13} {'p99':>13}")
+        # A full scan per query is slow; a few samples are enough to see it
+        await timed("group by, no index", scan, session_ids[:max(1, args.lookups // 20)])
+        await timed("group by, indexed", indexed, session_ids)
+        conn.close()
+
+        db = Database(path)
+        await db.connect()
+        try:
+            await timed("get_cost_summary", db.get_cost_summary, session_ids)
+            await timed("get_cost_report", CostTracker(db).get_cost_report, session_ids)
+        finally:
+            await db.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark cost report lookups against a large cost_log")
+    parser.add_argument("--rows", type=int, default=1000000, help="cost_log rows to seed (default 1000000)")
+    parser.add_argument("--sessions", type=int, default=10000, help="sessions the rows belong to (default 10000)")
+    parser.add_argument("--lookups", type=int, default=200, help="reports timed per path (default 200)")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,106 @@
+"""Latency and allocation of one session's cost report.
+
+Usage:
+    python benchmarks/bench_cost_report.py
+    python benchmarks/bench_cost_report.py --rows 5000 --repeat 200
+
+Logs ``--rows`` cost entries for one session in a temporary SQLite
+database, then builds its cost report two ways:
+
+    per-row    as CostTracker.get_cost_report did before the single-query
+               summary: total and by-state queries, then every cost_log row
+               loaded as a CostEntry and re-aggregated in Python
+    summary    CostTracker.get_cost_report as shipped (one query over the
+               running aggregates)
+
+Latency is the median of ``--repeat`` runs with tracing off; allocation is
+tracemalloc's peak over one run (it sees the DB thread too).
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from cost_tracker import CostTracker  # noqa: E402
+from database import Database  # noqa: E402
+from models import CostEntry  # noqa: E402
+
+STATES = ["greatness_mirror", "chapter_before", "chapter_after", "sales_page"]
+MODELS = ["anthropic/claude-3-haiku", "meta-llama/llama-3.1-8b-instruct"]
+SESSION_ID = "bench-session"
+
+
+async def per_row_report(db: Database, session_id: str) -> dict:
+    """The report as CostTracker built it before ``get_cost_summary``."""
+    total = await db.get_total_cost(session_id)
+    breakdown = await db.get_cost_by_state(session_id)
+    log = await db.get_cost_log(session_id)
+
+    prompt_tokens = sum(entry.prompt_tokens for entry in log)
+    completion_tokens = sum(entry.completion_tokens for entry in log)
+    model_costs = {}
+    for entry in log:
+        model_costs[entry.model] = model_costs.get(entry.model, 0.0) + entry.cost_usd
+
+    return {
+        "session_id": session_id,
+        "total_cost_usd": total,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "cost_by_state": breakdown,
+        "cost_by_model": model_costs,
+        "num_api_calls": len(log),
+        "average_cost_per_call": total / len(log) if log else 0.0
+    }
+
+
+async def measure(name: str, report, repeat: int):
+    await report(SESSION_ID)  # warm the statement cache
+
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await report(SESSION_ID)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+
+    tracemalloc.start()
+    await report(SESSION_ID)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{name:<10} {latencies[len(latencies) // 2] * 1000:>10.3f} ms {peak / 1024:>10.1f} KiB")
+
+
+async def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "game.db"))
+        await db.connect()
+        try:
+            await db.create_session(SESSION_ID, "chapter_before", {})
+            async with db.unit_of_work(SESSION_ID) as uow:
+                for i in range(args.rows):
+                    uow.add_cost(CostEntry(STATES[i % len(STATES)], 900, 400, 0.0006,
+                                           MODELS[i % len(MODELS)], None))
+
+            tracker = CostTracker(db)
+            print(f"1 session, {args.rows} cost rows, median of {args.repeat}")
+            print(f"{'report':<10} {'latency':>13} {'peak':>14}")
+            await measure("per-row", lambda session_id: per_row_report(db, session_id), args.repeat)
+            await measure("summary", tracker.get_cost_report, args.repeat)
+        finally:
+            await db.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark one session's cost report")
+    parser.add_argument("--rows", type=int, default=5000, help="cost rows in the session (default 5000)")
+    parser.add_argument("--repeat", type=int, default=200, help="timed runs per report (default 200)")
+    asyncio.run(main(parser.parse_args()))
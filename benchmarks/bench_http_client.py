@@ -0,0 +1,145 @@
+"""Upstream call overhead: a new httpx client per call vs the shared pooled client.
+
+Usage:
+    python benchmarks/bench_http_client.py
+    python benchmarks/bench_http_client.py --calls 200 --concurrency 50
+    python benchmarks/bench_http_client.py --plain
+
+Starts a mock OpenRouter (uvicorn on 127.0.0.1, answering every
+/chat/completions with a fixed completion) in a background thread, over TLS
+with a throwaway self-signed certificate made by the openssl CLI (--plain
+for cleartext HTTP), then makes the same completion requests two ways:
+
+    per call   a new httpx.AsyncClient for each request, as OpenRouterClient
+               did before it kept one (a TCP + TLS handshake every time)
+    shared     OpenRouterClient's long-lived client (keep-alive pool, HTTP/2
+               when the server offers it; uvicorn speaks HTTP/1.1)
+
+For each it reports the mean latency of ``--calls`` sequential requests,
+the wall time of ``--concurrency`` requests at once, and how many
+connections the server saw. A real upstream adds network round trips to
+every handshake, so the gap only grows against openrouter.ai.
+
+Each new client also loads its CA bundle: the one-certificate bundle over
+TLS here, but certifi's full bundle with --plain, which is why a per-call
+client costs more in cleartext than over local TLS.
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Set, Tuple
+
+import httpx
+import uvicorn
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from openrouter import OpenRouterClient  # noqa: E402
+
+COMPLETION = (
+    b'{"choices": [{"message": {"content": "A short narrative."}}],'
+    b' "usage": {"prompt_tokens": 900, "completion_tokens": 400, "total_tokens": 1300}}'
+)
+PAYLOAD = {
+    "model": "anthropic/claude-3-haiku",
+    "messages": [{"role": "user", "content": "Write a short narrative."}],
+    "temperature": 0.7,
+    "max_tokens": 500
+}
+
+
+class MockUpstream:
+    """ASGI app that answers every request with COMPLETION and records client sockets."""
+
+    def __init__(self):
+        self.connections: Set[Tuple[str, int]] = set()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+        self.connections.add(tuple(scope["client"]))
+        while (await receive()).get("more_body"):
+            pass
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": COMPLETION})
+
+
+def make_certificate(directory: str) -> Tuple[str, str]:
+    cert, key = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1",
+         "-keyout", key, "-out", cert],
+        check=True, capture_output=True
+    )
+    return cert, key
+
+
+def start_server(app: MockUpstream, certificate) -> Tuple[uvicorn.Server, str]:
+    ssl = {"ssl_certfile": certificate[0], "ssl_keyfile": certificate[1]} if certificate else {}
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning", **ssl))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    return server, f"{'https' if certificate else 'http'}://127.0.0.1:{port}"
+
+
+async def bench(name: str, call, app: MockUpstream, calls: int, concurrency: int):
+    app.connections.clear()
+    start = time.perf_counter()
+    for _ in range(calls):
+        await call()
+    sequential = (time.perf_counter() - start) / calls
+
+    start = time.perf_counter()
+    await asyncio.gather(*(call() for _ in range(concurrency)))
+    burst = time.perf_counter() - start
+
+    print(f"{name:<10} {sequential * 1000:>10.2f} ms {burst * 1000:>12.1f} ms {len(app.connections):>12}")
+
+
+async def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        certificate = None if args.plain else make_certificate(tmp)
+        if certificate:
+            # Both clients trust the throwaway certificate through the environment
+            os.environ["SSL_CERT_FILE"] = certificate[0]
+        app = MockUpstream()
+        server, base_url = start_server(app, certificate)
+        os.environ["OPENROUTER_BASE_URL"] = base_url
+        openrouter = OpenRouterClient(api_key="bench")
+
+        async def per_call():
+            async with httpx.AsyncClient(timeout=90.0) as client:
+                response = await client.post(f"{base_url}/chat/completions", json=PAYLOAD,
+                                             headers={"Authorization": "Bearer bench"})
+                response.raise_for_status()
+                return response.json()
+
+        async def shared():
+            return await openrouter._post_completion(PAYLOAD)
+
+        try:
+            print(f"{base_url}, {args.calls} sequential calls, {args.concurrency} concurrent")
+            print(f"{'client':<10} {'sequential':>13} {'concurrent':>15} {'connections':>12}")
+            await bench("per call", per_call, app, args.calls, args.concurrency)
+            await bench("shared", shared, app, args.calls, args.concurrency)
+        finally:
+            await openrouter.aclose()
+            server.should_exit = True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark per-call vs shared httpx clients")
+    parser.add_argument("--calls", type=int, default=100, help="sequential calls per client (default 100)")
+    parser.add_argument("--concurrency", type=int, default=50, help="calls in the concurrent burst (default 50)")
+    parser.add_argument("--plain", action="store_true", help="use cleartext HTTP instead of TLS")
+    asyncio.run(main(parser.parse_args()))
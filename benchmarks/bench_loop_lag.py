@@ -0,0 +1,113 @@
+"""Event-loop lag with many sessions hitting SQLite at once.
+
+Usage:
+    python benchmarks/bench_loop_lag.py
+    python benchmarks/bench_loop_lag.py --sessions 200 --steps 10
+    DB_SYNCHRONOUS=FULL python benchmarks/bench_loop_lag.py
+
+Each session creates itself, then runs ``--steps`` transitions shaped like
+a chapter (a unit of work with 2 cost rows, a timeline event and a session
+update, then the cost report and timeline reads), sleeping
+``--llm-latency`` seconds between them the way it would await the LLM. A
+probe sleeps 5 ms in a loop and records how late it wakes: the event-loop
+lag every other request would see.
+
+It runs twice over a fresh database: "inline" runs the same sqlite3 calls
+on the event loop thread, as the app did before the DB thread; "db thread"
+is ``Database`` as shipped.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import Executor, Future
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database import Database  # noqa: E402
+from models import CostEntry, TimelineEvent  # noqa: E402
+
+PROBE_INTERVAL = 0.005
+TEXT = "x" * 2048
+
+
+class InlineExecutor(Executor):
+    """Runs submitted work immediately on the calling thread."""
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+
+async def run_session(db: Database, steps: int, llm_latency: float):
+    session_id = str(uuid.uuid4())
+    await db.create_session(session_id, "chapter_before", {"current_chapter": 1})
+    for step in range(steps):
+        await asyncio.sleep(llm_latency)
+        async with db.unit_of_work(session_id) as uow:
+            uow.add_cost(CostEntry("chapter_after", 900, 400, 0.0006, "anthropic/claude-3-haiku", None))
+            uow.add_cost(CostEntry("chapter_after", 700, 200, 0.0004, "anthropic/claude-3-haiku", None))
+            uow.add_timeline_event(TimelineEvent(chapter=step % 8 + 1, narrative=TEXT, transformation=None))
+            delta = {"after_narrative": TEXT, "step": step}
+            uow.update_session("chapter_after", {**uow.session.data, **delta}, delta=delta)
+        await db.get_cost_summary(session_id)
+        await db.get_timeline(session_id)
+
+
+async def probe(lags: List[float], stop: asyncio.Event):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(time.perf_counter() - start - PROBE_INTERVAL)
+
+
+async def bench(name: str, inline: bool, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "game.db"))
+        if inline:
+            # Reopen the connection on the loop thread and run every call there
+            db._executor.submit(db._close_conn).result()
+            db._executor.shutdown()
+            db._executor = InlineExecutor()
+        await db.connect()
+
+        lags: List[float] = []
+        stop = asyncio.Event()
+        prober = asyncio.create_task(probe(lags, stop))
+        start = time.perf_counter()
+        await asyncio.gather(*(run_session(db, args.steps, args.llm_latency) for _ in range(args.sessions)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await prober
+        await db.aclose()
+
+    lags.sort()
+    p50 = lags[len(lags) // 2] * 1000
+    p99 = lags[min(len(lags) - 1, int(len(lags) * 0.99))] * 1000
+    print(f"{name:<12} {p50:>9.2f} ms {p99:>9.2f} ms {lags[-1] * 1000:>9.2f} ms {elapsed:>8.2f} s")
+
+
+async def main(args):
+    print(f"{args.sessions} sessions x {args.steps} steps, "
+          f"synchronous={os.getenv('DB_SYNCHRONOUS', 'NORMAL')}")
+    print(f"{'sqlite':<12} {'lag p50':>12} {'lag p99':>12} {'lag max':>12} {'wall':>10}")
+    await bench("inline", True, args)
+    await bench("db thread", False, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark event-loop lag under concurrent sessions")
+    parser.add_argument("--sessions", type=int, default=200, help="concurrent sessions (default 200)")
+    parser.add_argument("--steps", type=int, default=10, help="transitions per session (default 10)")
+    parser.add_argument("--llm-latency", type=float, default=0.05,
+                        help="seconds each transition waits as if on the LLM (default 0.05)")
+    asyncio.run(main(parser.parse_args()))
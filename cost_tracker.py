@@ -1,28 +1,37 @@
 """Cost tracking for AI API calls."""
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional
 from models import CostEntry, GameState
-from database import Database
+from database import UnitOfWork
+from storage import Storage
 
 
 class CostTracker:
     """Track and report costs for AI API calls."""
 
-    def __init__(self, db: Database):
+    def __init__(self, db: Storage):
         self.db = db
 
-    def log_cost(
+    async def log_cost(
         self,
         session_id: str,
         state: GameState,
         usage: dict,
         cost: float,
-        model: str
+        model: str,
+        uow: Optional[UnitOfWork] = None,
+        speculative: bool = False
     ) -> CostEntry:
-        """Log cost for an API call."""
+        """Log cost for an API call.
+
+        With a unit of work the entry is buffered and written when the
+        transition commits; otherwise it is written immediately.
+        ``speculative`` calls (generated ahead of need, maybe never used)
+        are logged under the state tagged ``:speculative``.
+        """
         # Create cost entry
         entry = CostEntry(
-            state=state.value,
+            state=f"{state.value}:speculative" if speculative else state.value,
             prompt_tokens=usage["prompt_tokens"],
             completion_tokens=usage["completion_tokens"],
             cost_usd=cost,
@@ -30,10 +39,14 @@ class CostTracker:
             timestamp=datetime.utcnow().isoformat()
         )
 
+        if uow is not None:
+            uow.add_cost(entry)
+            return entry
+
         # Store in database
-        self.db.insert_cost_log(
+        await self.db.insert_cost_log(
             session_id=session_id,
-            state=state.value,
+            state=entry.state,
             prompt_tokens=usage["prompt_tokens"],
             completion_tokens=usage["completion_tokens"],
             cost_usd=cost,
@@ -42,51 +55,62 @@ class CostTracker:
 
         return entry
 
-    def get_session_cost(self, session_id: str) -> float:
+    async def log_response(
+        self,
+        session_id: str,
+        state: GameState,
+        response: dict,
+        uow: Optional[UnitOfWork] = None,
+        speculative: bool = False
+    ) -> List[CostEntry]:
+        """Log the cost of an OpenRouterClient response.
+
+        Includes any ``extra_costs`` it carries, such as the losing side of
+        a hedged request.
+        """
+        entries = [await self.log_cost(
+            session_id, state, response['usage'], response['cost'], response['model'], uow, speculative
+        )]
+        for extra in response.get('extra_costs', []):
+            entries.append(await self.log_cost(
+                session_id, state, extra['usage'], extra['cost'], extra['model'], uow, speculative
+            ))
+        return entries
+
+    async def get_session_cost(self, session_id: str) -> float:
         """Get total cost for a session."""
-        return self.db.get_total_cost(session_id)
+        return await self.db.get_total_cost(session_id)
 
-    def get_state_breakdown(self, session_id: str) -> Dict[str, float]:
+    async def get_state_breakdown(self, session_id: str) -> Dict[str, float]:
         """Get cost breakdown by state."""
-        return self.db.get_cost_by_state(session_id)
+        return await self.db.get_cost_by_state(session_id)
 
-    def get_cost_log(self, session_id: str) -> List[CostEntry]:
+    async def get_cost_log(self, session_id: str) -> List[CostEntry]:
         """Get full cost log for a session."""
-        return self.db.get_cost_log(session_id)
+        return await self.db.get_cost_log(session_id)
 
-    def get_cost_report(self, session_id: str) -> dict:
+    async def get_cost_report(self, session_id: str) -> dict:
         """Get comprehensive cost report for a session."""
-        total = self.get_session_cost(session_id)
-        breakdown = self.get_state_breakdown(session_id)
-        log = self.get_cost_log(session_id)
-
-        # Calculate totals
-        total_prompt_tokens = sum(entry.prompt_tokens for entry in log)
-        total_completion_tokens = sum(entry.completion_tokens for entry in log)
-        total_tokens = total_prompt_tokens + total_completion_tokens
-
-        # Get model breakdown
-        model_costs = {}
-        for entry in log:
-            if entry.model not in model_costs:
-                model_costs[entry.model] = 0.0
-            model_costs[entry.model] += entry.cost_usd
+        summary = await self.db.get_cost_summary(session_id)
+
+        total = summary["total_cost_usd"]
+        num_calls = summary["num_api_calls"]
 
         return {
             "session_id": session_id,
             "total_cost_usd": total,
-            "total_tokens": total_tokens,
-            "prompt_tokens": total_prompt_tokens,
-            "completion_tokens": total_completion_tokens,
-            "cost_by_state": breakdown,
-            "cost_by_model": model_costs,
-            "num_api_calls": len(log),
-            "average_cost_per_call": total / len(log) if log else 0.0
+            "total_tokens": summary["prompt_tokens"] + summary["completion_tokens"],
+            "prompt_tokens": summary["prompt_tokens"],
+            "completion_tokens": summary["completion_tokens"],
+            "cost_by_state": summary["cost_by_state"],
+            "cost_by_model": summary["cost_by_model"],
+            "num_api_calls": num_calls,
+            "average_cost_per_call": total / num_calls if num_calls else 0.0
         }
 
-    def format_cost_report(self, session_id: str) -> str:
+    async def format_cost_report(self, session_id: str) -> str:
         """Format cost report as readable string."""
-        report = self.get_cost_report(session_id)
+        report = await self.get_cost_report(session_id)
 
         output = f"""
 Cost Report for Session: {session_id}
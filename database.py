@@ -1,86 +1,512 @@
 """SQLite database operations."""
+import asyncio
+import functools
+import os
 import sqlite3
 import json
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Optional, List, Dict
-from models import SessionState, CostEntry, Character, TimelineEvent
+from contextlib import asynccontextmanager
+from typing import Optional, List, Dict, Tuple
+from models import SessionState, SessionEvent, CostEntry, Character, TimelineEvent, Job
+
+
+# Schema migrations, applied in order. Each entry is (version, description,
+# statements); a database records the versions it has applied in
+# schema_version. Never edit an applied migration - append a new one.
+MIGRATIONS = [
+    (1, "initial schema", [
+        """
+        CREATE TABLE IF NOT EXISTS sessions (
+            session_id TEXT PRIMARY KEY,
+            state TEXT NOT NULL,
+            data JSON NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS cost_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL,
+            state TEXT NOT NULL,
+            prompt_tokens INTEGER NOT NULL,
+            completion_tokens INTEGER NOT NULL,
+            cost_usd REAL NOT NULL,
+            model TEXT NOT NULL,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (session_id) REFERENCES sessions(session_id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS characters (
+            session_id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            order_type TEXT NOT NULL,
+            archetype TEXT NOT NULL,
+            backstory JSON NOT NULL,
+            current_chapter INTEGER DEFAULT 1,
+            coherence_level REAL DEFAULT 1.0,
+            FOREIGN KEY (session_id) REFERENCES sessions(session_id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS timeline_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL,
+            chapter INTEGER NOT NULL,
+            narrative TEXT NOT NULL,
+            transformation TEXT,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (session_id) REFERENCES sessions(session_id)
+        )
+        """,
+    ]),
+    (2, "session lookup indexes", [
+        # Covering index for get_total_cost / get_cost_by_state
+        "CREATE INDEX IF NOT EXISTS idx_cost_log_session_state ON cost_log (session_id, state, cost_usd)",
+        "CREATE INDEX IF NOT EXISTS idx_timeline_session_chapter ON timeline_events (session_id, chapter)",
+    ]),
+    (3, "running cost aggregates", [
+        """
+        CREATE TABLE IF NOT EXISTS session_costs (
+            session_id TEXT PRIMARY KEY,
+            total_cost_usd REAL NOT NULL DEFAULT 0,
+            prompt_tokens INTEGER NOT NULL DEFAULT 0,
+            completion_tokens INTEGER NOT NULL DEFAULT 0,
+            num_api_calls INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        # dimension is 'state' or 'model'
+        """
+        CREATE TABLE IF NOT EXISTS session_cost_breakdown (
+            session_id TEXT NOT NULL,
+            dimension TEXT NOT NULL,
+            key TEXT NOT NULL,
+            cost_usd REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (session_id, dimension, key)
+        ) WITHOUT ROWID
+        """,
+        """
+        INSERT INTO session_costs (session_id, total_cost_usd, prompt_tokens, completion_tokens, num_api_calls)
+        SELECT session_id, SUM(cost_usd), SUM(prompt_tokens), SUM(completion_tokens), COUNT(*)
+        FROM cost_log GROUP BY session_id
+        """,
+        """
+        INSERT INTO session_cost_breakdown (session_id, dimension, key, cost_usd)
+        SELECT session_id, 'state', state, SUM(cost_usd) FROM cost_log GROUP BY session_id, state
+        """,
+        """
+        INSERT INTO session_cost_breakdown (session_id, dimension, key, cost_usd)
+        SELECT session_id, 'model', model, SUM(cost_usd) FROM cost_log GROUP BY session_id, model
+        """,
+    ]),
+    (4, "speculative generation results", [
+        """
+        CREATE TABLE IF NOT EXISTS pending_results (
+            session_id TEXT NOT NULL,
+            state TEXT NOT NULL,
+            chapter INTEGER NOT NULL,
+            result JSON NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (session_id, state, chapter)
+        )
+        """,
+    ]),
+    (5, "greatness mirror cache", [
+        """
+        CREATE TABLE IF NOT EXISTS mirror_cache (
+            cache_key TEXT PRIMARY KEY,
+            analysis JSON NOT NULL,
+            created_at REAL NOT NULL,
+            last_used_at REAL NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_mirror_cache_last_used ON mirror_cache (last_used_at)",
+    ]),
+    (6, "precomputed greatness mirror analyses", [
+        """
+        CREATE TABLE IF NOT EXISTS mirror_precomputed (
+            person_key TEXT NOT NULL,
+            prompt_version INTEGER NOT NULL,
+            admired_person TEXT NOT NULL,
+            model TEXT NOT NULL,
+            analysis JSON NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (person_key, prompt_version)
+        )
+        """,
+    ]),
+    (7, "background transition jobs", [
+        """
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id TEXT PRIMARY KEY,
+            session_id TEXT NOT NULL,
+            action TEXT NOT NULL,
+            input_data JSON NOT NULL,
+            status TEXT NOT NULL,
+            result JSON,
+            error TEXT,
+            status_code INTEGER,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_jobs_session ON jobs (session_id)",
+    ]),
+    (8, "idempotent transition responses", [
+        """
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            session_id TEXT NOT NULL,
+            idempotency_key TEXT NOT NULL,
+            response JSON NOT NULL,
+            created_at REAL NOT NULL,
+            PRIMARY KEY (session_id, idempotency_key)
+        ) WITHOUT ROWID
+        """,
+        "ALTER TABLE jobs ADD COLUMN idempotency_key TEXT",
+    ]),
+    (9, "append-only session event log", [
+        """
+        CREATE TABLE IF NOT EXISTS session_events (
+            session_id TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            state TEXT NOT NULL,
+            delta JSON NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (session_id, seq)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS session_snapshots (
+            session_id TEXT PRIMARY KEY,
+            seq INTEGER NOT NULL,
+            data JSON NOT NULL
+        )
+        """,
+        "ALTER TABLE sessions ADD COLUMN last_seq INTEGER NOT NULL DEFAULT 0",
+        # Existing sessions start their log with their current data
+        """
+        INSERT INTO session_events (session_id, seq, state, delta, created_at)
+        SELECT session_id, 0, state, data, updated_at FROM sessions
+        """,
+        # sessions.data is no longer read; empty it so state updates stay small
+        "UPDATE sessions SET data = '{}'",
+    ]),
+    (10, "session archive and expiry index", [
+        """
+        CREATE TABLE IF NOT EXISTS session_archive (
+            session_id TEXT PRIMARY KEY,
+            state TEXT NOT NULL,
+            created_at TIMESTAMP,
+            updated_at TIMESTAMP,
+            total_cost_usd REAL NOT NULL DEFAULT 0,
+            archived_at REAL NOT NULL,
+            payload BLOB NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_sessions_state_updated ON sessions (state, updated_at)",
+        "CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions (updated_at)",
+    ]),
+    (11, "job ownership leases", [
+        # The node holding a job; it re-stamps updated_at while the job is unfinished
+        "ALTER TABLE jobs ADD COLUMN owner TEXT",
+    ]),
+    (12, "precomputed mirror analyses keyed by model", [
+        # SQLite can't change a primary key in place, so the table is rebuilt
+        """
+        CREATE TABLE mirror_precomputed_new (
+            person_key TEXT NOT NULL,
+            prompt_version INTEGER NOT NULL,
+            admired_person TEXT NOT NULL,
+            model TEXT NOT NULL,
+            analysis JSON NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (person_key, prompt_version, model)
+        )
+        """,
+        "INSERT INTO mirror_precomputed_new SELECT * FROM mirror_precomputed",
+        "DROP TABLE mirror_precomputed",
+        "ALTER TABLE mirror_precomputed_new RENAME TO mirror_precomputed",
+    ]),
+]
+
+# Tables holding a session's rows, sessions last
+SESSION_TABLES = [
+    "timeline_events", "characters", "cost_log", "session_costs", "session_cost_breakdown",
+    "pending_results", "jobs", "idempotency_keys", "session_events", "session_snapshots",
+    "sessions",
+]
+
+# What an archived session keeps (zlib-compressed JSON of these tables' rows)
+ARCHIVED_TABLES = [
+    "sessions", "session_events", "session_snapshots", "characters", "timeline_events",
+    "cost_log", "session_costs", "session_cost_breakdown",
+]
+
+# Tables whose rows are deleted once their session is gone. Jobs are left to
+# age out: with sharding a job may live in a different shard than its session.
+ORPHAN_TABLES = [table for table in SESSION_TABLES if table not in ("jobs", "sessions")]
+
+
+def cost_aggregates(entries: List[CostEntry]) -> Tuple[tuple, Dict[tuple, float]]:
+    """Totals and per-(dimension, key) costs to add to the running aggregates.
+
+    Returns ((cost, prompt_tokens, completion_tokens, num_api_calls), breakdown)
+    where breakdown maps ('state' | 'model', key) to cost.
+    """
+    breakdown: Dict[tuple, float] = {}
+    for e in entries:
+        breakdown[("state", e.state)] = breakdown.get(("state", e.state), 0.0) + e.cost_usd
+        breakdown[("model", e.model)] = breakdown.get(("model", e.model), 0.0) + e.cost_usd
+    totals = (
+        sum(e.cost_usd for e in entries),
+        sum(e.prompt_tokens for e in entries),
+        sum(e.completion_tokens for e in entries),
+        len(entries)
+    )
+    return totals, breakdown
+
+
+def _in_db_thread(func):
+    """Run a blocking Database method on the dedicated DB thread and await it."""
+    @functools.wraps(func)
+    async def wrapper(self, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(func, self, *args, **kwargs)
+        )
+    return wrapper
+
+
+class SessionConflictError(Exception):
+    """Raised when a unit of work commits over a transition it didn't see.
+
+    Another transition of the same session (e.g. on another node) committed
+    after this one was loaded, or already stored its idempotency key.
+    Nothing of the losing unit of work is written.
+    """
+
+    def __init__(self, session_id: str):
+        super().__init__(f"Session {session_id} was changed by a concurrent transition")
+        self.session_id = session_id
+
+
+class UnitOfWork:
+    """Everything one state transition reads and writes.
+
+    The session and character are loaded once up front; writes are buffered
+    here and flushed by Database in a single transaction when the
+    ``Database.unit_of_work`` block exits cleanly. ``seq`` is the session's
+    last event number when loaded: a state update only commits if it is
+    still the latest, and it is advanced on commit.
+    """
+
+    def __init__(self, session_id: str, session: Optional[SessionState],
+                 character: Optional[Character], prior_cost: float = 0.0,
+                 seq: Optional[int] = None):
+        self.session_id = session_id
+        self.session = session
+        self.character = character
+        self.prior_cost = prior_cost
+        self.seq = seq
+        self.character_dirty = False
+        self.cost_entries: List[CostEntry] = []
+        self.timeline_events: List[TimelineEvent] = []
+        self.next_state: Optional[str] = None
+        self.next_data: Optional[dict] = None
+        self.next_delta: Optional[dict] = None
+        self.consumed_pending: List[tuple] = []
+        self.idempotent_response: Optional[Tuple[str, dict]] = None
+
+    def add_cost(self, entry: CostEntry):
+        self.cost_entries.append(entry)
+
+    def add_timeline_event(self, event: TimelineEvent):
+        self.timeline_events.append(event)
+
+    def save_character(self, character: Character):
+        self.character = character
+        self.character_dirty = True
+
+    def update_session(self, state: str, data: dict, delta: Optional[dict] = None):
+        """Move to ``state`` with ``data``; pass ``delta`` when only those keys changed."""
+        self.next_state = state
+        self.next_data = data
+        self.next_delta = delta
+
+    def consume_pending(self, state: str, chapter: int):
+        """Mark a speculative result as used so the commit deletes it."""
+        self.consumed_pending.append((state, chapter))
+
+    @property
+    def total_cost(self) -> float:
+        """Session cost including the entries buffered in this unit of work."""
+        return self.prior_cost + sum(entry.cost_usd for entry in self.cost_entries)
+
+    def record_response(self, idempotency_key: str, response: dict):
+        """Store the transition's response, committed with it, for replay."""
+        self.idempotent_response = (idempotency_key, response)
 
 
 class Database:
-    """SQLite database manager."""
+    """SQLite database manager.
+
+    Public operations are coroutines. The blocking sqlite3 work runs on a single
+    dedicated thread, so a slow commit never stalls the event loop and writes
+    are serialized the way SQLite wants them. That thread owns one long-lived
+    connection opened in WAL mode with the pragmas below (overridable via env).
+    """
 
     def __init__(self, db_path: str = "data/game.db"):
         self.db_path = db_path
-        self._init_db()
+        self.journal_mode = os.getenv("DB_JOURNAL_MODE", "WAL")
+        self.synchronous = os.getenv("DB_SYNCHRONOUS", "NORMAL")
+        self.mmap_size = int(os.getenv("DB_MMAP_SIZE", 256 * 1024 * 1024))
+        self.cache_size_kib = int(os.getenv("DB_CACHE_SIZE_KIB", 64 * 1024))
+        self.statement_cache = int(os.getenv("DB_STATEMENT_CACHE", 256))
+        self.snapshot_interval = int(os.getenv("SESSION_SNAPSHOT_INTERVAL", 8))
+        self._conn = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db")
+        self._executor.submit(self._init_db).result()
 
-    def _init_db(self):
-        """Initialize database schema."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    async def connect(self):
+        """Nothing to do: the schema is migrated when the Database is created."""
 
-        # Sessions table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS sessions (
-                session_id TEXT PRIMARY KEY,
-                state TEXT NOT NULL,
-                data JSON NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
+    def close(self):
+        """Wait for pending operations, close the connection and stop the DB thread."""
+        self._executor.submit(self._close_conn).result()
+        self._executor.shutdown(wait=True)
 
-        # Cost log table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS cost_log (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                session_id TEXT NOT NULL,
-                state TEXT NOT NULL,
-                prompt_tokens INTEGER NOT NULL,
-                completion_tokens INTEGER NOT NULL,
-                cost_usd REAL NOT NULL,
-                model TEXT NOT NULL,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (session_id) REFERENCES sessions(session_id)
-            )
-        """)
+    async def aclose(self):
+        self.close()
 
-        # Characters table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS characters (
-                session_id TEXT PRIMARY KEY,
-                name TEXT NOT NULL,
-                order_type TEXT NOT NULL,
-                archetype TEXT NOT NULL,
-                backstory JSON NOT NULL,
-                current_chapter INTEGER DEFAULT 1,
-                coherence_level REAL DEFAULT 1.0,
-                FOREIGN KEY (session_id) REFERENCES sessions(session_id)
-            )
-        """)
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection and apply the configured pragmas."""
+        conn = sqlite3.connect(self.db_path, cached_statements=self.statement_cache)
+        conn.row_factory = sqlite3.Row
+        # Only takes effect on a new file, so it must precede journal_mode
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute(f"PRAGMA journal_mode={self.journal_mode}")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        conn.execute(f"PRAGMA mmap_size={self.mmap_size}")
+        # Negative cache_size is in KiB rather than pages
+        conn.execute(f"PRAGMA cache_size=-{self.cache_size_kib}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
 
-        # Timeline events table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS timeline_events (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                session_id TEXT NOT NULL,
-                chapter INTEGER NOT NULL,
-                narrative TEXT NOT NULL,
-                transformation TEXT,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (session_id) REFERENCES sessions(session_id)
+    def _get_conn(self) -> sqlite3.Connection:
+        """Get the DB thread's long-lived connection, opening it on first use."""
+        if self._conn is None:
+            self._conn = self._connect()
+        return self._conn
+
+    def _close_conn(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _init_db(self):
+        """Initialize database schema by applying pending migrations."""
+        conn = self._get_conn()
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            print(f"Note: {self.db_path} can't be vacuumed incrementally; run "
+                  f"'PRAGMA auto_vacuum=INCREMENTAL; VACUUM;' on it during downtime")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                description TEXT NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         """)
+        current = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()[0] or 0
 
-        conn.commit()
-        conn.close()
+        for version, description, statements in MIGRATIONS:
+            if version <= current:
+                continue
+            conn.execute("BEGIN")
+            try:
+                for statement in statements:
+                    conn.execute(statement)
+                conn.execute(
+                    "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                    (version, description)
+                )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            print(f"Applied schema migration {version}: {description}")
 
-    def _get_conn(self):
-        """Get database connection."""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
+    # Unit of work
+    @asynccontextmanager
+    async def unit_of_work(self, session_id: str):
+        """Load a session and character once and commit buffered writes atomically.
+
+        Nothing is written if the block raises.
+        """
+        uow = await self.load_work(session_id)
+        yield uow
+        await self.commit_work(uow)
+
+    @_in_db_thread
+    def load_work(self, session_id: str) -> UnitOfWork:
+        """Start a unit of work with the session, character and cost read in one go."""
+        cursor = self._get_conn().cursor()
+        return UnitOfWork(
+            session_id,
+            self._read_session(cursor, session_id),
+            self._read_character(cursor, session_id),
+            self._read_total_cost(cursor, session_id),
+            self._read_seq(cursor, session_id)
+        )
+
+    @_in_db_thread
+    def commit_work(self, uow: UnitOfWork):
+        """Write a unit of work's buffered changes in one transaction.
+
+        Raises SessionConflictError, writing nothing, if the session moved
+        on since the unit of work was loaded or its idempotency key is
+        already stored.
+        """
+        conn = self._get_conn()
+        cursor = conn.cursor()
+        seq = uow.seq
+        try:
+            if uow.cost_entries:
+                self._write_cost_entries(cursor, uow.session_id, uow.cost_entries)
+            if uow.timeline_events:
+                self._write_timeline_events(cursor, uow.session_id, uow.timeline_events)
+            if uow.character_dirty:
+                self._write_character(cursor, uow.session_id, uow.character)
+            if uow.next_state is not None:
+                seq = self._write_session(cursor, uow.session_id, uow.next_state, uow.next_data,
+                                          uow.next_delta, expected_seq=uow.seq)
+            if uow.consumed_pending:
+                cursor.executemany(
+                    "DELETE FROM pending_results WHERE session_id = ? AND state = ? AND chapter = ?",
+                    [(uow.session_id, state, chapter) for state, chapter in uow.consumed_pending]
+                )
+            if uow.idempotent_response is not None:
+                key, response = uow.idempotent_response
+                cursor.execute(
+                    """INSERT INTO idempotency_keys (session_id, idempotency_key, response, created_at)
+                       VALUES (?, ?, ?, ?) ON CONFLICT DO NOTHING""",
+                    (uow.session_id, key, json.dumps(response), time.time())
+                )
+                if cursor.rowcount == 0:
+                    raise SessionConflictError(uow.session_id)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        uow.seq = seq
 
     # Session operations
+    @_in_db_thread
     def create_session(self, session_id: str, state: str, data: dict) -> SessionState:
         """Create a new session."""
         conn = self._get_conn()
@@ -88,12 +514,15 @@ class Database:
 
         now = datetime.utcnow().isoformat()
         cursor.execute(
-            "INSERT INTO sessions (session_id, state, data, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
-            (session_id, state, json.dumps(data), now, now)
+            "INSERT INTO sessions (session_id, state, data, created_at, updated_at) VALUES (?, ?, '{}', ?, ?)",
+            (session_id, state, now, now)
+        )
+        cursor.execute(
+            "INSERT INTO session_events (session_id, seq, state, delta, created_at) VALUES (?, 0, ?, ?, ?)",
+            (session_id, state, json.dumps(data), now)
         )
 
         conn.commit()
-        conn.close()
 
         return SessionState(
             session_id=session_id,
@@ -103,97 +532,225 @@ class Database:
             updated_at=now
         )
 
+    @_in_db_thread
     def get_session(self, session_id: str) -> Optional[SessionState]:
         """Get session by ID."""
-        conn = self._get_conn()
-        cursor = conn.cursor()
+        return self._read_session(self._get_conn().cursor(), session_id)
 
-        cursor.execute("SELECT * FROM sessions WHERE session_id = ?", (session_id,))
+    def _read_session(self, cursor: sqlite3.Cursor, session_id: str) -> Optional[SessionState]:
+        """Rebuild a session from its latest snapshot and the events after it."""
+        cursor.execute(
+            "SELECT state, created_at, updated_at FROM sessions WHERE session_id = ?",
+            (session_id,)
+        )
         row = cursor.fetchone()
-        conn.close()
 
         if not row:
             return None
 
+        snapshot = cursor.execute(
+            "SELECT seq, data FROM session_snapshots WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        data, seq = (json.loads(snapshot['data']), snapshot['seq']) if snapshot else ({}, -1)
+        for (delta,) in cursor.execute(
+            "SELECT delta FROM session_events WHERE session_id = ? AND seq > ? ORDER BY seq",
+            (session_id, seq)
+        ):
+            data.update(json.loads(delta))
+
         return SessionState(
-            session_id=row['session_id'],
+            session_id=session_id,
             state=row['state'],
-            data=json.loads(row['data']),
+            data=data,
             created_at=row['created_at'],
             updated_at=row['updated_at']
         )
 
+    def _read_seq(self, cursor: sqlite3.Cursor, session_id: str) -> Optional[int]:
+        row = cursor.execute(
+            "SELECT last_seq FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    @_in_db_thread
     def update_session(self, session_id: str, state: str, data: dict):
         """Update session state."""
         conn = self._get_conn()
-        cursor = conn.cursor()
+        self._write_session(conn.cursor(), session_id, state, data)
+        conn.commit()
+
+    def _write_session(self, cursor: sqlite3.Cursor, session_id: str, state: str, data: dict,
+                       delta: Optional[dict] = None, expected_seq: Optional[int] = None) -> int:
+        """Append a transition event, snapshotting the full data every few events.
 
+        Without a ``delta`` the event carries the full data and is snapshotted
+        at once, so keys missing from it are dropped on read. Raises
+        ValueError if the session no longer exists (e.g. deleted mid-transition)
+        and SessionConflictError if its last event isn't ``expected_seq``.
+        Returns the new event's number.
+        """
         now = datetime.utcnow().isoformat()
+        row = cursor.execute(
+            """UPDATE sessions SET state = ?, updated_at = ?, last_seq = last_seq + 1
+               WHERE session_id = ? AND (? IS NULL OR last_seq = ?) RETURNING last_seq""",
+            (state, now, session_id, expected_seq, expected_seq)
+        ).fetchone()
+        if row is None:
+            if self._read_seq(cursor, session_id) is not None:
+                raise SessionConflictError(session_id)
+            raise ValueError(f"Session {session_id} not found")
+
+        seq = row[0]
         cursor.execute(
-            "UPDATE sessions SET state = ?, data = ?, updated_at = ? WHERE session_id = ?",
-            (state, json.dumps(data), now, session_id)
+            "INSERT INTO session_events (session_id, seq, state, delta, created_at) VALUES (?, ?, ?, ?, ?)",
+            (session_id, seq, state, json.dumps(data if delta is None else delta), now)
         )
+        if delta is None or seq % self.snapshot_interval == 0:
+            cursor.execute(
+                "INSERT OR REPLACE INTO session_snapshots (session_id, seq, data) VALUES (?, ?, ?)",
+                (session_id, seq, json.dumps(data))
+            )
+        return seq
 
-        conn.commit()
-        conn.close()
+    @_in_db_thread
+    def get_session_history(self, session_id: str) -> List[SessionEvent]:
+        """Get a session's logged transitions, oldest first."""
+        cursor = self._get_conn().cursor()
+        cursor.execute(
+            "SELECT seq, state, delta, created_at FROM session_events WHERE session_id = ? ORDER BY seq",
+            (session_id,)
+        )
+        return [
+            SessionEvent(seq=row['seq'], state=row['state'], delta=json.loads(row['delta']),
+                         created_at=row['created_at'])
+            for row in cursor.fetchall()
+        ]
 
+    @_in_db_thread
     def delete_session(self, session_id: str):
         """Delete a session and all related data."""
         conn = self._get_conn()
-        cursor = conn.cursor()
-
-        cursor.execute("DELETE FROM timeline_events WHERE session_id = ?", (session_id,))
-        cursor.execute("DELETE FROM characters WHERE session_id = ?", (session_id,))
-        cursor.execute("DELETE FROM cost_log WHERE session_id = ?", (session_id,))
-        cursor.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
-
+        self._delete_sessions(conn.cursor(), [session_id])
         conn.commit()
-        conn.close()
+
+    def _delete_sessions(self, cursor: sqlite3.Cursor, session_ids: List[str],
+                         tables: List[str] = SESSION_TABLES) -> int:
+        """Delete the sessions' rows from ``tables``; returns the number of rows deleted."""
+        if not session_ids:
+            return 0
+        placeholders = ", ".join("?" * len(session_ids))
+        deleted = 0
+        for table in tables:
+            cursor.execute(f"DELETE FROM {table} WHERE session_id IN ({placeholders})", session_ids)
+            deleted += cursor.rowcount
+        return deleted
 
     # Cost tracking operations
+    @_in_db_thread
     def insert_cost_log(self, session_id: str, state: str, prompt_tokens: int,
                        completion_tokens: int, cost_usd: float, model: str):
         """Log cost for an API call."""
         conn = self._get_conn()
-        cursor = conn.cursor()
+        self._write_cost_entries(conn.cursor(), session_id, [
+            CostEntry(state, prompt_tokens, completion_tokens, cost_usd, model, timestamp=None)
+        ])
+        conn.commit()
 
-        cursor.execute(
+    def _write_cost_entries(self, cursor: sqlite3.Cursor, session_id: str, entries: List[CostEntry]):
+        cursor.executemany(
             """INSERT INTO cost_log (session_id, state, prompt_tokens, completion_tokens, cost_usd, model)
                VALUES (?, ?, ?, ?, ?, ?)""",
-            (session_id, state, prompt_tokens, completion_tokens, cost_usd, model)
+            [(session_id, e.state, e.prompt_tokens, e.completion_tokens, e.cost_usd, e.model)
+             for e in entries]
         )
 
-        conn.commit()
-        conn.close()
+        # Keep the running aggregates in step with the log
+        totals, breakdown = cost_aggregates(entries)
+        cursor.execute(
+            """INSERT INTO session_costs
+               (session_id, total_cost_usd, prompt_tokens, completion_tokens, num_api_calls)
+               VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT (session_id) DO UPDATE SET
+                   total_cost_usd = total_cost_usd + excluded.total_cost_usd,
+                   prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+                   completion_tokens = completion_tokens + excluded.completion_tokens,
+                   num_api_calls = num_api_calls + excluded.num_api_calls""",
+            (session_id, *totals)
+        )
+        cursor.executemany(
+            """INSERT INTO session_cost_breakdown (session_id, dimension, key, cost_usd)
+               VALUES (?, ?, ?, ?)
+               ON CONFLICT (session_id, dimension, key) DO UPDATE SET
+                   cost_usd = cost_usd + excluded.cost_usd""",
+            [(session_id, dimension, key, cost) for (dimension, key), cost in breakdown.items()]
+        )
 
+    @_in_db_thread
     def get_total_cost(self, session_id: str) -> float:
         """Get total cost for a session."""
-        conn = self._get_conn()
-        cursor = conn.cursor()
+        return self._read_total_cost(self._get_conn().cursor(), session_id)
 
+    def _read_total_cost(self, cursor: sqlite3.Cursor, session_id: str) -> float:
         cursor.execute(
-            "SELECT SUM(cost_usd) as total FROM cost_log WHERE session_id = ?",
+            "SELECT total_cost_usd FROM session_costs WHERE session_id = ?",
             (session_id,)
         )
         row = cursor.fetchone()
-        conn.close()
 
-        return row['total'] or 0.0
+        return row['total_cost_usd'] if row else 0.0
 
-    def get_cost_by_state(self, session_id: str) -> Dict[str, float]:
-        """Get cost breakdown by state."""
+    @_in_db_thread
+    def get_cost_summary(self, session_id: str) -> dict:
+        """Get totals plus per-state and per-model cost for a session in one query."""
         conn = self._get_conn()
         cursor = conn.cursor()
 
         cursor.execute(
-            "SELECT state, SUM(cost_usd) as total FROM cost_log WHERE session_id = ? GROUP BY state",
-            (session_id,)
+            """SELECT 'total', NULL, total_cost_usd, prompt_tokens, completion_tokens, num_api_calls
+               FROM session_costs WHERE session_id = ?
+               UNION ALL
+               SELECT dimension, key, cost_usd, NULL, NULL, NULL
+               FROM session_cost_breakdown WHERE session_id = ?""",
+            (session_id, session_id)
         )
-        rows = cursor.fetchall()
-        conn.close()
 
-        return {row['state']: row['total'] for row in rows}
+        summary = {
+            "total_cost_usd": 0.0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "num_api_calls": 0,
+            "cost_by_state": {},
+            "cost_by_model": {}
+        }
+        for dimension, key, cost, prompt_tokens, completion_tokens, num_calls in cursor:
+            if dimension == "total":
+                summary["total_cost_usd"] = cost
+                summary["prompt_tokens"] = prompt_tokens
+                summary["completion_tokens"] = completion_tokens
+                summary["num_api_calls"] = num_calls
+            else:
+                summary[f"cost_by_{dimension}"][key] = cost
+        return summary
+
+    @_in_db_thread
+    def get_cost_by_state(self, session_id: str) -> Dict[str, float]:
+        """Get cost breakdown by state."""
+        return self._read_cost_breakdown(session_id, "state")
+
+    @_in_db_thread
+    def get_cost_by_model(self, session_id: str) -> Dict[str, float]:
+        """Get cost breakdown by model."""
+        return self._read_cost_breakdown(session_id, "model")
+
+    def _read_cost_breakdown(self, session_id: str, dimension: str) -> Dict[str, float]:
+        cursor = self._get_conn().cursor()
+        cursor.execute(
+            "SELECT key, cost_usd FROM session_cost_breakdown WHERE session_id = ? AND dimension = ?",
+            (session_id, dimension)
+        )
+        return {row['key']: row['cost_usd'] for row in cursor.fetchall()}
 
+    @_in_db_thread
     def get_cost_log(self, session_id: str) -> List[CostEntry]:
         """Get full cost log for a session."""
         conn = self._get_conn()
@@ -204,7 +761,6 @@ class Database:
             (session_id,)
         )
         rows = cursor.fetchall()
-        conn.close()
 
         return [
             CostEntry(
@@ -218,12 +774,25 @@ class Database:
             for row in rows
         ]
 
+    @_in_db_thread
+    def get_usage_summary(self) -> dict:
+        """Get session count and cost totals across all sessions."""
+        cursor = self._get_conn().cursor()
+        sessions = cursor.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        cost, calls = cursor.execute(
+            "SELECT COALESCE(SUM(total_cost_usd), 0), COALESCE(SUM(num_api_calls), 0) FROM session_costs"
+        ).fetchone()
+        return {"sessions": sessions, "total_cost_usd": cost, "num_api_calls": calls}
+
     # Character operations
+    @_in_db_thread
     def save_character(self, session_id: str, character: Character):
         """Save or update character."""
         conn = self._get_conn()
-        cursor = conn.cursor()
+        self._write_character(conn.cursor(), session_id, character)
+        conn.commit()
 
+    def _write_character(self, cursor: sqlite3.Cursor, session_id: str, character: Character):
         cursor.execute(
             """INSERT OR REPLACE INTO characters
                (session_id, name, order_type, archetype, backstory, current_chapter, coherence_level)
@@ -232,17 +801,14 @@ class Database:
              json.dumps(character.backstory), character.current_chapter, character.coherence_level)
         )
 
-        conn.commit()
-        conn.close()
-
+    @_in_db_thread
     def get_character(self, session_id: str) -> Optional[Character]:
         """Get character for session."""
-        conn = self._get_conn()
-        cursor = conn.cursor()
+        return self._read_character(self._get_conn().cursor(), session_id)
 
+    def _read_character(self, cursor: sqlite3.Cursor, session_id: str) -> Optional[Character]:
         cursor.execute("SELECT * FROM characters WHERE session_id = ?", (session_id,))
         row = cursor.fetchone()
-        conn.close()
 
         if not row:
             return None
@@ -257,20 +823,22 @@ class Database:
         )
 
     # Timeline operations
+    @_in_db_thread
     def add_timeline_event(self, session_id: str, event: TimelineEvent):
         """Add timeline event."""
         conn = self._get_conn()
-        cursor = conn.cursor()
+        self._write_timeline_events(conn.cursor(), session_id, [event])
+        conn.commit()
 
-        cursor.execute(
+    def _write_timeline_events(self, cursor: sqlite3.Cursor, session_id: str,
+                               events: List[TimelineEvent]):
+        cursor.executemany(
             """INSERT INTO timeline_events (session_id, chapter, narrative, transformation)
                VALUES (?, ?, ?, ?)""",
-            (session_id, event.chapter, event.narrative, event.transformation)
+            [(session_id, e.chapter, e.narrative, e.transformation) for e in events]
         )
 
-        conn.commit()
-        conn.close()
-
+    @_in_db_thread
     def get_timeline(self, session_id: str) -> List[TimelineEvent]:
         """Get full timeline for session."""
         conn = self._get_conn()
@@ -281,7 +849,6 @@ class Database:
             (session_id,)
         )
         rows = cursor.fetchall()
-        conn.close()
 
         return [
             TimelineEvent(
@@ -292,3 +859,521 @@ class Database:
             )
             for row in rows
         ]
+
+    # Speculative generation operations
+    @_in_db_thread
+    def save_pending_result(self, session_id: str, state: str, chapter: int, result: dict):
+        """Store a speculatively generated result until a transition consumes it."""
+        conn = self._get_conn()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            """INSERT OR REPLACE INTO pending_results (session_id, state, chapter, result)
+               VALUES (?, ?, ?, ?)""",
+            (session_id, state, chapter, json.dumps(result))
+        )
+
+        conn.commit()
+
+    @_in_db_thread
+    def get_pending_result(self, session_id: str, state: str, chapter: int) -> Optional[dict]:
+        """Get a stored speculative result, if any."""
+        conn = self._get_conn()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            "SELECT result FROM pending_results WHERE session_id = ? AND state = ? AND chapter = ?",
+            (session_id, state, chapter)
+        )
+        row = cursor.fetchone()
+
+        return json.loads(row['result']) if row else None
+
+    # Greatness Mirror cache operations
+    @_in_db_thread
+    def get_mirror_cache(self, cache_key: str, min_created_at: float) -> Optional[Tuple[dict, float]]:
+        """Get (analysis, created_at) if cached after ``min_created_at``, marking it used."""
+        conn = self._get_conn()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            "SELECT analysis, created_at FROM mirror_cache WHERE cache_key = ?",
+            (cache_key,)
+        )
+        row = cursor.fetchone()
+        if not row:
+            return None
+
+        if row['created_at'] < min_created_at:
+            cursor.execute("DELETE FROM mirror_cache WHERE cache_key = ?", (cache_key,))
+            conn.commit()
+            return None
+
+        cursor.execute(
+            "UPDATE mirror_cache SET last_used_at = ? WHERE cache_key = ?",
+            (time.time(), cache_key)
+        )
+        conn.commit()
+        return json.loads(row['analysis']), row['created_at']
+
+    @_in_db_thread
+    def put_mirror_cache(self, cache_key: str, analysis: dict, max_entries: int):
+        """Store an analysis, evicting least recently used entries beyond ``max_entries``."""
+        conn = self._get_conn()
+        cursor = conn.cursor()
+
+        now = time.time()
+        cursor.execute(
+            """INSERT OR REPLACE INTO mirror_cache (cache_key, analysis, created_at, last_used_at)
+               VALUES (?, ?, ?, ?)""",
+            (cache_key, json.dumps(analysis), now, now)
+        )
+        cursor.execute(
+            """DELETE FROM mirror_cache WHERE cache_key IN (
+                   SELECT cache_key FROM mirror_cache ORDER BY last_used_at DESC LIMIT -1 OFFSET ?
+               )""",
+            (max_entries,)
+        )
+
+        conn.commit()
+
+    @_in_db_thread
+    def get_mirror_precomputed(self, person_key: str, prompt_version: int,
+                               model: str) -> Optional[dict]:
+        """Get a precomputed analysis for a normalized name, if one was warmed for the model."""
+        conn = self._get_conn()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            """SELECT analysis FROM mirror_precomputed
+               WHERE person_key = ? AND prompt_version = ? AND model = ?""",
+            (person_key, prompt_version, model)
+        )
+        row = cursor.fetchone()
+
+        return json.loads(row['analysis']) if row else None
+
+    @_in_db_thread
+    def get_mirror_precomputed_keys(self, prompt_version: int, model: str) -> List[str]:
+        """Get the normalized names already precomputed for a prompt version and model."""
+        conn = self._get_conn()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            "SELECT person_key FROM mirror_precomputed WHERE prompt_version = ? AND model = ?",
+            (prompt_version, model)
+        )
+        return [row['person_key'] for row in cursor.fetchall()]
+
+    @_in_db_thread
+    def put_mirror_precomputed(self, rows: List[tuple]):
+        """Bulk load (person_key, prompt_version, admired_person, model, analysis) rows."""
+        conn = self._get_conn()
+        cursor = conn.cursor()
+
+        cursor.executemany(
+            """INSERT OR REPLACE INTO mirror_precomputed
+               (person_key, prompt_version, admired_person, model, analysis)
+               VALUES (?, ?, ?, ?, ?)""",
+            [(key, version, person, model, json.dumps(analysis))
+             for key, version, person, model, analysis in rows]
+        )
+
+        conn.commit()
+
+    @_in_db_thread
+    def get_idempotent_response(self, session_id: str, idempotency_key: str) -> Optional[dict]:
+        """Get the stored response of a transition already run with this key."""
+        conn = self._get_conn()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            "SELECT response FROM idempotency_keys WHERE session_id = ? AND idempotency_key = ?",
+            (session_id, idempotency_key)
+        )
+        row = cursor.fetchone()
+
+        return json.loads(row['response']) if row else None
+
+    # Background job operations
+    @_in_db_thread
+    def create_job(self, job_id: str, session_id: str, action: str, input_data: dict,
+                   idempotency_key: Optional[str] = None, owner: Optional[str] = None) -> Job:
+        """Record a queued transition job, leased to node ``owner``."""
+        conn = self._get_conn()
+        cursor = conn.cursor()
+
+        now = time.time()
+        cursor.execute(
+            """INSERT INTO jobs (job_id, session_id, action, input_data, status,
+                                 idempotency_key, owner, created_at, updated_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (job_id, session_id, action, json.dumps(input_data), Job.QUEUED,
+             idempotency_key, owner, now, now)
+        )
+
+        conn.commit()
+        return Job(job_id, session_id, action, input_data, Job.QUEUED,
+                   idempotency_key=idempotency_key, created_at=now, updated_at=now)
+
+    @_in_db_thread
+    def get_job(self, job_id: str) -> Optional[Job]:
+        """Get a job by ID."""
+        conn = self._get_conn()
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,))
+        row = cursor.fetchone()
+
+        return self._job_from_row(row) if row else None
+
+    @_in_db_thread
+    def claim_jobs(self, owner: str, stale_before: float) -> List[Job]:
+        """Take over unfinished jobs that are ``owner``'s, unowned, or whose lease lapsed.
+
+        Claiming stamps ``updated_at``, which renews the lease on the jobs
+        ``owner`` already holds; a lease has lapsed when it wasn't renewed
+        since ``stale_before``. Returns the claimed jobs, oldest first.
+        """
+        conn = self._get_conn()
+        cursor = conn.cursor()
+
+        rows = cursor.execute(
+            """UPDATE jobs SET owner = ?, updated_at = ?
+               WHERE status IN (?, ?) AND (owner IS NULL OR owner = ? OR updated_at < ?)
+               RETURNING *""",
+            (owner, time.time(), Job.QUEUED, Job.RUNNING, owner, stale_before)
+        ).fetchall()
+
+        conn.commit()
+        return sorted((self._job_from_row(row) for row in rows), key=lambda job: job.created_at)
+
+    @_in_db_thread
+    def update_job(self, job_id: str, status: str, result: Optional[dict] = None,
+                   error: Optional[str] = None, status_code: Optional[int] = None):
+        """Record a job's progress or outcome."""
+        conn = self._get_conn()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            """UPDATE jobs SET status = ?, result = ?, error = ?, status_code = ?, updated_at = ?
+               WHERE job_id = ?""",
+            (status, json.dumps(result) if result is not None else None,
+             error, status_code, time.time(), job_id)
+        )
+
+        conn.commit()
+
+    # Maintenance operations
+    @_in_db_thread
+    def expire_sessions(self, idle_before: str, keep_state: str, limit: int) -> Tuple[List[str], int]:
+        """Delete up to ``limit`` sessions last updated before ``idle_before``, except in ``keep_state``.
+
+        Returns the deleted session IDs and the number of rows removed.
+        """
+        conn = self._get_conn()
+        cursor = conn.cursor()
+
+        session_ids = [row[0] for row in cursor.execute(
+            "SELECT session_id FROM sessions WHERE updated_at < ? AND state != ? LIMIT ?",
+            (idle_before, keep_state, limit)
+        ).fetchall()]
+        deleted = self._delete_sessions(cursor, session_ids)
+
+        conn.commit()
+        return session_ids, deleted
+
+    @_in_db_thread
+    def archive_sessions(self, state: str, idle_before: str, limit: int) -> Tuple[List[str], int]:
+        """Move up to ``limit`` sessions in ``state`` last updated before ``idle_before`` to the archive.
+
+        Each session_archive row holds the session's rows from ARCHIVED_TABLES
+        as zlib-compressed JSON. Returns the archived session IDs and the
+        number of live rows removed.
+        """
+        conn = self._get_conn()
+        cursor = conn.cursor()
+
+        session_ids = [row[0] for row in cursor.execute(
+            "SELECT session_id FROM sessions WHERE state = ? AND updated_at < ? LIMIT ?",
+            (state, idle_before, limit)
+        ).fetchall()]
+        now = time.time()
+        for session_id in session_ids:
+            rows = {
+                table: [dict(row) for row in cursor.execute(
+                    f"SELECT * FROM {table} WHERE session_id = ?", (session_id,)
+                ).fetchall()]
+                for table in ARCHIVED_TABLES
+            }
+            session = rows["sessions"][0]
+            costs = rows["session_costs"]
+            cursor.execute(
+                """INSERT OR REPLACE INTO session_archive
+                   (session_id, state, created_at, updated_at, total_cost_usd, archived_at, payload)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                (session_id, session['state'], session['created_at'], session['updated_at'],
+                 costs[0]['total_cost_usd'] if costs else 0.0, now,
+                 zlib.compress(json.dumps(rows).encode()))
+            )
+        deleted = self._delete_sessions(cursor, session_ids)
+
+        conn.commit()
+        return session_ids, deleted
+
+    @_in_db_thread
+    def get_archived_session(self, session_id: str) -> Optional[dict]:
+        """Get an archived session's rows, keyed by table."""
+        cursor = self._get_conn().cursor()
+        row = cursor.execute(
+            "SELECT payload FROM session_archive WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return json.loads(zlib.decompress(row['payload'])) if row else None
+
+    @_in_db_thread
+    def delete_orphans(self, limit: int) -> int:
+        """Delete the rows of up to ``limit`` vanished sessions from each table; returns rows deleted."""
+        conn = self._get_conn()
+        cursor = conn.cursor()
+
+        deleted = 0
+        for table in ORPHAN_TABLES:
+            orphan_ids = [row[0] for row in cursor.execute(
+                f"""SELECT DISTINCT session_id FROM {table}
+                    WHERE session_id NOT IN (SELECT session_id FROM sessions) LIMIT ?""",
+                (limit,)
+            ).fetchall()]
+            deleted += self._delete_sessions(cursor, orphan_ids, [table])
+
+        conn.commit()
+        return deleted
+
+    @_in_db_thread
+    def purge_records(self, before: float, limit: int) -> int:
+        """Delete up to ``limit`` finished jobs and idempotency keys each created before ``before``."""
+        conn = self._get_conn()
+        cursor = conn.cursor()
+
+        cursor.execute(
+            """DELETE FROM jobs WHERE job_id IN (
+                   SELECT job_id FROM jobs WHERE status IN (?, ?) AND created_at < ? LIMIT ?
+               )""",
+            (Job.SUCCEEDED, Job.FAILED, before, limit)
+        )
+        deleted = cursor.rowcount
+        cursor.execute(
+            """DELETE FROM idempotency_keys WHERE (session_id, idempotency_key) IN (
+                   SELECT session_id, idempotency_key FROM idempotency_keys WHERE created_at < ? LIMIT ?
+               )""",
+            (before, limit)
+        )
+        deleted += cursor.rowcount
+
+        conn.commit()
+        return deleted
+
+    @_in_db_thread
+    def incremental_vacuum(self, pages: int) -> int:
+        """Return up to ``pages`` free pages to the filesystem; returns how many were freed.
+
+        New database files use auto_vacuum=INCREMENTAL; older ones need a
+        one-off full VACUUM to switch (see ``_init_db``).
+        """
+        conn = self._get_conn()
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            return 0
+
+        free_before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if not free_before:
+            return 0
+        conn.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+        free_after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if not free_after:
+            # Done: shrink the WAL, which grew by every page just moved
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+        return free_before - free_after
+
+    @staticmethod
+    def _job_from_row(row: sqlite3.Row) -> Job:
+        return Job(
+            job_id=row['job_id'],
+            session_id=row['session_id'],
+            action=row['action'],
+            input_data=json.loads(row['input_data']),
+            status=row['status'],
+            result=json.loads(row['result']) if row['result'] else None,
+            error=row['error'],
+            status_code=row['status_code'],
+            idempotency_key=row['idempotency_key'],
+            created_at=row['created_at'],
+            updated_at=row['updated_at']
+        )
+
+
+class ShardedDatabase:
+    """SQLite split across N files by session, each a ``Database`` with its own writer.
+
+    A session's rows (and its idempotency keys) live in the shard chosen by a
+    stable hash of its ``session_id``, so transitions of different players
+    commit in parallel. Jobs are placed by ``job_id`` so they can be looked
+    up without a session; the global mirror caches live in shard 0.
+    Cross-session queries fan out to every shard and merge.
+
+    The shard count must stay fixed once data exists: changing it re-routes
+    existing sessions to files that do not hold them.
+    """
+
+    def __init__(self, db_path: str = "data/game.db", shards: int = 4):
+        root, ext = os.path.splitext(db_path)
+        self.shards = [Database(f"{root}.shard{i}{ext}") for i in range(shards)]
+
+    def _shard(self, key: str) -> Database:
+        return self.shards[zlib.crc32(key.encode()) % len(self.shards)]
+
+    @property
+    def _home(self) -> Database:
+        return self.shards[0]
+
+    async def connect(self):
+        await asyncio.gather(*(shard.connect() for shard in self.shards))
+
+    def close(self):
+        for shard in self.shards:
+            shard.close()
+
+    async def aclose(self):
+        self.close()
+
+    def unit_of_work(self, session_id: str):
+        return self._shard(session_id).unit_of_work(session_id)
+
+    async def load_work(self, session_id: str) -> UnitOfWork:
+        return await self._shard(session_id).load_work(session_id)
+
+    async def commit_work(self, uow: UnitOfWork):
+        await self._shard(uow.session_id).commit_work(uow)
+
+    # Session-scoped operations
+    async def create_session(self, session_id: str, state: str, data: dict) -> SessionState:
+        return await self._shard(session_id).create_session(session_id, state, data)
+
+    async def get_session(self, session_id: str) -> Optional[SessionState]:
+        return await self._shard(session_id).get_session(session_id)
+
+    async def update_session(self, session_id: str, state: str, data: dict):
+        await self._shard(session_id).update_session(session_id, state, data)
+
+    async def get_session_history(self, session_id: str) -> List[SessionEvent]:
+        return await self._shard(session_id).get_session_history(session_id)
+
+    async def delete_session(self, session_id: str):
+        # The session's jobs may sit in any shard
+        await asyncio.gather(*(shard.delete_session(session_id) for shard in self.shards))
+
+    async def insert_cost_log(self, session_id: str, state: str, prompt_tokens: int,
+                              completion_tokens: int, cost_usd: float, model: str):
+        await self._shard(session_id).insert_cost_log(
+            session_id, state, prompt_tokens, completion_tokens, cost_usd, model
+        )
+
+    async def get_total_cost(self, session_id: str) -> float:
+        return await self._shard(session_id).get_total_cost(session_id)
+
+    async def get_cost_summary(self, session_id: str) -> dict:
+        return await self._shard(session_id).get_cost_summary(session_id)
+
+    async def get_cost_by_state(self, session_id: str) -> Dict[str, float]:
+        return await self._shard(session_id).get_cost_by_state(session_id)
+
+    async def get_cost_by_model(self, session_id: str) -> Dict[str, float]:
+        return await self._shard(session_id).get_cost_by_model(session_id)
+
+    async def get_cost_log(self, session_id: str) -> List[CostEntry]:
+        return await self._shard(session_id).get_cost_log(session_id)
+
+    async def save_character(self, session_id: str, character: Character):
+        await self._shard(session_id).save_character(session_id, character)
+
+    async def get_character(self, session_id: str) -> Optional[Character]:
+        return await self._shard(session_id).get_character(session_id)
+
+    async def add_timeline_event(self, session_id: str, event: TimelineEvent):
+        await self._shard(session_id).add_timeline_event(session_id, event)
+
+    async def get_timeline(self, session_id: str) -> List[TimelineEvent]:
+        return await self._shard(session_id).get_timeline(session_id)
+
+    async def save_pending_result(self, session_id: str, state: str, chapter: int, result: dict):
+        await self._shard(session_id).save_pending_result(session_id, state, chapter, result)
+
+    async def get_pending_result(self, session_id: str, state: str, chapter: int) -> Optional[dict]:
+        return await self._shard(session_id).get_pending_result(session_id, state, chapter)
+
+    async def get_idempotent_response(self, session_id: str, idempotency_key: str) -> Optional[dict]:
+        return await self._shard(session_id).get_idempotent_response(session_id, idempotency_key)
+
+    # Global operations
+    async def get_usage_summary(self) -> dict:
+        summaries = await asyncio.gather(*(shard.get_usage_summary() for shard in self.shards))
+        return {
+            key: sum(summary[key] for summary in summaries)
+            for key in ("sessions", "total_cost_usd", "num_api_calls")
+        }
+
+    async def get_mirror_cache(self, cache_key: str, min_created_at: float) -> Optional[Tuple[dict, float]]:
+        return await self._home.get_mirror_cache(cache_key, min_created_at)
+
+    async def put_mirror_cache(self, cache_key: str, analysis: dict, max_entries: int):
+        await self._home.put_mirror_cache(cache_key, analysis, max_entries)
+
+    async def get_mirror_precomputed(self, person_key: str, prompt_version: int,
+                                     model: str) -> Optional[dict]:
+        return await self._home.get_mirror_precomputed(person_key, prompt_version, model)
+
+    async def get_mirror_precomputed_keys(self, prompt_version: int, model: str) -> List[str]:
+        return await self._home.get_mirror_precomputed_keys(prompt_version, model)
+
+    async def put_mirror_precomputed(self, rows: List[tuple]):
+        await self._home.put_mirror_precomputed(rows)
+
+    async def create_job(self, job_id: str, session_id: str, action: str, input_data: dict,
+                         idempotency_key: Optional[str] = None, owner: Optional[str] = None) -> Job:
+        return await self._shard(job_id).create_job(
+            job_id, session_id, action, input_data, idempotency_key, owner
+        )
+
+    async def get_job(self, job_id: str) -> Optional[Job]:
+        return await self._shard(job_id).get_job(job_id)
+
+    async def claim_jobs(self, owner: str, stale_before: float) -> List[Job]:
+        per_shard = await asyncio.gather(*(shard.claim_jobs(owner, stale_before) for shard in self.shards))
+        return sorted((job for jobs in per_shard for job in jobs), key=lambda job: job.created_at)
+
+    async def update_job(self, job_id: str, status: str, result: Optional[dict] = None,
+                         error: Optional[str] = None, status_code: Optional[int] = None):
+        await self._shard(job_id).update_job(job_id, status, result, error, status_code)
+
+    # Maintenance runs on every shard, ``limit`` per shard
+    async def expire_sessions(self, idle_before: str, keep_state: str, limit: int) -> Tuple[List[str], int]:
+        results = await asyncio.gather(
+            *(shard.expire_sessions(idle_before, keep_state, limit) for shard in self.shards)
+        )
+        return [sid for session_ids, _ in results for sid in session_ids], sum(rows for _, rows in results)
+
+    async def archive_sessions(self, state: str, idle_before: str, limit: int) -> Tuple[List[str], int]:
+        results = await asyncio.gather(
+            *(shard.archive_sessions(state, idle_before, limit) for shard in self.shards)
+        )
+        return [sid for session_ids, _ in results for sid in session_ids], sum(rows for _, rows in results)
+
+    async def get_archived_session(self, session_id: str) -> Optional[dict]:
+        return await self._shard(session_id).get_archived_session(session_id)
+
+    async def delete_orphans(self, limit: int) -> int:
+        return sum(await asyncio.gather(*(shard.delete_orphans(limit) for shard in self.shards)))
+
+    async def purge_records(self, before: float, limit: int) -> int:
+        return sum(await asyncio.gather(*(shard.purge_records(before, limit) for shard in self.shards)))
+
+    async def incremental_vacuum(self, pages: int) -> int:
+        return sum(await asyncio.gather(*(shard.incremental_vacuum(pages) for shard in self.shards)))
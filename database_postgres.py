@@ -0,0 +1,906 @@
+"""PostgreSQL storage backend (asyncpg).
+
+Mirrors ``Database`` operation for operation so several app containers can
+share one database. Selected with DATABASE_URL=postgresql://...; see
+``storage.create_storage``.
+"""
+import json
+import os
+import time
+import zlib
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import asyncpg
+
+from database import (
+    ARCHIVED_TABLES, ORPHAN_TABLES, SESSION_TABLES, SessionConflictError, UnitOfWork, cost_aggregates
+)
+from models import SessionState, SessionEvent, CostEntry, Character, TimelineEvent, Job
+
+
+# Schema migrations, applied in order and recorded in schema_version, as for
+# SQLite. Versions are independent of the SQLite list; never edit an applied
+# migration - append a new one.
+MIGRATIONS = [
+    (1, "initial schema", [
+        """
+        CREATE TABLE IF NOT EXISTS sessions (
+            session_id TEXT PRIMARY KEY,
+            state TEXT NOT NULL,
+            data JSONB NOT NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+            updated_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc')
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS cost_log (
+            id BIGINT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+            session_id TEXT NOT NULL,
+            state TEXT NOT NULL,
+            prompt_tokens INTEGER NOT NULL,
+            completion_tokens INTEGER NOT NULL,
+            cost_usd DOUBLE PRECISION NOT NULL,
+            model TEXT NOT NULL,
+            timestamp TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc')
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_cost_log_session ON cost_log (session_id, timestamp)",
+        """
+        CREATE TABLE IF NOT EXISTS session_costs (
+            session_id TEXT PRIMARY KEY,
+            total_cost_usd DOUBLE PRECISION NOT NULL DEFAULT 0,
+            prompt_tokens BIGINT NOT NULL DEFAULT 0,
+            completion_tokens BIGINT NOT NULL DEFAULT 0,
+            num_api_calls BIGINT NOT NULL DEFAULT 0
+        )
+        """,
+        # dimension is 'state' or 'model'
+        """
+        CREATE TABLE IF NOT EXISTS session_cost_breakdown (
+            session_id TEXT NOT NULL,
+            dimension TEXT NOT NULL,
+            key TEXT NOT NULL,
+            cost_usd DOUBLE PRECISION NOT NULL DEFAULT 0,
+            PRIMARY KEY (session_id, dimension, key)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS characters (
+            session_id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            order_type TEXT NOT NULL,
+            archetype TEXT NOT NULL,
+            backstory JSONB NOT NULL,
+            current_chapter INTEGER NOT NULL DEFAULT 1,
+            coherence_level DOUBLE PRECISION NOT NULL DEFAULT 1.0
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS timeline_events (
+            id BIGINT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+            session_id TEXT NOT NULL,
+            chapter INTEGER NOT NULL,
+            narrative TEXT NOT NULL,
+            transformation TEXT,
+            timestamp TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc')
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_timeline_session_chapter ON timeline_events (session_id, chapter)",
+        """
+        CREATE TABLE IF NOT EXISTS pending_results (
+            session_id TEXT NOT NULL,
+            state TEXT NOT NULL,
+            chapter INTEGER NOT NULL,
+            result JSONB NOT NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+            PRIMARY KEY (session_id, state, chapter)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS mirror_cache (
+            cache_key TEXT PRIMARY KEY,
+            analysis JSONB NOT NULL,
+            created_at DOUBLE PRECISION NOT NULL,
+            last_used_at DOUBLE PRECISION NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_mirror_cache_last_used ON mirror_cache (last_used_at)",
+        """
+        CREATE TABLE IF NOT EXISTS mirror_precomputed (
+            person_key TEXT NOT NULL,
+            prompt_version INTEGER NOT NULL,
+            admired_person TEXT NOT NULL,
+            model TEXT NOT NULL,
+            analysis JSONB NOT NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+            PRIMARY KEY (person_key, prompt_version)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id TEXT PRIMARY KEY,
+            session_id TEXT NOT NULL,
+            action TEXT NOT NULL,
+            input_data JSONB NOT NULL,
+            status TEXT NOT NULL,
+            result JSONB,
+            error TEXT,
+            status_code INTEGER,
+            idempotency_key TEXT,
+            created_at DOUBLE PRECISION NOT NULL,
+            updated_at DOUBLE PRECISION NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_jobs_session ON jobs (session_id)",
+        """
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            session_id TEXT NOT NULL,
+            idempotency_key TEXT NOT NULL,
+            response JSONB NOT NULL,
+            created_at DOUBLE PRECISION NOT NULL,
+            PRIMARY KEY (session_id, idempotency_key)
+        )
+        """,
+    ]),
+    (2, "append-only session event log", [
+        """
+        CREATE TABLE IF NOT EXISTS session_events (
+            session_id TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            state TEXT NOT NULL,
+            delta JSONB NOT NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+            PRIMARY KEY (session_id, seq)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS session_snapshots (
+            session_id TEXT PRIMARY KEY,
+            seq INTEGER NOT NULL,
+            data JSONB NOT NULL
+        )
+        """,
+        "ALTER TABLE sessions ADD COLUMN IF NOT EXISTS last_seq INTEGER NOT NULL DEFAULT 0",
+        # Existing sessions start their log with their current data
+        """
+        INSERT INTO session_events (session_id, seq, state, delta, created_at)
+        SELECT session_id, 0, state, data, updated_at FROM sessions
+        """,
+        # sessions.data is no longer read; empty it so state updates stay small
+        "UPDATE sessions SET data = '{}'",
+    ]),
+    (3, "session archive and expiry index", [
+        """
+        CREATE TABLE IF NOT EXISTS session_archive (
+            session_id TEXT PRIMARY KEY,
+            state TEXT NOT NULL,
+            created_at TIMESTAMP,
+            updated_at TIMESTAMP,
+            total_cost_usd DOUBLE PRECISION NOT NULL DEFAULT 0,
+            archived_at DOUBLE PRECISION NOT NULL,
+            payload BYTEA NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_sessions_state_updated ON sessions (state, updated_at)",
+        "CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions (updated_at)",
+    ]),
+    (4, "job ownership leases", [
+        # The node holding a job; it re-stamps updated_at while the job is unfinished
+        "ALTER TABLE jobs ADD COLUMN IF NOT EXISTS owner TEXT",
+    ]),
+    (5, "precomputed mirror analyses keyed by model", [
+        """
+        ALTER TABLE mirror_precomputed
+            DROP CONSTRAINT mirror_precomputed_pkey,
+            ADD PRIMARY KEY (person_key, prompt_version, model)
+        """,
+    ]),
+]
+
+# Job fields, as selected into ``Job`` (the owning node stays internal)
+_JOB_COLUMNS = """job_id, session_id, action, input_data, status, result, error, status_code,
+                  idempotency_key, created_at, updated_at"""
+
+# Serializes migrations when several app containers start at once
+_MIGRATION_LOCK_ID = 7_431_202
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+class PostgresDatabase:
+    """PostgreSQL database manager.
+
+    Operations run on connections from an asyncpg pool sized by PG_POOL_MIN /
+    PG_POOL_MAX. A unit of work commits its buffered writes in one
+    transaction, with multi-row writes batched through ``executemany``.
+    JSON columns are JSONB and round-trip as Python objects.
+    """
+
+    def __init__(self, dsn: str):
+        self.dsn = dsn
+        self.pool_min = int(os.getenv("PG_POOL_MIN", 2))
+        self.pool_max = int(os.getenv("PG_POOL_MAX", 10))
+        self.snapshot_interval = int(os.getenv("SESSION_SNAPSHOT_INTERVAL", 8))
+        self._pool: Optional[asyncpg.Pool] = None
+
+    async def connect(self):
+        """Open the pool and apply pending migrations."""
+        self._pool = await asyncpg.create_pool(
+            self.dsn,
+            min_size=self.pool_min,
+            max_size=self.pool_max,
+            init=self._init_connection
+        )
+        await self._init_db()
+
+    async def aclose(self):
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    @staticmethod
+    async def _init_connection(conn: asyncpg.Connection):
+        for type_name in ("json", "jsonb"):
+            await conn.set_type_codec(
+                type_name, encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
+            )
+
+    async def _init_db(self):
+        """Initialize database schema by applying pending migrations."""
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute("SELECT pg_advisory_xact_lock($1)", _MIGRATION_LOCK_ID)
+                await conn.execute("""
+                    CREATE TABLE IF NOT EXISTS schema_version (
+                        version INTEGER PRIMARY KEY,
+                        description TEXT NOT NULL,
+                        applied_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc')
+                    )
+                """)
+                current = await conn.fetchval("SELECT MAX(version) FROM schema_version") or 0
+
+                for version, description, statements in MIGRATIONS:
+                    if version <= current:
+                        continue
+                    for statement in statements:
+                        await conn.execute(statement)
+                    await conn.execute(
+                        "INSERT INTO schema_version (version, description) VALUES ($1, $2)",
+                        version, description
+                    )
+                    print(f"Applied schema migration {version}: {description}")
+
+    # Unit of work
+    @asynccontextmanager
+    async def unit_of_work(self, session_id: str):
+        """Load a session and character once and commit buffered writes atomically.
+
+        Nothing is written if the block raises.
+        """
+        uow = await self.load_work(session_id)
+        yield uow
+        await self.commit_work(uow)
+
+    async def load_work(self, session_id: str) -> UnitOfWork:
+        """Start a unit of work with the session, character and cost read from one snapshot."""
+        async with self._pool.acquire() as conn:
+            async with conn.transaction(isolation="repeatable_read", readonly=True):
+                return UnitOfWork(
+                    session_id,
+                    await self._read_session(conn, session_id),
+                    await self._read_character(conn, session_id),
+                    await self._read_total_cost(conn, session_id),
+                    await conn.fetchval("SELECT last_seq FROM sessions WHERE session_id = $1", session_id)
+                )
+
+    async def commit_work(self, uow: UnitOfWork):
+        """Write a unit of work's buffered changes in one transaction.
+
+        Raises SessionConflictError, writing nothing, if the session moved
+        on since the unit of work was loaded (e.g. another node committed a
+        transition of it) or its idempotency key is already stored.
+        """
+        seq = uow.seq
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                if uow.cost_entries:
+                    await self._write_cost_entries(conn, uow.session_id, uow.cost_entries)
+                if uow.timeline_events:
+                    await self._write_timeline_events(conn, uow.session_id, uow.timeline_events)
+                if uow.character_dirty:
+                    await self._write_character(conn, uow.session_id, uow.character)
+                if uow.next_state is not None:
+                    seq = await self._write_session(conn, uow.session_id, uow.next_state,
+                                                    uow.next_data, uow.next_delta, expected_seq=uow.seq)
+                if uow.consumed_pending:
+                    await conn.executemany(
+                        "DELETE FROM pending_results WHERE session_id = $1 AND state = $2 AND chapter = $3",
+                        [(uow.session_id, state, chapter) for state, chapter in uow.consumed_pending]
+                    )
+                if uow.idempotent_response is not None:
+                    key, response = uow.idempotent_response
+                    stored = await conn.fetchval(
+                        """INSERT INTO idempotency_keys (session_id, idempotency_key, response, created_at)
+                           VALUES ($1, $2, $3, $4) ON CONFLICT DO NOTHING RETURNING true""",
+                        uow.session_id, key, response, time.time()
+                    )
+                    if not stored:
+                        raise SessionConflictError(uow.session_id)
+        uow.seq = seq
+
+    # Session operations
+    async def create_session(self, session_id: str, state: str, data: dict) -> SessionState:
+        """Create a new session."""
+        now = datetime.utcnow()
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(
+                    """INSERT INTO sessions (session_id, state, data, created_at, updated_at)
+                       VALUES ($1, $2, '{}', $3, $3)""",
+                    session_id, state, now
+                )
+                await conn.execute(
+                    """INSERT INTO session_events (session_id, seq, state, delta, created_at)
+                       VALUES ($1, 0, $2, $3, $4)""",
+                    session_id, state, data, now
+                )
+
+        return SessionState(
+            session_id=session_id,
+            state=state,
+            data=data,
+            created_at=now.isoformat(),
+            updated_at=now.isoformat()
+        )
+
+    async def get_session(self, session_id: str) -> Optional[SessionState]:
+        """Get session by ID."""
+        async with self._pool.acquire() as conn:
+            return await self._read_session(conn, session_id)
+
+    async def _read_session(self, conn: asyncpg.Connection, session_id: str) -> Optional[SessionState]:
+        """Rebuild a session from its latest snapshot and the events after it."""
+        row = await conn.fetchrow(
+            """SELECT s.state, s.created_at, s.updated_at, snap.seq, snap.data
+               FROM sessions s LEFT JOIN session_snapshots snap USING (session_id)
+               WHERE s.session_id = $1""",
+            session_id
+        )
+        if not row:
+            return None
+
+        data = row['data'] if row['data'] is not None else {}
+        seq = row['seq'] if row['seq'] is not None else -1
+        for event in await conn.fetch(
+            "SELECT delta FROM session_events WHERE session_id = $1 AND seq > $2 ORDER BY seq",
+            session_id, seq
+        ):
+            data.update(event['delta'])
+
+        return SessionState(
+            session_id=session_id,
+            state=row['state'],
+            data=data,
+            created_at=_isoformat(row['created_at']),
+            updated_at=_isoformat(row['updated_at'])
+        )
+
+    async def update_session(self, session_id: str, state: str, data: dict):
+        """Update session state."""
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                await self._write_session(conn, session_id, state, data)
+
+    async def _write_session(self, conn: asyncpg.Connection, session_id: str, state: str, data: dict,
+                             delta: Optional[dict] = None, expected_seq: Optional[int] = None) -> int:
+        """Append a transition event, snapshotting the full data every few events.
+
+        Without a ``delta`` the event carries the full data and is snapshotted
+        at once, so keys missing from it are dropped on read. Raises
+        ValueError if the session no longer exists (e.g. deleted mid-transition)
+        and SessionConflictError if its last event isn't ``expected_seq``.
+        Returns the new event's number.
+        """
+        now = datetime.utcnow()
+        seq = await conn.fetchval(
+            """UPDATE sessions SET state = $1, updated_at = $2, last_seq = last_seq + 1
+               WHERE session_id = $3 AND ($4::integer IS NULL OR last_seq = $4) RETURNING last_seq""",
+            state, now, session_id, expected_seq
+        )
+        if seq is None:
+            if await conn.fetchval("SELECT 1 FROM sessions WHERE session_id = $1", session_id):
+                raise SessionConflictError(session_id)
+            raise ValueError(f"Session {session_id} not found")
+
+        await conn.execute(
+            """INSERT INTO session_events (session_id, seq, state, delta, created_at)
+               VALUES ($1, $2, $3, $4, $5)""",
+            session_id, seq, state, data if delta is None else delta, now
+        )
+        if delta is None or seq % self.snapshot_interval == 0:
+            await conn.execute(
+                """INSERT INTO session_snapshots (session_id, seq, data) VALUES ($1, $2, $3)
+                   ON CONFLICT (session_id) DO UPDATE SET seq = excluded.seq, data = excluded.data""",
+                session_id, seq, data
+            )
+        return seq
+
+    async def get_session_history(self, session_id: str) -> List[SessionEvent]:
+        """Get a session's logged transitions, oldest first."""
+        rows = await self._pool.fetch(
+            "SELECT seq, state, delta, created_at FROM session_events WHERE session_id = $1 ORDER BY seq",
+            session_id
+        )
+        return [
+            SessionEvent(seq=row['seq'], state=row['state'], delta=row['delta'],
+                         created_at=_isoformat(row['created_at']))
+            for row in rows
+        ]
+
+    async def delete_session(self, session_id: str):
+        """Delete a session and all related data."""
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                await self._delete_sessions(conn, [session_id])
+
+    async def _delete_sessions(self, conn: asyncpg.Connection, session_ids: List[str],
+                               tables: List[str] = SESSION_TABLES) -> int:
+        """Delete the sessions' rows from ``tables``; returns the number of rows deleted."""
+        if not session_ids:
+            return 0
+        deleted = 0
+        for table in tables:
+            status = await conn.execute(
+                f"DELETE FROM {table} WHERE session_id = ANY($1::text[])", session_ids
+            )
+            deleted += int(status.split()[-1])
+        return deleted
+
+    # Cost tracking operations
+    async def insert_cost_log(self, session_id: str, state: str, prompt_tokens: int,
+                              completion_tokens: int, cost_usd: float, model: str):
+        """Log cost for an API call."""
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                await self._write_cost_entries(conn, session_id, [
+                    CostEntry(state, prompt_tokens, completion_tokens, cost_usd, model, timestamp=None)
+                ])
+
+    async def _write_cost_entries(self, conn: asyncpg.Connection, session_id: str,
+                                  entries: List[CostEntry]):
+        await conn.executemany(
+            """INSERT INTO cost_log (session_id, state, prompt_tokens, completion_tokens, cost_usd, model)
+               VALUES ($1, $2, $3, $4, $5, $6)""",
+            [(session_id, e.state, e.prompt_tokens, e.completion_tokens, e.cost_usd, e.model)
+             for e in entries]
+        )
+
+        # Keep the running aggregates in step with the log
+        totals, breakdown = cost_aggregates(entries)
+        await conn.execute(
+            """INSERT INTO session_costs
+               (session_id, total_cost_usd, prompt_tokens, completion_tokens, num_api_calls)
+               VALUES ($1, $2, $3, $4, $5)
+               ON CONFLICT (session_id) DO UPDATE SET
+                   total_cost_usd = session_costs.total_cost_usd + excluded.total_cost_usd,
+                   prompt_tokens = session_costs.prompt_tokens + excluded.prompt_tokens,
+                   completion_tokens = session_costs.completion_tokens + excluded.completion_tokens,
+                   num_api_calls = session_costs.num_api_calls + excluded.num_api_calls""",
+            session_id, *totals
+        )
+        await conn.executemany(
+            """INSERT INTO session_cost_breakdown (session_id, dimension, key, cost_usd)
+               VALUES ($1, $2, $3, $4)
+               ON CONFLICT (session_id, dimension, key) DO UPDATE SET
+                   cost_usd = session_cost_breakdown.cost_usd + excluded.cost_usd""",
+            [(session_id, dimension, key, cost) for (dimension, key), cost in breakdown.items()]
+        )
+
+    async def get_total_cost(self, session_id: str) -> float:
+        """Get total cost for a session."""
+        async with self._pool.acquire() as conn:
+            return await self._read_total_cost(conn, session_id)
+
+    async def _read_total_cost(self, conn: asyncpg.Connection, session_id: str) -> float:
+        cost = await conn.fetchval(
+            "SELECT total_cost_usd FROM session_costs WHERE session_id = $1",
+            session_id
+        )
+        return cost if cost is not None else 0.0
+
+    async def get_cost_summary(self, session_id: str) -> dict:
+        """Get totals plus per-state and per-model cost for a session in one query."""
+        rows = await self._pool.fetch(
+            """SELECT 'total' AS dimension, NULL AS key, total_cost_usd AS cost,
+                      prompt_tokens, completion_tokens, num_api_calls
+               FROM session_costs WHERE session_id = $1
+               UNION ALL
+               SELECT dimension, key, cost_usd, NULL, NULL, NULL
+               FROM session_cost_breakdown WHERE session_id = $1""",
+            session_id
+        )
+
+        summary = {
+            "total_cost_usd": 0.0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "num_api_calls": 0,
+            "cost_by_state": {},
+            "cost_by_model": {}
+        }
+        for dimension, key, cost, prompt_tokens, completion_tokens, num_calls in rows:
+            if dimension == "total":
+                summary["total_cost_usd"] = cost
+                summary["prompt_tokens"] = prompt_tokens
+                summary["completion_tokens"] = completion_tokens
+                summary["num_api_calls"] = num_calls
+            else:
+                summary[f"cost_by_{dimension}"][key] = cost
+        return summary
+
+    async def get_cost_by_state(self, session_id: str) -> Dict[str, float]:
+        """Get cost breakdown by state."""
+        return await self._read_cost_breakdown(session_id, "state")
+
+    async def get_cost_by_model(self, session_id: str) -> Dict[str, float]:
+        """Get cost breakdown by model."""
+        return await self._read_cost_breakdown(session_id, "model")
+
+    async def _read_cost_breakdown(self, session_id: str, dimension: str) -> Dict[str, float]:
+        rows = await self._pool.fetch(
+            "SELECT key, cost_usd FROM session_cost_breakdown WHERE session_id = $1 AND dimension = $2",
+            session_id, dimension
+        )
+        return {row['key']: row['cost_usd'] for row in rows}
+
+    async def get_cost_log(self, session_id: str) -> List[CostEntry]:
+        """Get full cost log for a session."""
+        rows = await self._pool.fetch(
+            "SELECT * FROM cost_log WHERE session_id = $1 ORDER BY timestamp, id",
+            session_id
+        )
+
+        return [
+            CostEntry(
+                state=row['state'],
+                prompt_tokens=row['prompt_tokens'],
+                completion_tokens=row['completion_tokens'],
+                cost_usd=row['cost_usd'],
+                model=row['model'],
+                timestamp=_isoformat(row['timestamp'])
+            )
+            for row in rows
+        ]
+
+    async def get_usage_summary(self) -> dict:
+        """Get session count and cost totals across all sessions."""
+        row = await self._pool.fetchrow(
+            """SELECT (SELECT COUNT(*) FROM sessions) AS sessions,
+                      COALESCE(SUM(total_cost_usd), 0) AS cost,
+                      COALESCE(SUM(num_api_calls), 0) AS calls
+               FROM session_costs"""
+        )
+        return {"sessions": row['sessions'], "total_cost_usd": row['cost'], "num_api_calls": row['calls']}
+
+    # Character operations
+    async def save_character(self, session_id: str, character: Character):
+        """Save or update character."""
+        async with self._pool.acquire() as conn:
+            await self._write_character(conn, session_id, character)
+
+    async def _write_character(self, conn: asyncpg.Connection, session_id: str, character: Character):
+        await conn.execute(
+            """INSERT INTO characters
+               (session_id, name, order_type, archetype, backstory, current_chapter, coherence_level)
+               VALUES ($1, $2, $3, $4, $5, $6, $7)
+               ON CONFLICT (session_id) DO UPDATE SET
+                   name = excluded.name,
+                   order_type = excluded.order_type,
+                   archetype = excluded.archetype,
+                   backstory = excluded.backstory,
+                   current_chapter = excluded.current_chapter,
+                   coherence_level = excluded.coherence_level""",
+            session_id, character.name, character.order, character.archetype,
+            character.backstory, character.current_chapter, character.coherence_level
+        )
+
+    async def get_character(self, session_id: str) -> Optional[Character]:
+        """Get character for session."""
+        async with self._pool.acquire() as conn:
+            return await self._read_character(conn, session_id)
+
+    async def _read_character(self, conn: asyncpg.Connection, session_id: str) -> Optional[Character]:
+        row = await conn.fetchrow("SELECT * FROM characters WHERE session_id = $1", session_id)
+        if not row:
+            return None
+
+        return Character(
+            name=row['name'],
+            order=row['order_type'],
+            archetype=row['archetype'],
+            backstory=row['backstory'],
+            current_chapter=row['current_chapter'],
+            coherence_level=row['coherence_level']
+        )
+
+    # Timeline operations
+    async def add_timeline_event(self, session_id: str, event: TimelineEvent):
+        """Add timeline event."""
+        async with self._pool.acquire() as conn:
+            await self._write_timeline_events(conn, session_id, [event])
+
+    async def _write_timeline_events(self, conn: asyncpg.Connection, session_id: str,
+                                     events: List[TimelineEvent]):
+        await conn.executemany(
+            """INSERT INTO timeline_events (session_id, chapter, narrative, transformation)
+               VALUES ($1, $2, $3, $4)""",
+            [(session_id, e.chapter, e.narrative, e.transformation) for e in events]
+        )
+
+    async def get_timeline(self, session_id: str) -> List[TimelineEvent]:
+        """Get full timeline for session."""
+        rows = await self._pool.fetch(
+            "SELECT * FROM timeline_events WHERE session_id = $1 ORDER BY chapter, id",
+            session_id
+        )
+
+        return [
+            TimelineEvent(
+                chapter=row['chapter'],
+                narrative=row['narrative'],
+                transformation=row['transformation'],
+                timestamp=_isoformat(row['timestamp'])
+            )
+            for row in rows
+        ]
+
+    # Speculative generation operations
+    async def save_pending_result(self, session_id: str, state: str, chapter: int, result: dict):
+        """Store a speculatively generated result until a transition consumes it."""
+        await self._pool.execute(
+            """INSERT INTO pending_results (session_id, state, chapter, result)
+               VALUES ($1, $2, $3, $4)
+               ON CONFLICT (session_id, state, chapter) DO UPDATE SET
+                   result = excluded.result,
+                   created_at = excluded.created_at""",
+            session_id, state, chapter, result
+        )
+
+    async def get_pending_result(self, session_id: str, state: str, chapter: int) -> Optional[dict]:
+        """Get a stored speculative result, if any."""
+        return await self._pool.fetchval(
+            "SELECT result FROM pending_results WHERE session_id = $1 AND state = $2 AND chapter = $3",
+            session_id, state, chapter
+        )
+
+    # Greatness Mirror cache operations
+    async def get_mirror_cache(self, cache_key: str, min_created_at: float) -> Optional[Tuple[dict, float]]:
+        """Get (analysis, created_at) if cached after ``min_created_at``, marking it used."""
+        async with self._pool.acquire() as conn:
+            row = await conn.fetchrow(
+                "SELECT analysis, created_at FROM mirror_cache WHERE cache_key = $1",
+                cache_key
+            )
+            if not row:
+                return None
+
+            if row['created_at'] < min_created_at:
+                await conn.execute("DELETE FROM mirror_cache WHERE cache_key = $1", cache_key)
+                return None
+
+            await conn.execute(
+                "UPDATE mirror_cache SET last_used_at = $1 WHERE cache_key = $2",
+                time.time(), cache_key
+            )
+            return row['analysis'], row['created_at']
+
+    async def put_mirror_cache(self, cache_key: str, analysis: dict, max_entries: int):
+        """Store an analysis, evicting least recently used entries beyond ``max_entries``."""
+        now = time.time()
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(
+                    """INSERT INTO mirror_cache (cache_key, analysis, created_at, last_used_at)
+                       VALUES ($1, $2, $3, $4)
+                       ON CONFLICT (cache_key) DO UPDATE SET
+                           analysis = excluded.analysis,
+                           created_at = excluded.created_at,
+                           last_used_at = excluded.last_used_at""",
+                    cache_key, analysis, now, now
+                )
+                await conn.execute(
+                    """DELETE FROM mirror_cache WHERE cache_key IN (
+                           SELECT cache_key FROM mirror_cache ORDER BY last_used_at DESC OFFSET $1
+                       )""",
+                    max_entries
+                )
+
+    async def get_mirror_precomputed(self, person_key: str, prompt_version: int,
+                                     model: str) -> Optional[dict]:
+        """Get a precomputed analysis for a normalized name, if one was warmed for the model."""
+        return await self._pool.fetchval(
+            """SELECT analysis FROM mirror_precomputed
+               WHERE person_key = $1 AND prompt_version = $2 AND model = $3""",
+            person_key, prompt_version, model
+        )
+
+    async def get_mirror_precomputed_keys(self, prompt_version: int, model: str) -> List[str]:
+        """Get the normalized names already precomputed for a prompt version and model."""
+        rows = await self._pool.fetch(
+            "SELECT person_key FROM mirror_precomputed WHERE prompt_version = $1 AND model = $2",
+            prompt_version, model
+        )
+        return [row['person_key'] for row in rows]
+
+    async def put_mirror_precomputed(self, rows: List[tuple]):
+        """Bulk load (person_key, prompt_version, admired_person, model, analysis) rows."""
+        async with self._pool.acquire() as conn:
+            await conn.executemany(
+                """INSERT INTO mirror_precomputed
+                   (person_key, prompt_version, admired_person, model, analysis)
+                   VALUES ($1, $2, $3, $4, $5)
+                   ON CONFLICT (person_key, prompt_version, model) DO UPDATE SET
+                       admired_person = excluded.admired_person,
+                       analysis = excluded.analysis""",
+                rows
+            )
+
+    async def get_idempotent_response(self, session_id: str, idempotency_key: str) -> Optional[dict]:
+        """Get the stored response of a transition already run with this key."""
+        return await self._pool.fetchval(
+            "SELECT response FROM idempotency_keys WHERE session_id = $1 AND idempotency_key = $2",
+            session_id, idempotency_key
+        )
+
+    # Background job operations
+    async def create_job(self, job_id: str, session_id: str, action: str, input_data: dict,
+                         idempotency_key: Optional[str] = None, owner: Optional[str] = None) -> Job:
+        """Record a queued transition job, leased to node ``owner``."""
+        now = time.time()
+        await self._pool.execute(
+            """INSERT INTO jobs (job_id, session_id, action, input_data, status,
+                                 idempotency_key, owner, created_at, updated_at)
+               VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)""",
+            job_id, session_id, action, input_data, Job.QUEUED, idempotency_key, owner, now, now
+        )
+        return Job(job_id, session_id, action, input_data, Job.QUEUED,
+                   idempotency_key=idempotency_key, created_at=now, updated_at=now)
+
+    async def get_job(self, job_id: str) -> Optional[Job]:
+        """Get a job by ID."""
+        row = await self._pool.fetchrow(f"SELECT {_JOB_COLUMNS} FROM jobs WHERE job_id = $1", job_id)
+        return Job(**dict(row)) if row else None
+
+    async def claim_jobs(self, owner: str, stale_before: float) -> List[Job]:
+        """Take over unfinished jobs that are ``owner``'s, unowned, or whose lease lapsed.
+
+        Claiming stamps ``updated_at``, which renews the lease on the jobs
+        ``owner`` already holds; a lease has lapsed when it wasn't renewed
+        since ``stale_before``. Concurrent claims by several nodes each get
+        a job at most once: the row lock makes the later UPDATE re-check it.
+        Returns the claimed jobs, oldest first.
+        """
+        rows = await self._pool.fetch(
+            f"""UPDATE jobs SET owner = $1, updated_at = $2
+                WHERE status IN ($3, $4) AND (owner IS NULL OR owner = $1 OR updated_at < $5)
+                RETURNING {_JOB_COLUMNS}""",
+            owner, time.time(), Job.QUEUED, Job.RUNNING, stale_before
+        )
+        return sorted((Job(**dict(row)) for row in rows), key=lambda job: job.created_at)
+
+    async def update_job(self, job_id: str, status: str, result: Optional[dict] = None,
+                         error: Optional[str] = None, status_code: Optional[int] = None):
+        """Record a job's progress or outcome."""
+        await self._pool.execute(
+            """UPDATE jobs SET status = $1, result = $2, error = $3, status_code = $4, updated_at = $5
+               WHERE job_id = $6""",
+            status, result, error, status_code, time.time(), job_id
+        )
+
+    # Maintenance operations
+    async def expire_sessions(self, idle_before: str, keep_state: str, limit: int) -> Tuple[List[str], int]:
+        """Delete up to ``limit`` sessions last updated before ``idle_before``, except in ``keep_state``.
+
+        Returns the deleted session IDs and the number of rows removed.
+        """
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                rows = await conn.fetch(
+                    "SELECT session_id FROM sessions WHERE updated_at < $1 AND state != $2 LIMIT $3",
+                    datetime.fromisoformat(idle_before), keep_state, limit
+                )
+                session_ids = [row['session_id'] for row in rows]
+                return session_ids, await self._delete_sessions(conn, session_ids)
+
+    async def archive_sessions(self, state: str, idle_before: str, limit: int) -> Tuple[List[str], int]:
+        """Move up to ``limit`` sessions in ``state`` last updated before ``idle_before`` to the archive.
+
+        Each session_archive row holds the session's rows from ARCHIVED_TABLES
+        as zlib-compressed JSON. Returns the archived session IDs and the
+        number of live rows removed.
+        """
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                rows = await conn.fetch(
+                    "SELECT session_id FROM sessions WHERE state = $1 AND updated_at < $2 LIMIT $3",
+                    state, datetime.fromisoformat(idle_before), limit
+                )
+                session_ids = [row['session_id'] for row in rows]
+                now = time.time()
+                for session_id in session_ids:
+                    tables = {
+                        table: [dict(row) for row in await conn.fetch(
+                            f"SELECT * FROM {table} WHERE session_id = $1", session_id
+                        )]
+                        for table in ARCHIVED_TABLES
+                    }
+                    session = tables["sessions"][0]
+                    costs = tables["session_costs"]
+                    await conn.execute(
+                        """INSERT INTO session_archive
+                           (session_id, state, created_at, updated_at, total_cost_usd, archived_at, payload)
+                           VALUES ($1, $2, $3, $4, $5, $6, $7)
+                           ON CONFLICT (session_id) DO UPDATE SET
+                               state = excluded.state,
+                               created_at = excluded.created_at,
+                               updated_at = excluded.updated_at,
+                               total_cost_usd = excluded.total_cost_usd,
+                               archived_at = excluded.archived_at,
+                               payload = excluded.payload""",
+                        session_id, session['state'], session['created_at'], session['updated_at'],
+                        costs[0]['total_cost_usd'] if costs else 0.0, now,
+                        zlib.compress(json.dumps(tables, default=str).encode())
+                    )
+                return session_ids, await self._delete_sessions(conn, session_ids)
+
+    async def get_archived_session(self, session_id: str) -> Optional[dict]:
+        """Get an archived session's rows, keyed by table."""
+        payload = await self._pool.fetchval(
+            "SELECT payload FROM session_archive WHERE session_id = $1", session_id
+        )
+        return json.loads(zlib.decompress(payload)) if payload is not None else None
+
+    async def delete_orphans(self, limit: int) -> int:
+        """Delete the rows of up to ``limit`` vanished sessions from each table; returns rows deleted."""
+        deleted = 0
+        async with self._pool.acquire() as conn:
+            for table in ORPHAN_TABLES:
+                async with conn.transaction():
+                    rows = await conn.fetch(
+                        f"""SELECT DISTINCT t.session_id FROM {table} t
+                            WHERE NOT EXISTS (SELECT 1 FROM sessions s WHERE s.session_id = t.session_id)
+                            LIMIT $1""",
+                        limit
+                    )
+                    deleted += await self._delete_sessions(
+                        conn, [row['session_id'] for row in rows], [table]
+                    )
+        return deleted
+
+    async def purge_records(self, before: float, limit: int) -> int:
+        """Delete up to ``limit`` finished jobs and idempotency keys each created before ``before``."""
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                jobs = await conn.execute(
+                    """DELETE FROM jobs WHERE job_id IN (
+                           SELECT job_id FROM jobs WHERE status IN ($1, $2) AND created_at < $3 LIMIT $4
+                       )""",
+                    Job.SUCCEEDED, Job.FAILED, before, limit
+                )
+                keys = await conn.execute(
+                    """DELETE FROM idempotency_keys WHERE (session_id, idempotency_key) IN (
+                           SELECT session_id, idempotency_key FROM idempotency_keys
+                           WHERE created_at < $1 LIMIT $2
+                       )""",
+                    before, limit
+                )
+        return int(jobs.split()[-1]) + int(keys.split()[-1])
+
+    async def incremental_vacuum(self, pages: int) -> int:
+        """Nothing to do: autovacuum reclaims dead rows in PostgreSQL."""
+        return 0
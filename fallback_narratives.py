@@ -0,0 +1,134 @@
+"""Template narratives used when the LLM is unavailable or too slow.
+
+Chapter text is filled in from per-Order x per-chapter templates and the
+character's backstory, so a session stays playable during an outage.
+"""
+from typing import Dict, Tuple
+
+from models import Character
+import prompts
+
+
+# Imagery for each Order, woven into the templates
+ORDER_VOICES = {
+    "mythic": {
+        "practice": "sketching visions no one else can see yet",
+        "image": "a half-drawn map of a world that does not exist yet",
+        "gift": "the sight to show others what could be"
+    },
+    "spartan": {
+        "practice": "training when no one is watching",
+        "image": "a worn training ground at first light",
+        "gift": "the strength that comes from keeping every promise to yourself"
+    },
+    "atelier": {
+        "practice": "refining the same piece until it is true",
+        "image": "a workbench covered in careful, unfinished work",
+        "gift": "the patience that turns effort into craft"
+    },
+    "zen": {
+        "practice": "sitting with what is, without flinching",
+        "image": "still water after a long storm",
+        "gift": "the clarity to see what actually matters"
+    },
+    "athlete": {
+        "practice": "showing up to compete against your own best",
+        "image": "the starting line before the whistle",
+        "gift": "the nerve to perform when it counts"
+    },
+    "commander": {
+        "practice": "organizing chaos into a plan others can follow",
+        "image": "a war table strewn with plans",
+        "gift": "the steadiness that lets others trust you"
+    },
+    "futurist": {
+        "practice": "tracing patterns others dismiss as noise",
+        "image": "a night sky of connected points",
+        "gift": "the foresight to build for what is coming"
+    }
+}
+
+BEFORE_TEMPLATE = (
+    "{{name}}, you stand at the edge of Chapter {chapter}: {title}. "
+    "As {order_context}, you know {image}, but this is where you are: {{situation}}. "
+    "And this keeps pulling you back from {practice}: {{struggle}}. "
+    "This chapter is about {description_lower}, and that is exactly what feels out of reach today. "
+    "Something has to shift before you can climb higher."
+)
+
+AFTER_TEMPLATE = (
+    "{{name}}, the chapter of {title} has changed you. "
+    "What once held you back ({{struggle}}) no longer decides your day; you return to {practice} without waiting to feel ready. "
+    "You see {image} differently: not as a distance to cross, but as ground you already stand on. "
+    "Each small act of {title_lower} moves you toward {{greatness}}. "
+    "You have climbed a rung, and the view is wider from here."
+)
+
+INSIGHT_TEMPLATE = (
+    "You realize that {title_lower} is not something you wait for; it is something you practice. "
+    "You understand now that {gift} was never missing, only unused."
+)
+
+
+def _fill(value: str, default: str) -> str:
+    value = (value or "").strip().rstrip(".")
+    return value or default
+
+
+class FallbackNarrator:
+    """Renders chapter narratives from templates, without calling an LLM.
+
+    Templates are precomputed for every Order and chapter in
+    ``chapter_themes`` (passed in by the state machine, which owns them).
+    Responses have the same shape as ``OpenRouterClient.generate_narrative``
+    with zero usage and cost.
+    """
+
+    MODEL = "fallback/template"
+
+    def __init__(self, chapter_themes: Dict[int, dict]):
+        self._templates: Dict[Tuple[str, int], Dict[str, str]] = {}
+        for order, voice in ORDER_VOICES.items():
+            for chapter, theme in chapter_themes.items():
+                values = {
+                    "chapter": chapter,
+                    "title": theme["title"],
+                    "title_lower": theme["title"].lower(),
+                    "description_lower": theme["description"][0].lower() + theme["description"][1:],
+                    "order_context": prompts.ORDER_CONTEXTS.get(order, "a seeker"),
+                    **voice
+                }
+                self._templates[(order, chapter)] = {
+                    "before_narrative": BEFORE_TEMPLATE.format(**values),
+                    "after_narrative": AFTER_TEMPLATE.format(**values),
+                    "transformation_insight": INSIGHT_TEMPLATE.format(**values)
+                }
+
+    def chapter_before(self, character: Character) -> dict:
+        """Results for a chapter's 'before' state, keyed like its generation plan."""
+        return {"before_narrative": self._render(character, "before_narrative")}
+
+    def chapter_after(self, character: Character) -> dict:
+        """Results for a chapter's 'after' state, keyed like its generation plan."""
+        return {
+            "after_narrative": self._render(character, "after_narrative"),
+            "transformation_insight": self._render(character, "transformation_insight")
+        }
+
+    def _render(self, character: Character, field: str) -> dict:
+        templates = (self._templates.get((character.order, character.current_chapter))
+                     or self._templates[("mythic", 1)])
+        backstory = character.backstory or {}
+        narrative = templates[field].format(
+            name=character.name or "Seeker",
+            situation=_fill(backstory.get("situation"), "still finding your footing"),
+            struggle=_fill(backstory.get("struggle"), "old doubt"),
+            greatness=_fill(backstory.get("greatness"), "the greatness you came here for")
+        )
+        return {
+            "narrative": narrative,
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            "cost": 0.0,
+            "model": self.MODEL,
+            "extra_costs": []
+        }
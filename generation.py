@@ -0,0 +1,54 @@
+"""Dependency-aware execution of the LLM calls made during a transition."""
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+@dataclass
+class GenerationCall:
+    """One LLM call in a transition's plan.
+
+    ``run`` receives a dict of the results of the calls named in
+    ``depends_on``; calls with no dependency between them run concurrently.
+    """
+    name: str
+    run: Callable[[Dict[str, Any]], Awaitable[Any]]
+    depends_on: Tuple[str, ...] = field(default_factory=tuple)
+
+
+async def run_plan(calls: List[GenerationCall],
+                   timings: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """Run a plan of calls as concurrently as their dependencies allow.
+
+    Returns results keyed by call name. If ``timings`` is given, each call's
+    duration in seconds is recorded under its name.
+    """
+    names = {call.name for call in calls}
+    for call in calls:
+        missing = set(call.depends_on) - names
+        if missing:
+            raise ValueError(f"Generation call {call.name} depends on unknown calls: {sorted(missing)}")
+
+    tasks: Dict[str, asyncio.Task] = {}
+
+    async def execute(call: GenerationCall):
+        deps = {name: await tasks[name] for name in call.depends_on}
+        start = time.perf_counter()
+        result = await call.run(deps)
+        if timings is not None:
+            timings[call.name] = time.perf_counter() - start
+        return result
+
+    # Tasks don't start until we await, so every dependency exists by then
+    for call in calls:
+        tasks[call.name] = asyncio.ensure_future(execute(call))
+
+    try:
+        results = await asyncio.gather(*tasks.values())
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        raise
+
+    return dict(zip(tasks.keys(), results))
@@ -0,0 +1,139 @@
+"""Background execution of transitions that call the LLM."""
+import asyncio
+import os
+import socket
+import time
+import uuid
+from typing import List, Optional, Set
+
+from models import Job
+from openrouter import CircuitOpenError
+from state_machine_simple import GameStateMachine
+from storage import SessionConflictError, Storage
+
+
+class JobQueue:
+    """In-process worker pool over the durable ``jobs`` table.
+
+    ``submit`` records a job and returns immediately; JOB_WORKERS workers
+    run queued transitions and store their result or error for polling.
+
+    Each job is leased to the node that holds it (NODE_ID, default the
+    hostname), which renews the lease every JOB_LEASE / 3 seconds while the
+    job is unfinished. On ``start`` a node takes back its own unfinished
+    jobs, and it keeps claiming jobs whose lease lapsed for JOB_LEASE
+    seconds (their node died), so several nodes sharing one database never
+    run a live node's job. A job without an ``Idempotency-Key`` runs under
+    its ``job_id`` as the key, so rerunning one whose transition had
+    already committed replays the stored response instead of transitioning
+    again.
+    """
+
+    def __init__(self, db: Storage, game: GameStateMachine):
+        self.db = db
+        self.game = game
+        self.worker_count = int(os.getenv("JOB_WORKERS", 8))
+        self.node_id = os.getenv("NODE_ID") or socket.gethostname()
+        self.lease = float(os.getenv("JOB_LEASE", 60.0))
+        self._queue: "asyncio.Queue[Job]" = asyncio.Queue()
+        self._workers: List[asyncio.Task] = []
+        self._lease_task: Optional[asyncio.Task] = None
+        # Jobs queued or running here, so a claim never enqueues one twice
+        self._held: Set[str] = set()
+        self.claimed = 0
+
+    async def start(self):
+        """Start the workers, resume this node's unfinished jobs and keep leases fresh."""
+        await self._claim()
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.worker_count)]
+        self._lease_task = asyncio.create_task(self._renew_leases())
+
+    async def stop(self):
+        """Stop the workers; unfinished jobs resume on the next start (or on another node)."""
+        tasks = self._workers + ([self._lease_task] if self._lease_task else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._lease_task = None
+
+    async def submit(self, session_id: str, action: str, input_data: dict,
+                     idempotency_key: Optional[str] = None) -> Job:
+        """Queue a transition and return its job."""
+        job = await self.db.create_job(
+            str(uuid.uuid4()), session_id, action, input_data, idempotency_key, owner=self.node_id
+        )
+        self._enqueue(job)
+        return job
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        return await self.db.get_job(job_id)
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "held": len(self._held),
+            "workers": len(self._workers),
+            "claimed": self.claimed
+        }
+
+    def _enqueue(self, job: Job):
+        self._held.add(job.job_id)
+        self._queue.put_nowait(job)
+
+    async def _claim(self):
+        """Enqueue unfinished jobs that are ours, unowned, or abandoned by a dead node."""
+        for job in await self.db.claim_jobs(self.node_id, time.time() - self.lease):
+            if job.job_id not in self._held:
+                self.claimed += 1
+                self._enqueue(job)
+
+    async def _renew_leases(self):
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            try:
+                # Claiming re-stamps the jobs held here too, renewing their lease
+                await self._claim()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Job lease renewal failed: {e}")
+
+    async def _work(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._held.discard(job.job_id)
+                self._queue.task_done()
+
+    async def _run(self, job: Job):
+        await self._update(job, Job.RUNNING)
+        try:
+            result = await self.game.transition(
+                job.session_id, job.action, job.input_data,
+                idempotency_key=job.idempotency_key or job.job_id
+            )
+        except asyncio.CancelledError:
+            raise
+        except ValueError as e:
+            await self._update(job, Job.FAILED, error=str(e), status_code=400)
+        except SessionConflictError as e:
+            await self._update(job, Job.FAILED, error=str(e), status_code=409)
+        except CircuitOpenError as e:
+            await self._update(job, Job.FAILED, error=str(e), status_code=503)
+        except Exception as e:
+            print(f"Job {job.job_id} failed: {e}")
+            await self._update(job, Job.FAILED, error=str(e), status_code=500)
+        else:
+            await self._update(job, Job.SUCCEEDED, result=result, status_code=200)
+
+    async def _update(self, job: Job, status: str, **outcome):
+        """Record a job's status, logging instead of raising so the worker keeps draining."""
+        try:
+            await self.db.update_job(job.job_id, status, **outcome)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Job {job.job_id}: failed to record status {status}: {e}")
@@ -1,32 +1,67 @@
 """FastAPI backend for The Greatness Path game."""
+import asyncio
+import json
 import os
+from contextlib import asynccontextmanager
 from pathlib import Path
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
 
-from database import Database
-from openrouter import OpenRouterClient
+from storage import SessionConflictError, create_storage
+from session_cache import SessionCache
+from openrouter import CircuitOpenError, OpenRouterClient
 from cost_tracker import CostTracker
+from mirror_cache import MirrorCache
 from state_machine_simple import GameStateMachine
+from jobs import JobQueue
+from maintenance import Maintenance
 
 
 # Ensure data directory exists
 Path("data").mkdir(exist_ok=True)
 
 # Initialize components
-db = Database("data/game.db")
+db = create_storage()
+session_cache_size = int(os.getenv("SESSION_CACHE_SIZE", 10000))
+if session_cache_size > 0:
+    db = SessionCache(db, session_cache_size,
+                      int(os.getenv("SESSION_CACHE_MAX_BYTES", 64 * 1024 * 1024)))
 openrouter = OpenRouterClient()
 cost_tracker = CostTracker(db)
-game = GameStateMachine(db, openrouter, cost_tracker)
+mirror_cache = MirrorCache(db)
+game = GameStateMachine(db, openrouter, cost_tracker, mirror_cache)
+jobs = JobQueue(db, game)
+maintenance = Maintenance(db)
+
+# Transitions outliving a disconnected stream client are kept here until done
+background_tasks = set()
+
+# Seconds of silence on a transition stream before a keep-alive comment is sent
+sse_keepalive_interval = float(os.getenv("SSE_KEEPALIVE_INTERVAL", 15.0))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Startup/shutdown hooks."""
+    await db.connect()
+    await jobs.start()
+    await maintenance.start()
+    yield
+    await maintenance.stop()
+    await jobs.stop()
+    await openrouter.aclose()
+    await db.aclose()
+
 
 # FastAPI app
 app = FastAPI(
     title="The Greatness Path",
     description="Interactive journey through 8 chapters of greatness",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Mount static files
@@ -74,7 +109,7 @@ async def root():
 @app.post("/api/session", response_model=CreateSessionResponse)
 async def create_session():
     """Create a new game session."""
-    session_id = game.create_session()
+    session_id = await game.create_session()
     return CreateSessionResponse(
         session_id=session_id,
         state="welcome"
@@ -84,7 +119,7 @@ async def create_session():
 @app.get("/api/session/{session_id}", response_model=StateResponse)
 async def get_session(session_id: str):
     """Get current session state."""
-    state = game.get_current_state(session_id)
+    state = await game.get_current_state(session_id)
     if not state:
         raise HTTPException(status_code=404, detail="Session not found")
 
@@ -94,44 +129,165 @@ async def get_session(session_id: str):
 @app.delete("/api/session/{session_id}")
 async def delete_session(session_id: str):
     """Delete a session."""
-    db.delete_session(session_id)
+    await game.delete_session(session_id)
     return {"success": True}
 
 
 @app.post("/api/transition")
-async def transition(request: TransitionRequest):
-    """Execute a state transition."""
+async def transition(request: TransitionRequest,
+                     idempotency_key: Optional[str] = Header(None)):
+    """Execute a state transition.
+
+    Transitions that call the LLM are queued as a background job: the
+    response is 202 with a ``job_id`` to poll at ``/api/job/{job_id}``.
+    Others run inline and return the result directly. A request repeating
+    an ``Idempotency-Key`` already used for this session gets the stored
+    response instead of transitioning again. One that loses a race with
+    another transition of the same session (e.g. on another node) gets 409.
+    """
     try:
+        replay = await game.get_replay(request.session_id, idempotency_key)
+        if replay is not None:
+            return replay
+
+        if await game.needs_generation(request.session_id):
+            job = await jobs.submit(request.session_id, request.action, request.data, idempotency_key)
+            return JSONResponse(status_code=202, content={
+                "job_id": job.job_id,
+                "status": job.status,
+                "status_url": f"/api/job/{job.job_id}"
+            })
+
         result = await game.transition(
             request.session_id,
             request.action,
-            request.data
+            request.data,
+            idempotency_key=idempotency_key
         )
         return result
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except SessionConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e),
+                            headers={"Retry-After": str(int(e.retry_after) + 1)})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/transition/stream")
+async def transition_stream(request: TransitionRequest,
+                            idempotency_key: Optional[str] = Header(None)):
+    """Execute a state transition, streaming generated text as server-sent events.
+
+    Emits ``delta`` events ({"field", "text"}) while narratives generate, then
+    a single ``done`` event with the normal transition result, or ``error``.
+    A ``reset`` event ({"field"}) withdraws the text streamed for a field
+    whose generation failed or ran over budget; the template narrative that
+    replaces it arrives with ``done``.
+    While nothing else is sent, a ``: ping`` comment goes out every
+    SSE_KEEPALIVE_INTERVAL seconds so the connection never sits idle.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def on_delta(field: str, text: Optional[str]):
+        if text is None:
+            await queue.put(("reset", {"field": field}))
+        else:
+            await queue.put(("delta", {"field": field, "text": text}))
+
+    async def run():
+        try:
+            result = await game.transition(
+                request.session_id,
+                request.action,
+                request.data,
+                on_delta=on_delta,
+                idempotency_key=idempotency_key
+            )
+            await queue.put(("done", result))
+        except ValueError as e:
+            await queue.put(("error", {"status": 400, "detail": str(e)}))
+        except SessionConflictError as e:
+            await queue.put(("error", {"status": 409, "detail": str(e)}))
+        except CircuitOpenError as e:
+            await queue.put(("error", {"status": 503, "detail": str(e)}))
+        except Exception as e:
+            await queue.put(("error", {"status": 500, "detail": str(e)}))
+
+    # If the client goes away mid-stream the transition still completes and
+    # commits, so a retry or refresh picks up the result instead of paying again.
+    task = asyncio.create_task(run())
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+    async def events():
+        while True:
+            try:
+                event, payload = await asyncio.wait_for(queue.get(), sse_keepalive_interval)
+            except asyncio.TimeoutError:
+                # Steps that don't stream (the mirror analysis, the sales page)
+                # send nothing for a while; keep proxies from timing out
+                yield ": ping\n\n"
+                continue
+            yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+            if event not in ("delta", "reset"):
+                break
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.get("/api/cost/{session_id}", response_model=CostResponse)
 async def get_cost(session_id: str):
     """Get cost breakdown for session."""
-    report = cost_tracker.get_cost_report(session_id)
+    report = await cost_tracker.get_cost_report(session_id)
     return CostResponse(**report)
 
 
 @app.get("/api/timeline/{session_id}")
 async def get_timeline(session_id: str):
     """Get timeline for session."""
-    timeline = db.get_timeline(session_id)
+    timeline = await db.get_timeline(session_id)
     return {"timeline": [event.to_dict() for event in timeline]}
 
 
+@app.get("/api/session/{session_id}/history")
+async def get_session_history(session_id: str):
+    """Get the session's transition log: the state entered and the data changed at each step."""
+    events = await db.get_session_history(session_id)
+    if not events:
+        raise HTTPException(status_code=404, detail="Session history not found")
+    return {"session_id": session_id, "events": [event.to_dict() for event in events]}
+
+
+@app.get("/api/job/{job_id}")
+async def get_job(job_id: str):
+    """Get a background transition job's status, and its result once finished."""
+    job = await jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
 @app.get("/api/health")
 async def health():
     """Health check endpoint."""
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        "mirror_cache": mirror_cache.stats(),
+        "openrouter": openrouter.stats(),
+        "jobs": jobs.stats(),
+        "fallbacks_used": game.fallbacks_used,
+        "session_cache": db.stats() if isinstance(db, SessionCache) else None,
+        "maintenance": maintenance.stats(),
+        # Refreshed by each maintenance pass; counting here would scan storage on every probe
+        "storage": maintenance.usage
+    }
 
 
 if __name__ == "__main__":
@@ -0,0 +1,173 @@
+"""Background cleanup of abandoned and finished sessions.
+
+Usage (one pass, e.g. from cron when the app runs with MAINTENANCE_INTERVAL=0):
+    python maintenance.py
+
+A pass run as its own process can't reach the app's in-process session
+cache, which would keep serving the sessions it removed. Run the app with
+SESSION_CACHE_SIZE=0 when maintenance runs from cron, or leave maintenance
+to the app (MAINTENANCE_INTERVAL > 0).
+"""
+import argparse
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional
+
+from models import GameState
+from storage import Storage, create_storage
+
+
+class Maintenance:
+    """Periodically shrinks the database.
+
+    Every MAINTENANCE_INTERVAL seconds it:
+    - archives journeys that reached the sales page and were then idle for
+      ARCHIVE_AFTER seconds into compressed ``session_archive`` rows,
+    - expires every other session idle for SESSION_TTL seconds,
+    - deletes rows whose session no longer exists,
+    - purges finished jobs and idempotency keys older than RECORD_TTL,
+    - returns freed SQLite pages to the filesystem (incremental VACUUM),
+    - refreshes the session count and cost totals shown on /api/health,
+      which is too much work (and too slow under load) for the probe itself.
+
+    Each step works in batches of MAINTENANCE_BATCH_SIZE sessions, one short
+    transaction per batch, so request traffic gets the database in between.
+    """
+
+    def __init__(self, db: Storage):
+        self.db = db
+        self.interval = float(os.getenv("MAINTENANCE_INTERVAL", 3600))
+        self.session_ttl = float(os.getenv("SESSION_TTL", 7 * 24 * 3600))
+        self.archive_after = float(os.getenv("ARCHIVE_AFTER", 24 * 3600))
+        self.record_ttl = float(os.getenv("RECORD_TTL", 24 * 3600))
+        self.batch_size = int(os.getenv("MAINTENANCE_BATCH_SIZE", 100))
+        self.vacuum_pages = int(os.getenv("MAINTENANCE_VACUUM_PAGES", 256))
+
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.totals: Dict[str, int] = {
+            "sessions_archived": 0,
+            "sessions_expired": 0,
+            "rows_deleted": 0,
+            "pages_vacuumed": 0
+        }
+        self.last_run: Optional[dict] = None
+        self.usage: Optional[dict] = None
+
+    async def start(self):
+        """Start the periodic task (MAINTENANCE_INTERVAL=0 disables it)."""
+        if self.interval > 0:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Maintenance pass failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def run_once(self) -> dict:
+        """Run every step to completion and return what it reclaimed."""
+        start = time.perf_counter()
+        now = datetime.utcnow()
+        completed = GameState.SALES_PAGE.value
+        archive_before = (now - timedelta(seconds=self.archive_after)).isoformat()
+        expire_before = (now - timedelta(seconds=self.session_ttl)).isoformat()
+        report = {"timings": {}}
+
+        archived, rows = await self._sessions_step(
+            report, "archive",
+            lambda: self.db.archive_sessions(completed, archive_before, self.batch_size)
+        )
+        report["sessions_archived"] = archived
+        report["rows_deleted"] = rows
+
+        expired, rows = await self._sessions_step(
+            report, "expire",
+            lambda: self.db.expire_sessions(expire_before, completed, self.batch_size)
+        )
+        report["sessions_expired"] = expired
+        report["rows_deleted"] += rows
+
+        report["rows_deleted"] += await self._rows_step(
+            report, "orphans", lambda: self.db.delete_orphans(self.batch_size)
+        )
+        record_before = time.time() - self.record_ttl
+        report["rows_deleted"] += await self._rows_step(
+            report, "records", lambda: self.db.purge_records(record_before, self.batch_size)
+        )
+        report["pages_vacuumed"] = await self._rows_step(
+            report, "vacuum", lambda: self.db.incremental_vacuum(self.vacuum_pages)
+        )
+
+        usage_start = time.perf_counter()
+        self.usage = await self.db.get_usage_summary()
+        report["timings"]["usage"] = time.perf_counter() - usage_start
+
+        report["duration"] = time.perf_counter() - start
+        self.runs += 1
+        for key in self.totals:
+            self.totals[key] += report[key]
+        self.last_run = report
+        print(f"DEBUG: Maintenance pass: {report}")
+        return report
+
+    async def _sessions_step(self, report: dict, name: str,
+                             batch: Callable[[], Awaitable[tuple]]) -> tuple:
+        """Repeat a session batch until it comes back short; (sessions, rows) removed."""
+        start = time.perf_counter()
+        sessions = rows = 0
+        while True:
+            session_ids, deleted = await batch()
+            sessions += len(session_ids)
+            rows += deleted
+            if len(session_ids) < self.batch_size:
+                break
+            await asyncio.sleep(0)
+        report["timings"][name] = time.perf_counter() - start
+        return sessions, rows
+
+    async def _rows_step(self, report: dict, name: str,
+                         batch: Callable[[], Awaitable[int]]) -> int:
+        """Repeat a batch until it removes nothing; total removed."""
+        start = time.perf_counter()
+        total = 0
+        while True:
+            removed = await batch()
+            total += removed
+            if not removed:
+                break
+            await asyncio.sleep(0)
+        report["timings"][name] = time.perf_counter() - start
+        return total
+
+    def stats(self) -> dict:
+        """Totals since startup and the last pass, for monitoring."""
+        return {"runs": self.runs, **self.totals, "last_run": self.last_run}
+
+
+async def main(args) -> dict:
+    db = create_storage(args.db)
+    await db.connect()
+    try:
+        return await Maintenance(db).run_once()
+    finally:
+        await db.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run one maintenance pass")
+    parser.add_argument("--db", default="data/game.db",
+                        help="SQLite database path when DATABASE_URL is unset (default data/game.db)")
+    asyncio.run(main(parser.parse_args()))
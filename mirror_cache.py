@@ -0,0 +1,109 @@
+"""Cache of Greatness Mirror analyses, keyed on who the player admires."""
+import os
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from storage import Storage
+import prompts
+
+
+def normalize_person(name: str) -> str:
+    """Normalize an admired person's name so trivial variants share an entry.
+
+    "Steve Jobs", "  steve   JOBS." and "Steve Jobs!" all map to "steve jobs".
+    """
+    name = unicodedata.normalize("NFKC", name).casefold()
+    name = re.sub(r"[^\w\s'-]", " ", name)
+    return " ".join(name.split())
+
+
+class MirrorCache:
+    """Two-level cache for ``OpenRouterClient.analyze_person`` results.
+
+    An in-memory LRU sits in front of the ``mirror_cache`` SQLite table.
+    Entries expire after a TTL and the table is capped at a maximum size,
+    evicting the least recently used rows. Keys include the prompt version
+    and model, so changing either starts a fresh cache.
+
+    Analyses bulk-loaded by ``warm_mirror.py`` into ``mirror_precomputed``
+    for the same model are consulted on a memory miss and never expire.
+
+    ``model`` is always the model requested, not the one that answered, so
+    an analysis won by a hedge to OPENROUTER_HEDGE_MODEL is still found.
+    """
+
+    def __init__(self, db: Storage):
+        self.db = db
+        self.ttl_seconds = float(os.getenv("MIRROR_CACHE_TTL", 30 * 24 * 3600))
+        self.memory_size = int(os.getenv("MIRROR_CACHE_MEMORY_SIZE", 1024))
+        self.max_entries = int(os.getenv("MIRROR_CACHE_MAX_ENTRIES", 100000))
+
+        self._memory: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self.memory_hits = 0
+        self.precomputed_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(person: str, model: str) -> str:
+        return f"v{prompts.MIRROR_PROMPT_VERSION}:{model}:{normalize_person(person)}"
+
+    async def get(self, person: str, model: str) -> Optional[dict]:
+        """Get a cached analysis, or None on a miss."""
+        key = self.make_key(person, model)
+        now = time.time()
+
+        entry = self._memory.get(key)
+        if entry is not None:
+            cached_at, analysis = entry
+            if now - cached_at < self.ttl_seconds:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return analysis
+            del self._memory[key]
+
+        analysis = await self.db.get_mirror_precomputed(
+            normalize_person(person), prompts.MIRROR_PROMPT_VERSION, model
+        )
+        if analysis is not None:
+            self.precomputed_hits += 1
+            self._remember(key, analysis, now)
+            return analysis
+
+        cached = await self.db.get_mirror_cache(key, now - self.ttl_seconds)
+        if cached is None:
+            self.misses += 1
+            return None
+
+        analysis, created_at = cached
+        self.db_hits += 1
+        self._remember(key, analysis, created_at)
+        return analysis
+
+    async def put(self, person: str, model: str, analysis: dict):
+        """Cache an analysis in memory and in SQLite."""
+        key = self.make_key(person, model)
+        self._remember(key, analysis, time.time())
+        await self.db.put_mirror_cache(key, analysis, self.max_entries)
+
+    def _remember(self, key: str, analysis: dict, cached_at: float):
+        self._memory[key] = (cached_at, analysis)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters for monitoring."""
+        hits = self.memory_hits + self.precomputed_hits + self.db_hits
+        lookups = hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "precomputed_hits": self.precomputed_hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory)
+        }
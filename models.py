@@ -106,6 +106,42 @@ class SessionState:
         return SessionState(**data)
 
 
+@dataclass
+class SessionEvent:
+    """One transition in a session's append-only log; ``delta`` merges into its data."""
+    seq: int
+    state: str
+    delta: dict
+    created_at: Optional[str] = None
+
+    def to_dict(self):
+        return asdict(self)
+
+
+@dataclass
+class Job:
+    """A transition run in the background, polled by the client."""
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+    job_id: str
+    session_id: str
+    action: str
+    input_data: dict
+    status: str
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    status_code: Optional[int] = None
+    idempotency_key: Optional[str] = None
+    created_at: Optional[float] = None
+    updated_at: Optional[float] = None
+
+    def to_dict(self):
+        return asdict(self)
+
+
 # State transition map
 STATE_TRANSITIONS = {
     GameState.WELCOME: [GameState.GREATNESS_MIRROR],
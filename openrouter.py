@@ -2,40 +2,600 @@
 import os
 import json
 import asyncio
-from typing import Dict, Optional
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
 import httpx
-from models import calculate_cost
+from models import MODEL_PRICING, calculate_cost
+
+
+class _InFlight:
+    """An upstream completion shared by every identical concurrent request.
+
+    ``waiters`` counts the callers still waiting on it; one that gives up
+    before it finishes drops out, so the cost is attributed only to callers
+    that receive the response. ``paid`` is set once one of them has been
+    charged the full cost (the "zero" rule).
+    """
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 1
+        self.paid = False
+
+
+class _Dispatch:
+    """Whether a completion's request has left the rate governor for upstream."""
+
+    def __init__(self):
+        self.sent = asyncio.Event()
+        self.in_flight = False
+
+
+class RateGovernor:
+    """Admission control for one model's upstream calls.
+
+    Callers ``acquire`` a slot before each request and ``release`` it after.
+    Two token buckets enforce requests/minute and tokens/minute (tokens are
+    reserved from an estimate and settled against reported usage), and an
+    AIMD concurrency limit grows by ~1 per round of fast successes and halves
+    on a 429 or timeout. A 429's ``Retry-After`` pauses admissions until it
+    has passed. A limit of 0 disables that bucket.
+    """
+
+    def __init__(self, rpm: int, tpm: int, initial_limit: int, max_limit: int,
+                 latency_target: float):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+
+        self.limit = float(min(initial_limit, max_limit))
+        self.request_budget = float(rpm)
+        self.token_budget = float(tpm)
+        self.blocked_until = 0.0
+        self.active = 0
+        self.queued = 0
+        self.throttled = 0
+        self._refilled_at = time.monotonic()
+        self._changed = asyncio.Event()
+
+    async def acquire(self, tokens: int) -> int:
+        """Wait for a slot; returns the tokens reserved for ``release``."""
+        tokens = min(tokens, self.tpm) if self.tpm else 0
+        self.queued += 1
+        try:
+            while True:
+                delay = self._admit(tokens)
+                if delay == 0:
+                    return tokens
+                self._changed.clear()
+                try:
+                    await asyncio.wait_for(self._changed.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self.queued -= 1
+
+    def blocked(self) -> bool:
+        """Whether admissions are paused until a 429's Retry-After passes."""
+        return time.monotonic() < self.blocked_until
+
+    def release(self, reserved: int, latency: Optional[float] = None,
+                used_tokens: Optional[int] = None, throttled: bool = False,
+                retry_after: Optional[float] = None):
+        """Return a slot and feed the outcome back into the limits.
+
+        ``latency`` is None when the call failed without a useful signal;
+        ``throttled`` marks a 429 or timeout.
+        """
+        now = time.monotonic()
+        self.active -= 1
+
+        if throttled:
+            self.throttled += 1
+            # Decrease once per backoff window, not once per failed in-flight call
+            if now >= self.blocked_until:
+                self.limit = max(1.0, self.limit / 2)
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+        elif latency is not None:
+            if latency > self.latency_target:
+                self.limit = max(1.0, self.limit * 0.9)
+            else:
+                self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+
+        if self.tpm and used_tokens is not None:
+            self._refill(now)
+            self.token_budget = min(float(self.tpm), self.token_budget + reserved - used_tokens)
+
+        self._changed.set()
+
+    def _refill(self, now: float):
+        elapsed = now - self._refilled_at
+        self._refilled_at = now
+        if self.rpm:
+            self.request_budget = min(float(self.rpm), self.request_budget + elapsed * self.rpm / 60)
+        if self.tpm:
+            self.token_budget = min(float(self.tpm), self.token_budget + elapsed * self.tpm / 60)
+
+    def _admit(self, tokens: int) -> Optional[float]:
+        """Take a slot if possible; else seconds to wait (None: until a release)."""
+        now = time.monotonic()
+        self._refill(now)
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.active >= int(self.limit):
+            return None
+        if self.rpm and self.request_budget < 1:
+            return (1 - self.request_budget) * 60 / self.rpm
+        if self.tpm and self.token_budget < tokens:
+            return (tokens - self.token_budget) * 60 / self.tpm
+
+        self.active += 1
+        if self.rpm:
+            self.request_budget -= 1
+        if self.tpm:
+            self.token_budget -= tokens
+        return 0
+
+    def stats(self) -> Dict:
+        return {
+            "concurrency_limit": round(self.limit, 2),
+            "active": self.active,
+            "queued": self.queued,
+            "throttled": self.throttled,
+            "blocked_for": round(max(0.0, self.blocked_until - time.monotonic()), 2)
+        }
+
+
+class OpenRouterError(Exception):
+    """Raised when a completion fails after retries or its stream breaks off."""
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling upstream while a model's circuit is open."""
+
+    def __init__(self, model: str, retry_after: float):
+        super().__init__(f"OpenRouter circuit open for {model}, retry in {retry_after:.0f}s")
+        self.model = model
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Closed/open/half-open circuit breaker for one model.
+
+    After ``failure_threshold`` consecutive upstream failures the circuit
+    opens and calls fail fast with ``CircuitOpenError``. Once ``cooldown``
+    seconds pass it goes half-open and lets ``half_open_probes`` calls
+    through: a success closes it, a failure reopens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, model: str, failure_threshold: int, cooldown: float,
+                 half_open_probes: int):
+        self.model = model
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.half_open_probes = half_open_probes
+
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probes = 0
+        self.rejected = 0
+
+    def before_call(self):
+        """Admit a call or raise CircuitOpenError."""
+        if self.state == self.OPEN:
+            remaining = self.opened_at + self.cooldown - time.monotonic()
+            if remaining > 0:
+                self.rejected += 1
+                raise CircuitOpenError(self.model, remaining)
+            self.state = self.HALF_OPEN
+            self.probes = 0
+
+        if self.state == self.HALF_OPEN:
+            if self.probes >= self.half_open_probes:
+                self.rejected += 1
+                raise CircuitOpenError(self.model, self.cooldown)
+            self.probes += 1
+
+    def on_success(self):
+        if self.state == self.HALF_OPEN:
+            print(f"DEBUG: Circuit for {self.model} closed")
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def on_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                print(f"DEBUG: Circuit for {self.model} opened after {self.failures} failures")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def on_abandon(self):
+        """A call ended without a verdict (cancelled or a client error)."""
+        if self.state == self.HALF_OPEN:
+            self.probes = max(0, self.probes - 1)
+
+    def stats(self) -> Dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "rejected": self.rejected
+        }
+
+
+def _retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """Parse a Retry-After header given as seconds or an HTTP date."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
 
 
 class OpenRouterClient:
-    """Client for OpenRouter API."""
+    """Client for OpenRouter API.
+
+    Owns one long-lived httpx client so connections (HTTP/2 where available)
+    are reused across calls instead of paying a TCP+TLS handshake each time.
+    Call ``aclose()`` on shutdown.
+
+    Identical concurrent non-streaming requests at low temperature (where
+    answers are close enough to interchangeable) are coalesced into a single
+    upstream call. OPENROUTER_COALESCED_COST decides how that call's cost is
+    attributed: "zero" (the first caller to get the response pays, the rest
+    log nothing) or "shared" (cost and tokens split evenly across callers).
+    Callers cancelled while waiting take no part, so what the others log
+    still adds up to the call's cost.
+
+    Every upstream attempt passes through a per-model ``RateGovernor``
+    (OPENROUTER_RPM, OPENROUTER_TPM, OPENROUTER_*_CONCURRENCY,
+    OPENROUTER_LATENCY_TARGET), so bursts queue instead of turning into 429s,
+    and a per-model ``CircuitBreaker`` (OPENROUTER_BREAKER_*), so an outage
+    fails fast with ``CircuitOpenError`` instead of running the retry ladder.
+
+    With OPENROUTER_HEDGE=1, a non-streaming call still running the model's
+    OPENROUTER_HEDGE_PERCENTILE latency after it was sent upstream (time
+    queued in the governor doesn't count) gets a hedge request to
+    OPENROUTER_HEDGE_MODEL (default: the same model), unless that model's
+    governor is waiting out a Retry-After. The first good answer wins, the
+    other is cancelled, and its cost is returned in ``extra_costs`` so it
+    can be logged too.
+    """
 
     def __init__(self, api_key: Optional[str] = None):
         self.api_key = api_key or os.getenv("OPENROUTER_API_KEY")
         if not self.api_key:
             raise ValueError("OPENROUTER_API_KEY must be set")
 
-        self.base_url = "https://openrouter.ai/api/v1"
+        self.base_url = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
         self.default_model = os.getenv("OPENROUTER_MODEL", "anthropic/claude-3-haiku")
 
+        self._client = httpx.AsyncClient(
+            timeout=float(os.getenv("OPENROUTER_TIMEOUT", 90.0)),
+            http2=os.getenv("OPENROUTER_HTTP2", "1") == "1",
+            limits=httpx.Limits(
+                max_connections=int(os.getenv("OPENROUTER_MAX_CONNECTIONS", 100)),
+                max_keepalive_connections=int(os.getenv("OPENROUTER_MAX_KEEPALIVE", 20)),
+                keepalive_expiry=float(os.getenv("OPENROUTER_KEEPALIVE_EXPIRY", 60.0))
+            ),
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json",
+                "HTTP-Referer": "https://greatness-path.app",
+                "X-Title": "The Greatness Path"
+            }
+        )
+
+        self.coalesce_max_temperature = float(os.getenv("OPENROUTER_COALESCE_MAX_TEMPERATURE", 0.3))
+        self.coalesced_cost = os.getenv("OPENROUTER_COALESCED_COST", "zero")
+        self._in_flight: Dict[tuple, _InFlight] = {}
+        self.coalesced_requests = 0
+
+        self.rpm = int(os.getenv("OPENROUTER_RPM", 300))
+        self.tpm = int(os.getenv("OPENROUTER_TPM", 1000000))
+        self.initial_concurrency = int(os.getenv("OPENROUTER_INITIAL_CONCURRENCY", 8))
+        self.max_concurrency = int(os.getenv("OPENROUTER_MAX_CONCURRENCY", 64))
+        self.latency_target = float(os.getenv("OPENROUTER_LATENCY_TARGET", 30.0))
+        self.throttle_backoff = float(os.getenv("OPENROUTER_THROTTLE_BACKOFF", 2.0))
+        self._governors: Dict[str, RateGovernor] = {}
+
+        self.breaker_failures = int(os.getenv("OPENROUTER_BREAKER_FAILURES", 5))
+        self.breaker_cooldown = float(os.getenv("OPENROUTER_BREAKER_COOLDOWN", 30.0))
+        self.breaker_probes = int(os.getenv("OPENROUTER_BREAKER_PROBES", 1))
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+        self.hedge = os.getenv("OPENROUTER_HEDGE", "0") == "1"
+        self.hedge_model = os.getenv("OPENROUTER_HEDGE_MODEL") or None
+        if self.hedge_model and self.hedge_model not in MODEL_PRICING:
+            raise ValueError(f"OPENROUTER_HEDGE_MODEL must be one of {sorted(MODEL_PRICING)}")
+        self.hedge_percentile = float(os.getenv("OPENROUTER_HEDGE_PERCENTILE", 0.95))
+        self.hedge_default_delay = float(os.getenv("OPENROUTER_HEDGE_DELAY", 10.0))
+        self.hedge_min_delay = float(os.getenv("OPENROUTER_HEDGE_MIN_DELAY", 1.0))
+        self.hedge_min_samples = int(os.getenv("OPENROUTER_HEDGE_MIN_SAMPLES", 20))
+        self._latencies: Dict[str, deque] = {}
+        self.hedges_fired = 0
+        self.hedge_wins = 0
+
+    def governor(self, model: str) -> RateGovernor:
+        """The rate governor for a model, created on first use."""
+        governor = self._governors.get(model)
+        if governor is None:
+            governor = RateGovernor(
+                self.rpm, self.tpm, self.initial_concurrency,
+                self.max_concurrency, self.latency_target
+            )
+            self._governors[model] = governor
+        return governor
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        """The circuit breaker for a model, created on first use."""
+        breaker = self._breakers.get(model)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                model, self.breaker_failures, self.breaker_cooldown, self.breaker_probes
+            )
+            self._breakers[model] = breaker
+        return breaker
+
+    async def aclose(self):
+        """Close pooled connections."""
+        await self._client.aclose()
+
+    def stats(self) -> Dict:
+        """Client metrics for monitoring."""
+        return {
+            "in_flight_coalesced": len(self._in_flight),
+            "coalesced_requests": self.coalesced_requests,
+            "governors": {model: g.stats() for model, g in self._governors.items()},
+            "breakers": {model: b.stats() for model, b in self._breakers.items()},
+            "hedges_fired": self.hedges_fired,
+            "hedge_wins": self.hedge_wins,
+            "hedge_budgets": {model: round(self.hedge_budget(model), 2) for model in self._latencies}
+        }
+
+    def hedge_budget(self, model: str) -> float:
+        """Seconds to wait on a call before hedging it.
+
+        The configured percentile of the model's recent latencies, or
+        OPENROUTER_HEDGE_DELAY until enough calls have been observed.
+        """
+        samples = self._latencies.get(model)
+        if not samples or len(samples) < self.hedge_min_samples:
+            return self.hedge_default_delay
+        ordered = sorted(samples)
+        index = min(len(ordered) - 1, int(self.hedge_percentile * len(ordered)))
+        return max(self.hedge_min_delay, ordered[index])
+
     async def chat_completion(
         self,
         messages: list,
         temperature: float = 0.7,
         model: Optional[str] = None,
         max_tokens: int = 2000,
-        max_retries: int = 3
+        max_retries: int = 3,
+        stream: bool = False,
+        on_delta: Optional[Callable[[str], Awaitable[None]]] = None,
+        coalesce: Optional[bool] = None,
+        on_abandon: Optional[Callable[[Dict], None]] = None
     ) -> Dict:
-        """Make a chat completion request to OpenRouter with retry logic."""
+        """Make a chat completion request to OpenRouter with retry logic.
+
+        With ``stream=True`` the completion is read as server-sent events and
+        each text fragment is passed to ``on_delta`` as it arrives; the return
+        value (full content, usage, cost) is the same as for a normal call.
+        A stream that fails after emitting text is not retried.
+
+        ``coalesce`` defaults to True for non-streaming calls at or below
+        OPENROUTER_COALESCE_MAX_TEMPERATURE. A coalesced response carries
+        ``coalesced`` (whether this caller joined another's call) and
+        ``shared_by`` (how many callers shared it).
+
+        If the caller is cancelled after its request was sent upstream, the
+        call is still billed but reports no usage; ``on_abandon`` is then
+        passed an estimated cost entry for it (see ``_estimated_cost``). A
+        coalesced call carries on for the callers still waiting on it, so
+        it is not reported.
+        """
         model = model or self.default_model
-
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-            "HTTP-Referer": "https://greatness-path.app",
-            "X-Title": "The Greatness Path"
+        if coalesce is None:
+            coalesce = temperature <= self.coalesce_max_temperature
+        if stream:
+            return await self._complete(
+                messages, temperature, model, max_tokens, max_retries, stream, on_delta,
+                on_abandon=on_abandon
+            )
+        if not coalesce:
+            return await self._hedged(messages, temperature, model, max_tokens, max_retries, on_abandon)
+
+        key = (model, json.dumps(messages, sort_keys=True), temperature, max_tokens)
+        flight = self._in_flight.get(key)
+        leader = flight is None
+        if leader:
+            flight = _InFlight(asyncio.create_task(
+                self._hedged(messages, temperature, model, max_tokens, max_retries)
+            ))
+            self._in_flight[key] = flight
+            flight.task.add_done_callback(
+                lambda t: self._in_flight.pop(key) if self._in_flight.get(key) is flight else None
+            )
+        else:
+            flight.waiters += 1
+            self.coalesced_requests += 1
+
+        # Shielded so one caller giving up doesn't cancel the call for the rest
+        try:
+            response = await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if not flight.task.done():
+                flight.waiters -= 1
+            raise
+        return self._attribute_coalesced(response, flight, leader)
+
+    def _attribute_coalesced(self, response: Dict, flight: _InFlight, leader: bool) -> Dict:
+        """Apply the coalesced-cost rule to one caller's copy of a shared response."""
+        waiters = flight.waiters
+        payer = not flight.paid
+        flight.paid = True
+        if waiters == 1:
+            return {**response, "coalesced": not leader, "shared_by": 1}
+
+        def split(entry: Dict) -> Dict:
+            usage = {k: v // waiters for k, v in entry["usage"].items() if isinstance(v, int)}
+            return {**entry, "cost": entry["cost"] / waiters, "usage": usage}
+
+        if self.coalesced_cost == "shared":
+            attributed = split(response)
+            attributed["extra_costs"] = [split(extra) for extra in response.get("extra_costs", [])]
+        elif payer:
+            attributed = dict(response)
+        else:
+            attributed = {
+                **response,
+                "cost": 0.0,
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                "extra_costs": []
+            }
+
+        return {**attributed, "coalesced": not leader, "shared_by": waiters}
+
+    async def _hedged(
+        self,
+        messages: list,
+        temperature: float,
+        model: str,
+        max_tokens: int,
+        max_retries: int,
+        on_abandon: Optional[Callable[[Dict], None]] = None
+    ) -> Dict:
+        """Run a non-streaming completion, hedging it if it runs past budget."""
+        if not self.hedge:
+            return await self._complete(messages, temperature, model, max_tokens, max_retries,
+                                        on_abandon=on_abandon)
+
+        primary_dispatch = _Dispatch()
+        primary = asyncio.create_task(
+            self._complete(messages, temperature, model, max_tokens, max_retries,
+                           dispatch=primary_dispatch)
+        )
+        sent = asyncio.create_task(primary_dispatch.sent.wait())
+        hedge = hedge_dispatch = None
+        try:
+            # The budget runs from when the primary is sent, not while it queues
+            await asyncio.wait({primary, sent}, return_when=asyncio.FIRST_COMPLETED)
+            if not primary.done():
+                await asyncio.wait({primary}, timeout=self.hedge_budget(model))
+            if primary.done():
+                return primary.result()
+
+            hedge_model = self.hedge_model or model
+            if self.governor(hedge_model).blocked():
+                # A hedge would only queue behind the same Retry-After
+                return await primary
+            self.hedges_fired += 1
+            print(f"DEBUG: {model} call exceeded {self.hedge_budget(model):.1f}s, hedging to {hedge_model}")
+            hedge_dispatch = _Dispatch()
+            hedge = asyncio.create_task(
+                self._complete(messages, temperature, hedge_model, max_tokens, max_retries,
+                               dispatch=hedge_dispatch)
+            )
+
+            pending = {primary, hedge}
+            winner = None
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # Prefer the primary if both finished in the same tick
+                for task in sorted(done, key=lambda t: t is not primary):
+                    if task.exception() is None:
+                        winner = task
+                        break
+            if winner is None:
+                raise primary.exception()
+
+            if winner is primary:
+                extra_costs = self._loser_cost(hedge, hedge_dispatch, hedge_model, messages)
+            else:
+                self.hedge_wins += 1
+                extra_costs = self._loser_cost(primary, primary_dispatch, model, messages)
+            return {**winner.result(), "hedged": True, "extra_costs": extra_costs}
+        except asyncio.CancelledError:
+            if on_abandon is not None:
+                for task, dispatch, task_model in ((primary, primary_dispatch, model),
+                                                   (hedge, hedge_dispatch, self.hedge_model or model)):
+                    if task is not None:
+                        for entry in self._loser_cost(task, dispatch, task_model, messages):
+                            on_abandon(entry)
+            raise
+        finally:
+            for task in (sent, primary, hedge):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    def _loser_cost(self, loser: asyncio.Task, dispatch: _Dispatch, model: str,
+                    messages: list) -> List[Dict]:
+        """Cost entries for the losing side of a hedge.
+
+        A finished loser reports real usage and one that failed is assumed
+        not to be billed, nor is one cancelled before its request was sent.
+        One cancelled mid-flight has no usage, so its prompt tokens are
+        estimated and its completion counted as zero.
+        """
+        if loser.done():
+            if loser.exception() is not None:
+                return []
+            result = loser.result()
+            return [{"usage": result["usage"], "cost": result["cost"], "model": result["model"]}]
+        if not dispatch.in_flight:
+            return []
+        return [self._estimated_cost(messages, model)]
+
+    def _estimated_cost(self, messages: list, model: str, completion: str = "") -> Dict:
+        """A cost entry (``estimated: True``) for a call cancelled mid-flight.
+
+        Prompt tokens are estimated from the messages and completion tokens
+        from the text received before the cancel, at ~4 characters a token.
+        """
+        prompt_tokens = len(json.dumps(messages)) // 4
+        completion_tokens = len(completion) // 4
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
         }
+        return {"usage": usage, "cost": calculate_cost(usage, model), "model": model, "estimated": True}
+
+    async def _complete(
+        self,
+        messages: list,
+        temperature: float,
+        model: str,
+        max_tokens: int,
+        max_retries: int,
+        stream: bool = False,
+        on_delta: Optional[Callable[[str], Awaitable[None]]] = None,
+        dispatch: Optional[_Dispatch] = None,
+        on_abandon: Optional[Callable[[Dict], None]] = None
+    ) -> Dict:
+        """Run one completion through the retry ladder.
 
+        ``dispatch``, if given, tracks whether an attempt is currently sent
+        upstream. ``on_abandon`` is passed an estimated cost entry if the
+        call is cancelled while an attempt is sent.
+        """
         payload = {
             "model": model,
             "messages": messages,
@@ -43,25 +603,47 @@ class OpenRouterClient:
             "max_tokens": max_tokens
         }
 
+        emitted = False
+        received = []
+
+        async def forward(text: str):
+            nonlocal emitted
+            emitted = True
+            received.append(text)
+            if on_delta is not None:
+                await on_delta(text)
+
+        governor = self.governor(model)
+        breaker = self.breaker(model)
+        estimate = len(json.dumps(messages)) // 4 + max_tokens
+
         last_error = None
         for attempt in range(max_retries):
+            # Fails fast with CircuitOpenError, ending the retry ladder
+            breaker.before_call()
+            reserved = None
+            released = False
+            settled = False
+            sent = False
             try:
-                async with httpx.AsyncClient(timeout=90.0) as client:
-                    response = await client.post(
-                        f"{self.base_url}/chat/completions",
-                        headers=headers,
-                        json=payload
-                    )
-                    response.raise_for_status()
-                    data = response.json()
-
-                # Extract response
-                content = data["choices"][0]["message"]["content"]
-                usage = data.get("usage", {
-                    "prompt_tokens": 0,
-                    "completion_tokens": 0,
-                    "total_tokens": 0
-                })
+                reserved = await governor.acquire(estimate)
+                sent = True
+                if dispatch is not None:
+                    dispatch.in_flight = True
+                    dispatch.sent.set()
+                start = time.monotonic()
+                if stream:
+                    content, usage = await self._stream_completion(payload, forward)
+                else:
+                    content, usage = await self._post_completion(payload)
+
+                latency = time.monotonic() - start
+                governor.release(reserved, latency=latency, used_tokens=usage.get("total_tokens"))
+                released = True
+                breaker.on_success()
+                settled = True
+                if not stream:
+                    self._latencies.setdefault(model, deque(maxlen=200)).append(latency)
 
                 # Calculate cost
                 cost = calculate_cost(usage, model)
@@ -73,25 +655,119 @@ class OpenRouterClient:
                     "model": model
                 }
 
-            except (httpx.RemoteProtocolError, httpx.ReadTimeout, httpx.ConnectError,
-                    httpx.ReadError, ConnectionError) as e:
+            except (httpx.RemoteProtocolError, httpx.TimeoutException, httpx.ConnectError,
+                    httpx.ReadError, ConnectionError, httpx.HTTPStatusError) as e:
                 last_error = e
+                wait_time = (2 ** attempt) * 1  # Exponential backoff: 1s, 2s, 4s
+                if isinstance(e, httpx.HTTPStatusError):
+                    if e.response.status_code != 429:
+                        # For other errors (like HTTP 500), don't retry
+                        if e.response.status_code >= 500:
+                            breaker.on_failure()
+                            settled = True
+                        print(f"API call failed with non-retryable error: {e}")
+                        raise
+                    # The governor holds every caller of this model until Retry-After passes
+                    wait_time = _retry_after_seconds(e.response) or self.throttle_backoff
+                    governor.release(reserved, throttled=True, retry_after=wait_time)
+                    wait_time = 0
+                elif isinstance(e, httpx.TimeoutException):
+                    governor.release(reserved, throttled=True)
+                    breaker.on_failure()
+                    settled = True
+                else:
+                    governor.release(reserved)
+                    breaker.on_failure()
+                    settled = True
+                released = True
+
+                if emitted:
+                    print(f"API stream interrupted after partial output: {e}")
+                    raise OpenRouterError(f"OpenRouter stream interrupted: {str(e)}")
                 if attempt < max_retries - 1:
-                    wait_time = (2 ** attempt) * 1  # Exponential backoff: 1s, 2s, 4s
                     print(f"API call failed (attempt {attempt + 1}/{max_retries}): {e}")
-                    print(f"Retrying in {wait_time}s...")
-                    await asyncio.sleep(wait_time)
+                    if wait_time:
+                        print(f"Retrying in {wait_time}s...")
+                        await asyncio.sleep(wait_time)
                 else:
                     print(f"API call failed after {max_retries} attempts: {e}")
-                    raise Exception(f"OpenRouter API failed after {max_retries} retries: {str(e)}")
+                    raise OpenRouterError(f"OpenRouter API failed after {max_retries} retries: {str(e)}")
+
+            except asyncio.CancelledError:
+                if sent and on_abandon is not None:
+                    on_abandon(self._estimated_cost(messages, model, "".join(received)))
+                raise
 
             except Exception as e:
-                # For other errors (like HTTP 500), don't retry
                 print(f"API call failed with non-retryable error: {e}")
                 raise
 
+            finally:
+                if dispatch is not None:
+                    dispatch.in_flight = False
+                if reserved is not None and not released:
+                    governor.release(reserved)
+                if not settled:
+                    breaker.on_abandon()
+
         # Should never reach here, but just in case
-        raise Exception(f"OpenRouter API failed: {str(last_error)}")
+        raise OpenRouterError(f"OpenRouter API failed: {str(last_error)}")
+
+    async def _post_completion(self, payload: dict) -> Tuple[str, dict]:
+        """Send a non-streaming completion request and return (content, usage)."""
+        response = await self._client.post(
+            f"{self.base_url}/chat/completions",
+            json=payload
+        )
+        response.raise_for_status()
+        data = response.json()
+
+        content = data["choices"][0]["message"]["content"]
+        usage = data.get("usage", {
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "total_tokens": 0
+        })
+        return content, usage
+
+    async def _stream_completion(self, payload: dict,
+                                 on_delta: Callable[[str], Awaitable[None]]) -> Tuple[str, dict]:
+        """Send a streaming completion request and return (content, usage).
+
+        OpenRouter sends usage in the final chunk when asked to.
+        """
+        payload = {**payload, "stream": True, "usage": {"include": True}}
+        parts = []
+        usage = None
+
+        async with self._client.stream(
+            "POST",
+            f"{self.base_url}/chat/completions",
+            json=payload
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                # Blank lines separate events; ':' lines are keep-alive comments
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+
+                chunk = json.loads(data)
+                if chunk.get("usage"):
+                    usage = chunk["usage"]
+                for choice in chunk.get("choices", []):
+                    text = choice.get("delta", {}).get("content")
+                    if text:
+                        parts.append(text)
+                        await on_delta(text)
+
+        return "".join(parts), usage or {
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "total_tokens": 0
+        }
 
     async def analyze_person(self, person: str, prompts: dict) -> Dict:
         """Analyze an admired person to determine Order."""
@@ -129,7 +805,8 @@ class OpenRouterClient:
             "traits": data.get("admired_person_traits", []),
             "usage": response["usage"],
             "cost": response["cost"],
-            "model": response["model"]
+            "model": response["model"],
+            "extra_costs": response.get("extra_costs", [])
         }
 
     async def attempt_trial(self, prompts: dict) -> Dict:
@@ -149,7 +826,8 @@ class OpenRouterClient:
             "submission": response["content"],
             "usage": response["usage"],
             "cost": response["cost"],
-            "model": response["model"]
+            "model": response["model"],
+            "extra_costs": response.get("extra_costs", [])
         }
 
     async def evaluate_trial(self, prompts: dict) -> Dict:
@@ -185,7 +863,8 @@ class OpenRouterClient:
             "evaluation": data,
             "usage": response["usage"],
             "cost": response["cost"],
-            "model": response["model"]
+            "model": response["model"],
+            "extra_costs": response.get("extra_costs", [])
         }
 
     async def provide_feedback(self, prompts: dict) -> Dict:
@@ -205,11 +884,23 @@ class OpenRouterClient:
             "feedback": response["content"],
             "usage": response["usage"],
             "cost": response["cost"],
-            "model": response["model"]
+            "model": response["model"],
+            "extra_costs": response.get("extra_costs", [])
         }
 
-    async def generate_narrative(self, prompts: dict, max_tokens: int = 500) -> Dict:
-        """Generate narrative text (chapter intro, transformation, timeline)."""
+    async def generate_narrative(
+        self,
+        prompts: dict,
+        max_tokens: int = 500,
+        on_delta: Optional[Callable[[str], Awaitable[None]]] = None,
+        on_abandon: Optional[Callable[[Dict], None]] = None
+    ) -> Dict:
+        """Generate narrative text (chapter intro, transformation, timeline).
+
+        Pass ``on_delta`` to stream the text as it is generated, and
+        ``on_abandon`` to hear the estimated cost of a call cancelled
+        mid-flight (see ``chat_completion``).
+        """
         messages = [
             {"role": "system", "content": prompts["system"]},
             {"role": "user", "content": prompts["user"]}
@@ -218,12 +909,16 @@ class OpenRouterClient:
         response = await self.chat_completion(
             messages=messages,
             temperature=prompts["temperature"],
-            max_tokens=max_tokens
+            max_tokens=max_tokens,
+            stream=on_delta is not None,
+            on_delta=on_delta,
+            on_abandon=on_abandon
         )
 
         return {
             "narrative": response["content"],
             "usage": response["usage"],
             "cost": response["cost"],
-            "model": response["model"]
+            "model": response["model"],
+            "extra_costs": response.get("extra_costs", [])
         }
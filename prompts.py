@@ -11,6 +11,9 @@ ORDER_CONTEXTS = {
     "futurist": "a Navigator seeing patterns"
 }
 
+# Bump when get_greatness_mirror_prompt changes so cached analyses are not reused
+MIRROR_PROMPT_VERSION = 1
+
 # Temperature settings for different prompt types
 TEMPERATURES = {
     "trial_attemptor": 0.8,
@@ -0,0 +1,324 @@
+"""In-process write-through cache of sessions and characters."""
+import json
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import replace
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from database import UnitOfWork
+from models import Character, SessionState
+from storage import Storage
+
+
+class _Entry:
+    """What is known about one session; ``None`` fields are not cached yet."""
+
+    __slots__ = ("session", "character", "character_loaded", "total_cost", "seq", "size")
+
+    def __init__(self):
+        self.session: Optional[SessionState] = None
+        self.character: Optional[Character] = None
+        self.character_loaded = False
+        self.total_cost: Optional[float] = None
+        self.seq: Optional[int] = None
+        self.size = 0
+
+
+class SessionCache:
+    """Bounded LRU of ``SessionState``, ``Character`` and total cost per session.
+
+    Wraps any ``Storage`` and serves ``get_session``, ``get_character``,
+    ``get_total_cost`` and the loads of ``unit_of_work`` from memory once a
+    session has been read or written. Writes go to storage first and then
+    update the entry; ``delete_session`` drops it. Operations not listed
+    here pass straight through; sessions removed by maintenance are
+    dropped too, but only when maintenance runs in this process: a separate
+    ``python maintenance.py`` needs the app to run with SESSION_CACHE_SIZE=0.
+
+    Entries are copied on the way in and out, so a transition that edits
+    its session or character in place and then fails leaves the cache as
+    it was. The cache holds at most ``max_entries`` sessions and roughly
+    ``max_bytes`` of session data and backstory (JSON size), evicting the
+    least recently used; reads of sessions that don't exist are not
+    cached. It only sees this process's writes, so use it
+    with a single app node or sticky sessions; a transition loaded from a
+    stale entry fails its commit with SessionConflictError, which drops
+    the entry.
+    """
+
+    def __init__(self, db: Storage, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024):
+        self.db = db
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._bytes = 0
+        # Sessions being read from storage, and those written meanwhile, so a
+        # read that raced a write doesn't cache what it read
+        self._reading: Dict[str, int] = {}
+        self._written_while_reading = set()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __getattr__(self, name):
+        return getattr(self.db, name)
+
+    async def connect(self):
+        await self.db.connect()
+
+    async def aclose(self):
+        await self.db.aclose()
+
+    # Unit of work
+    @asynccontextmanager
+    async def unit_of_work(self, session_id: str):
+        """Like ``Storage.unit_of_work``, loading from memory when the session is cached."""
+        uow = await self.load_work(session_id)
+        yield uow
+        await self.commit_work(uow)
+
+    async def load_work(self, session_id: str) -> UnitOfWork:
+        entry = self._lookup(session_id)
+        if (entry is not None and entry.session is not None and entry.character_loaded
+                and entry.total_cost is not None and entry.seq is not None):
+            self.hits += 1
+            return UnitOfWork(session_id, replace(entry.session, data=dict(entry.session.data)),
+                              _copy_character(entry.character), entry.total_cost, entry.seq)
+
+        self.misses += 1
+        self._start_read(session_id)
+        try:
+            uow = await self.db.load_work(session_id)
+        finally:
+            loaded = self._finish_read(session_id)
+        if loaded and uow.session is not None:
+            entry = self._entry(session_id)
+            entry.session = replace(uow.session, data=dict(uow.session.data))
+            entry.character = _copy_character(uow.character)
+            entry.character_loaded = True
+            entry.total_cost = uow.prior_cost
+            entry.seq = uow.seq
+            self._resize(session_id, entry)
+        return uow
+
+    async def commit_work(self, uow: UnitOfWork):
+        session_id = uow.session_id
+        await self._write(session_id, self.db.commit_work(uow))
+
+        # Committed: the unit of work now holds the stored state. A session
+        # deleted meanwhile has no entry and must not get one back.
+        entry = self._lookup(session_id)
+        if entry is None:
+            return
+        if uow.next_state is not None and uow.session is not None:
+            entry.session = replace(uow.session, state=uow.next_state, data=dict(uow.next_data),
+                                    updated_at=datetime.utcnow().isoformat())
+            entry.seq = uow.seq
+        if uow.character_dirty:
+            entry.character = _copy_character(uow.character)
+            entry.character_loaded = True
+        # Added rather than set: cost logged outside the unit of work (a
+        # speculative generation) may have landed since it was loaded
+        if entry.total_cost is not None:
+            entry.total_cost += sum(cost.cost_usd for cost in uow.cost_entries)
+        self._resize(session_id, entry)
+
+    # Sessions
+    async def create_session(self, session_id: str, state: str, data: dict) -> SessionState:
+        session = await self._write(session_id, self.db.create_session(session_id, state, data))
+        entry = self._entry(session_id)
+        entry.session = replace(session, data=dict(data))
+        entry.character_loaded = True
+        entry.total_cost = 0.0
+        entry.seq = 0
+        self._resize(session_id, entry)
+        return session
+
+    async def get_session(self, session_id: str) -> Optional[SessionState]:
+        entry = self._lookup(session_id)
+        if entry is not None and entry.session is not None:
+            self.hits += 1
+            return replace(entry.session, data=dict(entry.session.data))
+
+        self.misses += 1
+        self._start_read(session_id)
+        try:
+            session = await self.db.get_session(session_id)
+        finally:
+            loaded = self._finish_read(session_id)
+        if loaded and session is not None:
+            entry = self._entry(session_id)
+            entry.session = replace(session, data=dict(session.data))
+            self._resize(session_id, entry)
+        return session
+
+    async def update_session(self, session_id: str, state: str, data: dict):
+        await self._write(session_id, self.db.update_session(session_id, state, data))
+        entry = self._entries.get(session_id)
+        if entry is not None and entry.session is not None:
+            entry.session = replace(entry.session, state=state, data=dict(data),
+                                    updated_at=datetime.utcnow().isoformat())
+            # Not known without a read; the next unit of work loads it
+            entry.seq = None
+            self._resize(session_id, entry)
+
+    async def delete_session(self, session_id: str):
+        self._invalidate(session_id)
+        await self._write(session_id, self.db.delete_session(session_id))
+        self._invalidate(session_id)
+
+    # Characters
+    async def get_character(self, session_id: str) -> Optional[Character]:
+        entry = self._lookup(session_id)
+        if entry is not None and entry.character_loaded:
+            self.hits += 1
+            return _copy_character(entry.character)
+
+        self.misses += 1
+        self._start_read(session_id)
+        try:
+            character = await self.db.get_character(session_id)
+        finally:
+            loaded = self._finish_read(session_id)
+        # No character is only worth remembering for a session that exists
+        if loaded and (character is not None or self._has_session(session_id)):
+            entry = self._entry(session_id)
+            entry.character = _copy_character(character)
+            entry.character_loaded = True
+            self._resize(session_id, entry)
+        return character
+
+    async def save_character(self, session_id: str, character: Character):
+        await self._write(session_id, self.db.save_character(session_id, character))
+        entry = self._entries.get(session_id)
+        if entry is not None:
+            entry.character = _copy_character(character)
+            entry.character_loaded = True
+            self._resize(session_id, entry)
+
+    # Cost
+    async def insert_cost_log(self, session_id: str, state: str, prompt_tokens: int,
+                              completion_tokens: int, cost_usd: float, model: str):
+        await self._write(session_id, self.db.insert_cost_log(
+            session_id, state, prompt_tokens, completion_tokens, cost_usd, model
+        ))
+        entry = self._entries.get(session_id)
+        if entry is not None and entry.total_cost is not None:
+            entry.total_cost += cost_usd
+
+    async def get_total_cost(self, session_id: str) -> float:
+        entry = self._lookup(session_id)
+        if entry is not None and entry.total_cost is not None:
+            self.hits += 1
+            return entry.total_cost
+
+        self.misses += 1
+        self._start_read(session_id)
+        try:
+            total_cost = await self.db.get_total_cost(session_id)
+        finally:
+            loaded = self._finish_read(session_id)
+        # Unknown ids cost nothing too; don't let probing them fill the cache
+        if loaded and (total_cost > 0 or self._has_session(session_id)):
+            self._entry(session_id).total_cost = total_cost
+        return total_cost
+
+    # Maintenance
+    async def expire_sessions(self, idle_before: str, keep_state: str, limit: int) -> Tuple[List[str], int]:
+        session_ids, deleted = await self.db.expire_sessions(idle_before, keep_state, limit)
+        for session_id in session_ids:
+            self._invalidate(session_id)
+        return session_ids, deleted
+
+    async def archive_sessions(self, state: str, idle_before: str, limit: int) -> Tuple[List[str], int]:
+        session_ids, deleted = await self.db.archive_sessions(state, idle_before, limit)
+        for session_id in session_ids:
+            self._invalidate(session_id)
+        return session_ids, deleted
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters and size for monitoring."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "evictions": self.evictions
+        }
+
+    # Bookkeeping
+    def _lookup(self, session_id: str) -> Optional[_Entry]:
+        entry = self._entries.get(session_id)
+        if entry is not None:
+            self._entries.move_to_end(session_id)
+        return entry
+
+    def _has_session(self, session_id: str) -> bool:
+        entry = self._entries.get(session_id)
+        return entry is not None and entry.session is not None
+
+    def _entry(self, session_id: str) -> _Entry:
+        entry = self._entries.get(session_id)
+        if entry is None:
+            entry = self._entries[session_id] = _Entry()
+        self._entries.move_to_end(session_id)
+        return entry
+
+    def _resize(self, session_id: str, entry: _Entry):
+        size = 0
+        if entry.session is not None:
+            size += len(json.dumps(entry.session.data))
+        if entry.character is not None:
+            size += len(json.dumps(entry.character.backstory))
+        self._bytes += size - entry.size
+        entry.size = size
+        self._evict()
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.size
+            self.evictions += 1
+
+    def _invalidate(self, session_id: str):
+        entry = self._entries.pop(session_id, None)
+        if entry is not None:
+            self._bytes -= entry.size
+        self._note_write(session_id)
+
+    def _start_read(self, session_id: str):
+        self._reading[session_id] = self._reading.get(session_id, 0) + 1
+
+    def _finish_read(self, session_id: str) -> bool:
+        """End a storage read; whether its result may be cached."""
+        remaining = self._reading[session_id] - 1
+        fresh = session_id not in self._written_while_reading
+        if remaining:
+            self._reading[session_id] = remaining
+        else:
+            del self._reading[session_id]
+            self._written_while_reading.discard(session_id)
+        return fresh
+
+    def _note_write(self, session_id: str):
+        if session_id in self._reading:
+            self._written_while_reading.add(session_id)
+
+    async def _write(self, session_id: str, write):
+        """Await a storage write; the entry is dropped if it fails."""
+        self._note_write(session_id)
+        try:
+            return await write
+        except BaseException:
+            self._invalidate(session_id)
+            raise
+        finally:
+            self._note_write(session_id)
+
+
+def _copy_character(character: Optional[Character]) -> Optional[Character]:
+    return replace(character) if character is not None else None
@@ -1,10 +1,20 @@
 """Simplified game state machine - Before/After chapter structure."""
+import asyncio
+import os
+import time
 import uuid
-from typing import Dict, Optional
+import weakref
+from dataclasses import replace
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+import httpx
 from models import GameState, Character, ChapterProgress, TimelineEvent
-from database import Database
-from openrouter import OpenRouterClient
+from database import SessionConflictError, UnitOfWork
+from storage import Storage
+from openrouter import CircuitOpenError, OpenRouterClient, OpenRouterError
 from cost_tracker import CostTracker
+from generation import GenerationCall, run_plan
+from mirror_cache import MirrorCache
+from fallback_narratives import FallbackNarrator
 import prompts
 
 
@@ -45,45 +55,112 @@ CHAPTER_THEMES = {
 }
 
 
+# States whose transition out calls the LLM
+GENERATING_STATES = {
+    GameState.GREATNESS_MIRROR,
+    GameState.CHARACTER_CREATION,
+    GameState.CHAPTER_BEFORE,
+    GameState.CHAPTER_AFTER,
+    GameState.COMPLETION
+}
+
+
+# Receives (field, text) for each streamed fragment of a generated field, and
+# (field, None) when the text streamed for a field is replaced by a fallback
+DeltaCallback = Callable[[str, Optional[str]], Awaitable[None]]
+
+# Receives the estimated cost entry of an LLM call cancelled mid-flight
+AbandonCallback = Callable[[dict], None]
+
+
+def _stream_to(on_delta: Optional[DeltaCallback], field: str):
+    """Bind a transition-level delta callback to one output field."""
+    if on_delta is None:
+        return None
+
+    async def forward(text: str):
+        await on_delta(field, text)
+    return forward
+
+
 class GameStateMachine:
     """Manages simplified game state transitions."""
 
-    def __init__(self, db: Database, openrouter: OpenRouterClient, cost_tracker: CostTracker):
+    def __init__(self, db: Storage, openrouter: OpenRouterClient, cost_tracker: CostTracker,
+                 mirror_cache: Optional[MirrorCache] = None):
         self.db = db
         self.openrouter = openrouter
         self.cost_tracker = cost_tracker
+        self.mirror_cache = mirror_cache
+
+        # Opt-in: generate the next chapter state while the player is reading
+        self.speculative = os.getenv("SPECULATIVE_GENERATION", "0") == "1"
+        self._speculations: Dict[Tuple[str, str, int], asyncio.Task] = {}
+        # Serializes transitions per session; entries vanish once no one holds them
+        self._session_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
 
-    def create_session(self) -> str:
+        # Template narratives stand in when generation fails or runs over budget
+        self.fallback = FallbackNarrator(CHAPTER_THEMES)
+        self.fallback_enabled = os.getenv("FALLBACK_NARRATIVES", "1") == "1"
+        self.generation_budget = float(os.getenv("GENERATION_LATENCY_BUDGET", 30.0)) or None
+        self.fallbacks_used = 0
+
+    async def create_session(self) -> str:
         """Create a new game session."""
         session_id = str(uuid.uuid4())
-        self.db.create_session(
+        await self.db.create_session(
             session_id=session_id,
             state=GameState.WELCOME.value,
             data={"current_chapter": 1}
         )
         return session_id
 
-    def get_current_state(self, session_id: str) -> Optional[Dict]:
+    async def delete_session(self, session_id: str):
+        """Delete a session, cancelling any speculative generation for it.
+
+        Waits for a transition in flight to finish, so it can't commit to
+        (or re-cache) the session after it is gone.
+        """
+        for key, task in list(self._speculations.items()):
+            if key[0] == session_id:
+                task.cancel()
+        async with self._session_lock(session_id):
+            await self.db.delete_session(session_id)
+
+    async def needs_generation(self, session_id: str) -> bool:
+        """Whether the next transition for a session will call the LLM."""
+        session = await self.db.get_session(session_id)
+        if not session:
+            raise ValueError(f"Session {session_id} not found")
+        return GameState(session.state) in GENERATING_STATES
+
+    async def get_current_state(self, session_id: str) -> Optional[Dict]:
         """Get current session state and UI data."""
-        session = self.db.get_session(session_id)
+        session = await self.db.get_session(session_id)
         if not session:
             return None
 
-        state = GameState(session.state)
-        character = self.db.get_character(session_id)
-        character_data = character.to_dict() if character else None
-        total_cost = self.cost_tracker.get_session_cost(session_id)
+        character = await self.db.get_character(session_id)
+        total_cost = await self.cost_tracker.get_session_cost(session_id)
+
+        return await self._state_payload(
+            session_id, GameState(session.state), session.data, character, total_cost
+        )
 
+    async def _state_payload(self, session_id: str, state: GameState, data: dict,
+                             character: Optional[Character], total_cost: float) -> Dict:
+        """Build the client-facing view of a session (the StateResponse fields)."""
+        character_data = character.to_dict() if character else None
         return {
             "session_id": session_id,
             "state": state.value,
-            "data": session.data,
+            "data": data,
             "character": character_data,
             "total_cost": total_cost,
-            "ui_data": self._get_ui_data_for_state(state, session.data, character_data)
+            "ui_data": await self._get_ui_data_for_state(state, data, character_data)
         }
 
-    def _get_ui_data_for_state(self, state: GameState, data: dict, character: Optional[dict]) -> dict:
+    async def _get_ui_data_for_state(self, state: GameState, data: dict, character: Optional[dict]) -> dict:
         """Get UI-specific data for current state."""
         if state == GameState.WELCOME:
             return {
@@ -151,7 +228,7 @@ class GameStateMachine:
             }
 
         elif state == GameState.COMPLETION:
-            timeline = self.db.get_timeline(data.get('session_id', session_id if 'session_id' in dir() else ''))
+            timeline = await self.db.get_timeline(data.get('session_id', session_id if 'session_id' in dir() else ''))
             return {
                 "title": "You Have Completed The Path",
                 "subtitle": "8 Transformations, One Journey",
@@ -177,113 +254,199 @@ class GameStateMachine:
 
         return {}
 
-    async def transition(self, session_id: str, action: str, input_data: dict) -> dict:
-        """Execute a state transition."""
-        session = self.db.get_session(session_id)
-        if not session:
-            raise ValueError(f"Session {session_id} not found")
-
-        current_state = GameState(session.state)
-
-        # Route to appropriate handler
-        if current_state == GameState.WELCOME:
-            next_state = GameState.GREATNESS_MIRROR
-            result = {"ready": True}
-
-        elif current_state == GameState.GREATNESS_MIRROR:
-            result = await self._handle_greatness_mirror(session_id, input_data)
-            next_state = GameState.ORDER_REVEAL
-
-        elif current_state == GameState.ORDER_REVEAL:
-            result = {"selected_archetype": input_data.get('archetype', '')}
-            next_state = GameState.CHARACTER_CREATION
-
-        elif current_state == GameState.CHARACTER_CREATION:
-            result = await self._handle_character_creation(session_id, input_data)
-            # Immediately generate the first chapter's before narrative
-            before_result = await self._handle_chapter_before(session_id, {})
-            result.update(before_result)
-            next_state = GameState.CHAPTER_BEFORE
+    def _session_lock(self, session_id: str) -> asyncio.Lock:
+        lock = self._session_locks.get(session_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._session_locks[session_id] = lock
+        return lock
 
-        elif current_state == GameState.CHAPTER_BEFORE:
-            # User clicked to see the transformation
-            result = await self._handle_chapter_after(session_id, input_data)
-            next_state = GameState.CHAPTER_AFTER
-
-        elif current_state == GameState.CHAPTER_AFTER:
-            # User clicked to continue to next chapter
-            character = self.db.get_character(session_id)
-
-            if character and character.current_chapter >= 8:
-                next_state = GameState.COMPLETION
-                result = {"completed": True}
-            else:
-                # Move to next chapter
-                if character:
-                    character.current_chapter += 1
-                    self.db.save_character(session_id, character)
-
-                # Generate the next chapter's before narrative
-                result = await self._handle_chapter_before(session_id, {})
+    async def get_replay(self, session_id: str, idempotency_key: Optional[str]) -> Optional[dict]:
+        """The stored response of a transition already run with this key, if any."""
+        if not idempotency_key:
+            return None
+        response = await self.db.get_idempotent_response(session_id, idempotency_key)
+        return {**response, "replayed": True} if response else None
+
+    async def transition(self, session_id: str, action: str, input_data: dict,
+                         on_delta: Optional[DeltaCallback] = None,
+                         idempotency_key: Optional[str] = None) -> dict:
+        """Execute a state transition.
+
+        All reads and writes go through one unit of work, so a transition is
+        committed atomically or not at all. If ``on_delta`` is given, narrative
+        text is streamed to it as ``(field, text)`` while it is generated.
+        The response includes per-call generation timings in seconds, and
+        ``transition`` for the whole transition up to its commit.
+
+        Transitions for one session run one at a time in this process;
+        across nodes, the one that commits second raises
+        SessionConflictError. With an ``idempotency_key``, the response is
+        stored with the transition and a repeat call with the same key
+        replays it (``replayed: True``) instead of transitioning again, also
+        when the repeat lost that race to the original.
+        """
+        async with self._session_lock(session_id):
+            replay = await self.get_replay(session_id, idempotency_key)
+            if replay is not None:
+                print(f"DEBUG: Replaying transition for idempotency key {idempotency_key}")
+                return replay
+            try:
+                return await self._transition(session_id, action, input_data, on_delta, idempotency_key)
+            except SessionConflictError:
+                replay = await self.get_replay(session_id, idempotency_key)
+                if replay is None:
+                    raise
+                print(f"DEBUG: Transition for idempotency key {idempotency_key} committed elsewhere, replaying")
+                return replay
+
+    async def _transition(self, session_id: str, action: str, input_data: dict,
+                          on_delta: Optional[DeltaCallback],
+                          idempotency_key: Optional[str]) -> dict:
+        timings: Dict[str, float] = {}
+        start = time.perf_counter()
+
+        async with self.db.unit_of_work(session_id) as uow:
+            session = uow.session
+            if not session:
+                raise ValueError(f"Session {session_id} not found")
+
+            current_state = GameState(session.state)
+
+            # Route to appropriate handler
+            if current_state == GameState.WELCOME:
+                next_state = GameState.GREATNESS_MIRROR
+                result = {"ready": True}
+
+            elif current_state == GameState.GREATNESS_MIRROR:
+                result = await self._handle_greatness_mirror(uow, input_data, timings)
+                next_state = GameState.ORDER_REVEAL
+
+            elif current_state == GameState.ORDER_REVEAL:
+                result = {"selected_archetype": input_data.get('archetype', '')}
+                next_state = GameState.CHARACTER_CREATION
+
+            elif current_state == GameState.CHARACTER_CREATION:
+                # The character is only buffered in the unit of work, so creating
+                # it costs nothing before the first chapter's generation starts
+                result = await self._handle_character_creation(uow, input_data)
+                # Immediately generate the first chapter's before narrative
+                before_result = await self._handle_chapter_before(uow, {}, on_delta, timings)
+                result.update(before_result)
                 next_state = GameState.CHAPTER_BEFORE
 
-        elif current_state == GameState.COMPLETION:
-            # Generate personalized sales page
-            result = await self._handle_sales_page_generation(session_id, input_data)
-            next_state = GameState.SALES_PAGE
-
-        elif current_state == GameState.SALES_PAGE:
-            result = {"viewed": True}
-            next_state = GameState.SALES_PAGE  # Terminal state
+            elif current_state == GameState.CHAPTER_BEFORE:
+                # User clicked to see the transformation
+                result = await self._handle_chapter_after(uow, input_data, on_delta, timings)
+                next_state = GameState.CHAPTER_AFTER
+
+            elif current_state == GameState.CHAPTER_AFTER:
+                # User clicked to continue to next chapter
+                character = uow.character
+
+                if character and character.current_chapter >= 8:
+                    next_state = GameState.COMPLETION
+                    result = {"completed": True}
+                else:
+                    # Move to next chapter
+                    if character:
+                        character.current_chapter += 1
+                        uow.save_character(character)
+
+                    # Generate the next chapter's before narrative
+                    result = await self._handle_chapter_before(uow, {}, on_delta, timings)
+                    next_state = GameState.CHAPTER_BEFORE
+
+            elif current_state == GameState.COMPLETION:
+                # Generate personalized sales page
+                result = await self._handle_sales_page_generation(uow, input_data, timings)
+                next_state = GameState.SALES_PAGE
+
+            elif current_state == GameState.SALES_PAGE:
+                result = {"viewed": True}
+                next_state = GameState.SALES_PAGE  # Terminal state
 
-        else:
-            raise ValueError(f"Unknown state: {current_state}")
+            else:
+                raise ValueError(f"Unknown state: {current_state}")
+
+            # Update session
+            merged_data = {**session.data, **result}
+            print(f"DEBUG: Updating session to state={next_state.value}")
+            print(f"DEBUG: Merged data keys: {list(merged_data.keys())}")
+            if 'after_narrative' in merged_data:
+                print(f"DEBUG: after_narrative exists, length={len(merged_data.get('after_narrative', ''))}")
+            if 'transformation_insight' in merged_data:
+                print(f"DEBUG: transformation_insight exists, length={len(merged_data.get('transformation_insight', ''))}")
+
+            uow.update_session(next_state.value, merged_data, delta=result)
+
+            # Taken before the response is stored, so a replay has the same shape
+            # (the commit itself isn't counted)
+            timings['transition'] = time.perf_counter() - start
+
+            # The new state is built from what this transition holds in memory,
+            # so the client doesn't need to fetch the session again
+            response = {
+                "success": True,
+                "next_state": next_state.value,
+                "data": result,
+                "session": await self._state_payload(
+                    session_id, next_state, merged_data, uow.character, uow.total_cost
+                ),
+                "timings": timings
+            }
+            if idempotency_key:
+                uow.record_response(idempotency_key, response)
 
-        # Update session
-        merged_data = {**session.data, **result}
-        print(f"DEBUG: Updating session to state={next_state.value}")
-        print(f"DEBUG: Merged data keys: {list(merged_data.keys())}")
-        if 'after_narrative' in merged_data:
-            print(f"DEBUG: after_narrative exists, length={len(merged_data.get('after_narrative', ''))}")
-        if 'transformation_insight' in merged_data:
-            print(f"DEBUG: transformation_insight exists, length={len(merged_data.get('transformation_insight', ''))}")
+        print(f"DEBUG: Transition timings: {timings}")
 
-        self.db.update_session(session_id, next_state.value, merged_data)
+        if self.speculative:
+            self._speculate(session_id, next_state, uow.character, merged_data)
 
-        return {
-            "success": True,
-            "next_state": next_state.value,
-            "data": result
-        }
+        return response
 
-    async def _handle_greatness_mirror(self, session_id: str, data: dict) -> dict:
+    async def _handle_greatness_mirror(self, uow: UnitOfWork, data: dict,
+                                       timings: Optional[Dict[str, float]] = None) -> dict:
         """Handle Greatness Mirror analysis."""
         admired_person = data.get('admired_person', '')
         if not admired_person:
             raise ValueError("admired_person is required")
 
+        # A cache hit costs nothing, so no cost entry is logged for it
+        model = self.openrouter.default_model
+        if self.mirror_cache:
+            cached = await self.mirror_cache.get(admired_person, model)
+            if cached is not None:
+                print(f"DEBUG: Greatness Mirror cache hit for {admired_person!r}")
+                return {'admired_person': admired_person, **cached}
+
         prompt_data = prompts.get_greatness_mirror_prompt(admired_person)
-        response = await self.openrouter.analyze_person(admired_person, prompt_data)
+        results = await run_plan([
+            GenerationCall('mirror', lambda deps: self.openrouter.analyze_person(admired_person, prompt_data))
+        ], timings)
+        response = results['mirror']
 
-        self.cost_tracker.log_cost(
-            session_id,
+        await self.cost_tracker.log_response(
+            uow.session_id,
             GameState.GREATNESS_MIRROR,
-            response['usage'],
-            response['cost'],
-            response['model']
+            response,
+            uow=uow
         )
 
-        return {
-            'admired_person': admired_person,
+        analysis = {
             'order': response['order'],
             'archetypes': response['archetypes'],
             'explanation': response['explanation'],
             'traits': response['traits']
         }
+        if self.mirror_cache:
+            await self.mirror_cache.put(admired_person, model, analysis)
+
+        return {'admired_person': admired_person, **analysis}
 
-    async def _handle_character_creation(self, session_id: str, data: dict) -> dict:
+    async def _handle_character_creation(self, uow: UnitOfWork, data: dict) -> dict:
         """Handle character creation."""
-        session = self.db.get_session(session_id)
+        session = uow.session
 
         character = Character(
             name=data.get('name', 'Seeker'),
@@ -300,20 +463,54 @@ class GameStateMachine:
             coherence_level=1.0
         )
 
-        self.db.save_character(session_id, character)
+        uow.save_character(character)
 
         return {
             'character_created': True,
             'current_chapter': 1
         }
 
-    async def _handle_chapter_before(self, session_id: str, data: dict) -> dict:
+    async def _handle_chapter_before(self, uow: UnitOfWork, data: dict,
+                                     on_delta: Optional[DeltaCallback] = None,
+                                     timings: Optional[Dict[str, float]] = None) -> dict:
         """Generate 'before' narrative for current chapter."""
-        character = self.db.get_character(session_id)
+        character = uow.character
         if not character:
             raise ValueError("Character not found")
 
         chapter_num = character.current_chapter
+
+        results = await self._take_speculation(uow, GameState.CHAPTER_BEFORE, chapter_num)
+        generated = False
+        if results is None:
+            results, generated = await self._generate_or_fallback(
+                uow, GameState.CHAPTER_BEFORE,
+                lambda stream, on_abandon: self._generate_chapter_before(character, stream, timings, on_abandon),
+                lambda: self.fallback.chapter_before(character),
+                on_delta
+            )
+        response = results['before_narrative']
+
+        # A speculative result's cost was logged when it was generated; templates cost nothing
+        if generated:
+            await self.cost_tracker.log_response(
+                uow.session_id,
+                GameState.CHAPTER_BEFORE,
+                response,
+                uow=uow
+            )
+
+        return {
+            'current_chapter': chapter_num,
+            'before_narrative': response['narrative']
+        }
+
+    async def _generate_chapter_before(self, character: Character,
+                                       on_delta: Optional[DeltaCallback] = None,
+                                       timings: Optional[Dict[str, float]] = None,
+                                       on_abandon: Optional[AbandonCallback] = None) -> dict:
+        """Run the LLM calls for a chapter's 'before' state."""
+        chapter_num = character.current_chapter
         theme = CHAPTER_THEMES.get(chapter_num, {})
 
         # Generate "before" narrative
@@ -324,31 +521,80 @@ class GameStateMachine:
             theme.get('description', '')
         )
 
-        response = await self.openrouter.generate_narrative(prompt_data, max_tokens=500)
+        return await run_plan([
+            GenerationCall('before_narrative', lambda deps: self.openrouter.generate_narrative(
+                prompt_data, max_tokens=500, on_delta=_stream_to(on_delta, 'before_narrative'),
+                on_abandon=on_abandon
+            ))
+        ], timings)
 
-        self.cost_tracker.log_cost(
-            session_id,
-            GameState.CHAPTER_BEFORE,
-            response['usage'],
-            response['cost'],
-            response['model']
+    async def _handle_chapter_after(self, uow: UnitOfWork, data: dict,
+                                    on_delta: Optional[DeltaCallback] = None,
+                                    timings: Optional[Dict[str, float]] = None) -> dict:
+        """Generate 'after' narrative and transformation for current chapter."""
+        session = uow.session
+        character = uow.character
+        if not character:
+            raise ValueError("Character not found")
+
+        chapter_num = character.current_chapter
+
+        results = await self._take_speculation(uow, GameState.CHAPTER_AFTER, chapter_num)
+        generated = False
+        if results is None:
+            results, generated = await self._generate_or_fallback(
+                uow, GameState.CHAPTER_AFTER,
+                lambda stream, on_abandon: self._generate_chapter_after(
+                    character, session.data.get('before_narrative', ''), stream, timings, on_abandon
+                ),
+                lambda: self.fallback.chapter_after(character),
+                on_delta
+            )
+        after_response = results['after_narrative']
+        insight_response = results['transformation_insight']
+
+        print(f"DEBUG: After narrative generated: {after_response['narrative'][:100]}...")
+        print(f"DEBUG: Transformation insight generated: {insight_response['narrative'][:100]}...")
+
+        # A speculative result's cost was logged when it was generated; templates cost nothing
+        if generated:
+            await self.cost_tracker.log_response(
+                uow.session_id,
+                GameState.CHAPTER_AFTER,
+                after_response,
+                uow=uow
+            )
+
+            await self.cost_tracker.log_response(
+                uow.session_id,
+                GameState.CHAPTER_AFTER,
+                insight_response,
+                uow=uow
+            )
+
+        # Save to timeline
+        event = TimelineEvent(
+            chapter=chapter_num,
+            narrative=after_response['narrative'],
+            transformation=insight_response['narrative']
         )
 
+        uow.add_timeline_event(event)
+
         return {
+            'after_narrative': after_response['narrative'],
+            'transformation_insight': insight_response['narrative'],
             'current_chapter': chapter_num,
-            'before_narrative': response['narrative']
+            'session_id': uow.session_id
         }
 
-    async def _handle_chapter_after(self, session_id: str, data: dict) -> dict:
-        """Generate 'after' narrative and transformation for current chapter."""
-        session = self.db.get_session(session_id)
-        character = self.db.get_character(session_id)
-        if not character:
-            raise ValueError("Character not found")
-
+    async def _generate_chapter_after(self, character: Character, before_narrative: str,
+                                      on_delta: Optional[DeltaCallback] = None,
+                                      timings: Optional[Dict[str, float]] = None,
+                                      on_abandon: Optional[AbandonCallback] = None) -> dict:
+        """Run the LLM calls for a chapter's 'after' state."""
         chapter_num = character.current_chapter
         theme = CHAPTER_THEMES.get(chapter_num, {})
-        before_narrative = session.data.get('before_narrative', '')
 
         # Generate "after" narrative
         after_prompt = prompts.get_chapter_after_prompt(
@@ -358,18 +604,6 @@ class GameStateMachine:
             before_narrative
         )
 
-        after_response = await self.openrouter.generate_narrative(after_prompt, max_tokens=500)
-
-        print(f"DEBUG: After narrative generated: {after_response['narrative'][:100]}...")
-
-        self.cost_tracker.log_cost(
-            session_id,
-            GameState.CHAPTER_AFTER,
-            after_response['usage'],
-            after_response['cost'],
-            after_response['model']
-        )
-
         # Generate transformation insight
         insight_prompt = prompts.get_transformation_insight_prompt(
             character.to_dict(),
@@ -377,46 +611,164 @@ class GameStateMachine:
             theme.get('title', '')
         )
 
-        insight_response = await self.openrouter.generate_narrative(insight_prompt, max_tokens=300)
-
-        print(f"DEBUG: Transformation insight generated: {insight_response['narrative'][:100]}...")
-
-        self.cost_tracker.log_cost(
-            session_id,
-            GameState.CHAPTER_AFTER,
-            insight_response['usage'],
-            insight_response['cost'],
-            insight_response['model']
-        )
+        # The insight doesn't depend on the after narrative, so both run at once
+        return await run_plan([
+            GenerationCall('after_narrative', lambda deps: self.openrouter.generate_narrative(
+                after_prompt, max_tokens=500, on_delta=_stream_to(on_delta, 'after_narrative'),
+                on_abandon=on_abandon
+            )),
+            GenerationCall('transformation_insight', lambda deps: self.openrouter.generate_narrative(
+                insight_prompt, max_tokens=300, on_delta=_stream_to(on_delta, 'transformation_insight'),
+                on_abandon=on_abandon
+            ))
+        ], timings)
+
+    async def _generate_or_fallback(
+        self,
+        uow: UnitOfWork,
+        state: GameState,
+        generate: Callable[[Optional[DeltaCallback], AbandonCallback], Awaitable[dict]],
+        fallback: Callable[[], dict],
+        on_delta: Optional[DeltaCallback] = None
+    ) -> Tuple[dict, bool]:
+        """Run a generation plan, falling back to template narratives.
+
+        ``generate`` is called with the delta callback to stream to and one
+        to pass the estimated cost of calls cancelled mid-flight. The
+        fallback is used when the upstream call fails (an open circuit,
+        HTTP or transport errors, exhausted retries) or exceeds
+        GENERATION_LATENCY_BUDGET; any other error propagates. Returns the
+        results and whether they were generated, so template output is
+        counted in ``fallbacks_used`` rather than logged as API calls.
+
+        Calls the budget cancels were still billed upstream, so their
+        estimated cost is logged under ``state``. Fields that had already
+        streamed text are reset (``on_delta(field, None)``) before the
+        template replaces them.
+        """
+        streamed: List[str] = []
+        abandoned: List[dict] = []
+
+        async def track(field: str, text: Optional[str]):
+            if field not in streamed:
+                streamed.append(field)
+            await on_delta(field, text)
 
-        # Save to timeline
-        event = TimelineEvent(
-            chapter=chapter_num,
-            narrative=after_response['narrative'],
-            transformation=insight_response['narrative']
+        try:
+            plan = generate(track if on_delta is not None else None, abandoned.append)
+            return await asyncio.wait_for(plan, self.generation_budget), True
+        except (asyncio.TimeoutError, CircuitOpenError, OpenRouterError,
+                httpx.HTTPError, ConnectionError) as e:
+            # The unit of work is discarded if the error propagates, so log directly then
+            log_to = uow if self.fallback_enabled else None
+            for entry in abandoned:
+                await self.cost_tracker.log_cost(
+                    uow.session_id, state, entry['usage'], entry['cost'], entry['model'], log_to
+                )
+            if not self.fallback_enabled:
+                raise
+            print(f"DEBUG: Generation unavailable ({type(e).__name__}: {e}), using fallback narrative")
+            self.fallbacks_used += 1
+            for field in streamed:
+                await on_delta(field, None)
+            return fallback(), False
+
+    def _speculate(self, session_id: str, state: GameState,
+                   character: Optional[Character], data: dict):
+        """Start generating the state after ``state`` in a background task.
+
+        The cost is logged as soon as generation finishes (tagged
+        speculative, under the state it was generated for), so it is
+        recorded even if the result is never used. The result is then stored
+        in pending_results for the transition that needs it to consume.
+        The label stays when the result is consumed: cost_by_state reports
+        speculative spend as ``chapter_after:speculative`` and so on, apart
+        from what transitions generated themselves.
+        """
+        if character is None:
+            return
+
+        if state == GameState.CHAPTER_BEFORE:
+            target, chapter = GameState.CHAPTER_AFTER, character.current_chapter
+            reader = replace(character)
+            generate = lambda: self._generate_chapter_after(reader, data.get('before_narrative', ''))
+        elif state == GameState.CHAPTER_AFTER and character.current_chapter < 8:
+            target, chapter = GameState.CHAPTER_BEFORE, character.current_chapter + 1
+            upcoming = replace(character, current_chapter=chapter)
+            generate = lambda: self._generate_chapter_before(upcoming)
+        else:
+            return
+
+        key = (session_id, target.value, chapter)
+        if key in self._speculations:
+            return
+
+        async def run():
+            try:
+                results = await generate()
+                for response in results.values():
+                    await self.cost_tracker.log_response(session_id, target, response, speculative=True)
+                await self.db.save_pending_result(session_id, target.value, chapter, results)
+                return results
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Speculative generation failed for {key}: {e}")
+                return None
+
+        task = asyncio.create_task(run())
+        self._speculations[key] = task
+        task.add_done_callback(
+            lambda t: self._speculations.pop(key) if self._speculations.get(key) is t else None
         )
 
-        self.db.add_timeline_event(session_id, event)
+    async def _take_speculation(self, uow: UnitOfWork, state: GameState,
+                                chapter: int) -> Optional[dict]:
+        """Get a speculative result for this state, awaiting it if still in flight.
 
-        return {
-            'after_narrative': after_response['narrative'],
-            'transformation_insight': insight_response['narrative'],
-            'current_chapter': chapter_num,
-            'session_id': session_id
-        }
+        An in-flight speculation gets GENERATION_LATENCY_BUDGET to finish;
+        past that the caller generates (or falls back) itself, and the
+        speculation carries on in the background.
+        """
+        if not self.speculative:
+            return None
 
-    async def _handle_sales_page_generation(self, session_id: str, data: dict) -> dict:
+        results = None
+        task = self._speculations.get((uow.session_id, state.value, chapter))
+        if task is not None:
+            try:
+                # Shielded so a cancelled request or the budget doesn't throw the work away
+                results = await asyncio.wait_for(asyncio.shield(task), self.generation_budget)
+            except asyncio.TimeoutError:
+                print(f"DEBUG: Speculative {state.value} for chapter {chapter} still running, not waiting")
+                return None
+            except asyncio.CancelledError:
+                if task.cancelled():
+                    results = None
+                else:
+                    raise
+        if results is None:
+            results = await self.db.get_pending_result(uow.session_id, state.value, chapter)
+
+        if results is not None:
+            print(f"DEBUG: Using speculative {state.value} result for chapter {chapter}")
+            uow.consume_pending(state.value, chapter)
+        return results
+
+    async def _handle_sales_page_generation(self, uow: UnitOfWork, data: dict,
+                                            timings: Optional[Dict[str, float]] = None) -> dict:
         """Generate personalized sales page."""
-        character = self.db.get_character(session_id)
+        session_id = uow.session_id
+        character = uow.character
         if not character:
             raise ValueError("Character not found")
 
         # Get timeline
-        timeline = self.db.get_timeline(session_id)
+        timeline = await self.db.get_timeline(session_id)
         timeline_data = [event.to_dict() for event in timeline]
 
         # Get total cost
-        total_cost = self.cost_tracker.get_session_cost(session_id)
+        total_cost = uow.total_cost
 
         # Generate sales page
         prompt_data = prompts.get_sales_page_prompt(
@@ -425,17 +777,21 @@ class GameStateMachine:
             total_cost
         )
 
-        response = await self.openrouter.generate_narrative(prompt_data, max_tokens=2000)
+        results = await run_plan([
+            GenerationCall('sales_page', lambda deps: self.openrouter.generate_narrative(
+                prompt_data, max_tokens=2000
+            ))
+        ], timings)
+        response = results['sales_page']
 
         print(f"DEBUG: Sales page generated, length={len(response['narrative'])}")
 
         # Track cost
-        self.cost_tracker.log_cost(
+        await self.cost_tracker.log_response(
             session_id,
             GameState.SALES_PAGE,
-            response['usage'],
-            response['cost'],
-            response['model']
+            response,
+            uow=uow
         )
 
         # Parse JSON response
@@ -1,5 +1,8 @@
 // Alpine.js application for The Greatness Path (Simplified)
 
+// States whose transition out streams narrative text
+const STREAMING_STATES = ['character_creation', 'chapter_before', 'chapter_after'];
+
 document.addEventListener('alpine:init', () => {
     Alpine.data('game', () => ({
         // State
@@ -11,6 +14,11 @@ document.addEventListener('alpine:init', () => {
         loading: false,
         error: null,
         inputData: {},
+        streamText: '',
+        streamFields: {},
+        // Sent with every attempt at the next transition, so a double click or
+        // retry replays the first attempt instead of advancing twice
+        transitionKey: null,
 
         // Initialize
         async init() {
@@ -41,55 +49,56 @@ document.addEventListener('alpine:init', () => {
                 if (!response.ok) {
                     throw new Error('Failed to fetch state');
                 }
-                const data = await response.json();
-                const previousState = this.state;
-                this.state = data.state;
-                this.uiData = data.ui_data;
-                this.character = data.character;
-                this.totalCost = data.total_cost;
-
-                // Debug logging
-                console.log('Current state:', this.state);
-                console.log('UI Data:', this.uiData);
-
-                // Track state change
-                if (previousState !== this.state) {
-                    this.trackStateView(this.state, this.uiData);
-                }
+                this.applyState(await response.json());
             } catch (err) {
                 this.error = 'Failed to refresh state: ' + err.message;
             }
         },
 
+        // Apply a session state payload (from /api/session or a transition result)
+        applyState(data) {
+            const previousState = this.state;
+            this.state = data.state;
+            this.uiData = data.ui_data;
+            this.character = data.character;
+            this.totalCost = data.total_cost;
+
+            // Debug logging
+            console.log('Current state:', this.state);
+            console.log('UI Data:', this.uiData);
+
+            // Track state change
+            if (previousState !== this.state) {
+                this.trackStateView(this.state, this.uiData);
+            }
+        },
+
         // Advance to next state
         async advance(action, data) {
             try {
                 this.loading = true;
                 this.error = null;
+                this.streamText = '';
+                this.streamFields = {};
 
                 console.log('Advancing with action:', action, 'data:', data);
+                this.transitionKey = this.transitionKey || this.newTransitionKey();
 
-                const response = await fetch('/api/transition', {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json'
-                    },
-                    body: JSON.stringify({
-                        session_id: this.sessionId,
-                        action: action,
-                        data: data
-                    })
-                });
-
-                if (!response.ok) {
-                    const errorData = await response.json().catch(() => ({ detail: 'Unknown error' }));
-                    throw new Error(errorData.detail || 'Transition failed');
-                }
-
-                const result = await response.json();
+                // Streaming shows narrative text as it generates. Steps with nothing
+                // to stream (the mirror analysis, the sales page), and browsers
+                // without streams, run as a background job that is polled instead
+                const streams = STREAMING_STATES.includes(this.state) && window.ReadableStream;
+                const result = streams
+                    ? await this.streamTransition(action, data)
+                    : await this.queuedTransition(action, data);
                 console.log('Transition result:', result);
 
-                await this.refreshState();
+                this.transitionKey = null;
+                if (result.session) {
+                    this.applyState(result.session);
+                } else {
+                    await this.refreshState();
+                }
 
                 // Clear input data
                 this.inputData = {};
@@ -114,10 +123,140 @@ document.addEventListener('alpine:init', () => {
                 }, 5000);
             } finally {
                 this.loading = false;
+                this.streamText = '';
                 console.log('Loading complete, current state:', this.state);
             }
         },
 
+        // A random v4 UUID. crypto.randomUUID only exists in secure contexts
+        // (HTTPS or localhost); getRandomValues works over plain HTTP too
+        newTransitionKey() {
+            if (crypto.randomUUID) {
+                return crypto.randomUUID();
+            }
+            const bytes = crypto.getRandomValues(new Uint8Array(16));
+            bytes[6] = (bytes[6] & 0x0f) | 0x40;
+            bytes[8] = (bytes[8] & 0x3f) | 0x80;
+            const hex = Array.from(bytes, b => b.toString(16).padStart(2, '0')).join('');
+            return [hex.slice(0, 8), hex.slice(8, 12), hex.slice(12, 16),
+                    hex.slice(16, 20), hex.slice(20)].join('-');
+        },
+
+        // Run a transition via the SSE endpoint, rendering narrative text as it arrives
+        async streamTransition(action, data) {
+            const response = await fetch('/api/transition/stream', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'Idempotency-Key': this.transitionKey
+                },
+                body: JSON.stringify({
+                    session_id: this.sessionId,
+                    action: action,
+                    data: data
+                })
+            });
+
+            if (!response.ok) {
+                const errorData = await response.json().catch(() => ({ detail: 'Unknown error' }));
+                throw new Error(errorData.detail || 'Transition failed');
+            }
+
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+
+                // Events are separated by a blank line
+                let boundary;
+                while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                    const event = this.parseEvent(buffer.slice(0, boundary));
+                    buffer = buffer.slice(boundary + 2);
+
+                    if (event.type === 'delta') {
+                        this.appendDelta(event.data);
+                    } else if (event.type === 'reset') {
+                        this.resetDelta(event.data);
+                    } else if (event.type === 'done') {
+                        return event.data;
+                    } else if (event.type === 'error') {
+                        throw new Error(event.data.detail || 'Transition failed');
+                    }
+                }
+            }
+
+            throw new Error('peer closed connection before the transition finished');
+        },
+
+        // Run a transition via /api/transition, polling its job if one is queued
+        async queuedTransition(action, data) {
+            const response = await fetch('/api/transition', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'Idempotency-Key': this.transitionKey
+                },
+                body: JSON.stringify({
+                    session_id: this.sessionId,
+                    action: action,
+                    data: data
+                })
+            });
+
+            const body = await response.json().catch(() => ({ detail: 'Unknown error' }));
+            if (!response.ok) {
+                throw new Error(body.detail || 'Transition failed');
+            }
+            if (response.status !== 202) {
+                return body;
+            }
+
+            while (true) {
+                await new Promise(resolve => setTimeout(resolve, 1000));
+                const jobResponse = await fetch(body.status_url);
+                if (!jobResponse.ok) {
+                    throw new Error('Failed to fetch job status');
+                }
+                const job = await jobResponse.json();
+                if (job.status === 'succeeded') {
+                    return job.result;
+                } else if (job.status === 'failed') {
+                    throw new Error(job.error || 'Transition failed');
+                }
+            }
+        },
+
+        // Parse one server-sent event block into {type, data}
+        parseEvent(raw) {
+            let type = 'message';
+            let data = '';
+            for (const line of raw.split('\n')) {
+                if (line.startsWith('event:')) {
+                    type = line.slice(6).trim();
+                } else if (line.startsWith('data:')) {
+                    data += line.slice(5).trim();
+                }
+            }
+            return { type: type, data: data ? JSON.parse(data) : {} };
+        },
+
+        // Append a streamed fragment; fields may generate concurrently,
+        // so each keeps its own paragraph in order of first appearance
+        appendDelta(delta) {
+            this.streamFields[delta.field] = (this.streamFields[delta.field] || '') + delta.text;
+            this.streamText = Object.values(this.streamFields).join('\n\n');
+        },
+
+        // Drop a field's streamed text; the fallback narrative comes with 'done'
+        resetDelta(reset) {
+            delete this.streamFields[reset.field];
+            this.streamText = Object.values(this.streamFields).join('\n\n');
+        },
+
         // Select archetype
         selectArchetype(archetype) {
             this.advance('select_archetype', { archetype: archetype });
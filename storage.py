@@ -0,0 +1,93 @@
+"""Storage backend interface and selection.
+
+The game talks to storage only through the methods below. ``Database``
+(SQLite, one file, single node) is the default, optionally split into
+hash-sharded files by ``ShardedDatabase``; set DATABASE_URL to a
+``postgresql://`` URL to use ``PostgresDatabase`` instead, which lets
+several app containers share one database.
+"""
+import os
+from typing import AsyncContextManager, Dict, List, Optional, Protocol, Tuple
+
+from database import Database, SessionConflictError, ShardedDatabase, UnitOfWork
+from models import Character, CostEntry, Job, SessionEvent, SessionState, TimelineEvent
+
+
+class Storage(Protocol):
+    """Operations every storage backend provides. All I/O is async."""
+
+    async def connect(self): ...
+    async def aclose(self): ...
+
+    def unit_of_work(self, session_id: str) -> AsyncContextManager[UnitOfWork]: ...
+    async def load_work(self, session_id: str) -> UnitOfWork: ...
+    # Raises SessionConflictError if the session moved on since load_work
+    async def commit_work(self, uow: UnitOfWork): ...
+
+    # Sessions
+    async def create_session(self, session_id: str, state: str, data: dict) -> SessionState: ...
+    async def get_session(self, session_id: str) -> Optional[SessionState]: ...
+    async def update_session(self, session_id: str, state: str, data: dict): ...
+    async def get_session_history(self, session_id: str) -> List[SessionEvent]: ...
+    async def delete_session(self, session_id: str): ...
+
+    # Cost log
+    async def insert_cost_log(self, session_id: str, state: str, prompt_tokens: int,
+                              completion_tokens: int, cost_usd: float, model: str): ...
+    async def get_total_cost(self, session_id: str) -> float: ...
+    async def get_cost_summary(self, session_id: str) -> dict: ...
+    async def get_cost_by_state(self, session_id: str) -> Dict[str, float]: ...
+    async def get_cost_by_model(self, session_id: str) -> Dict[str, float]: ...
+    async def get_cost_log(self, session_id: str) -> List[CostEntry]: ...
+    async def get_usage_summary(self) -> dict: ...
+
+    # Characters and timeline
+    async def save_character(self, session_id: str, character: Character): ...
+    async def get_character(self, session_id: str) -> Optional[Character]: ...
+    async def add_timeline_event(self, session_id: str, event: TimelineEvent): ...
+    async def get_timeline(self, session_id: str) -> List[TimelineEvent]: ...
+
+    # Speculative results, mirror caches, idempotency and jobs
+    async def save_pending_result(self, session_id: str, state: str, chapter: int, result: dict): ...
+    async def get_pending_result(self, session_id: str, state: str, chapter: int) -> Optional[dict]: ...
+    async def get_mirror_cache(self, cache_key: str, min_created_at: float) -> Optional[Tuple[dict, float]]: ...
+    async def put_mirror_cache(self, cache_key: str, analysis: dict, max_entries: int): ...
+    async def get_mirror_precomputed(self, person_key: str, prompt_version: int,
+                                     model: str) -> Optional[dict]: ...
+    async def get_mirror_precomputed_keys(self, prompt_version: int, model: str) -> List[str]: ...
+    async def put_mirror_precomputed(self, rows: List[tuple]): ...
+    async def get_idempotent_response(self, session_id: str, idempotency_key: str) -> Optional[dict]: ...
+    async def create_job(self, job_id: str, session_id: str, action: str, input_data: dict,
+                         idempotency_key: Optional[str] = None, owner: Optional[str] = None) -> Job: ...
+    async def get_job(self, job_id: str) -> Optional[Job]: ...
+    async def claim_jobs(self, owner: str, stale_before: float) -> List[Job]: ...
+    async def update_job(self, job_id: str, status: str, result: Optional[dict] = None,
+                         error: Optional[str] = None, status_code: Optional[int] = None): ...
+
+    # Maintenance
+    async def expire_sessions(self, idle_before: str, keep_state: str, limit: int) -> Tuple[List[str], int]: ...
+    async def archive_sessions(self, state: str, idle_before: str, limit: int) -> Tuple[List[str], int]: ...
+    async def get_archived_session(self, session_id: str) -> Optional[dict]: ...
+    async def delete_orphans(self, limit: int) -> int: ...
+    async def purge_records(self, before: float, limit: int) -> int: ...
+    async def incremental_vacuum(self, pages: int) -> int: ...
+
+
+def create_storage(sqlite_path: str = "data/game.db") -> Storage:
+    """Build the backend named by DATABASE_URL (SQLite at ``sqlite_path`` if unset).
+
+    SQLite is split into DB_SHARDS files when that is above 1. Call ``await storage.connect()`` before use and ``aclose()`` on shutdown.
+    """
+    url = os.getenv("DATABASE_URL", "")
+    if url.startswith(("postgres://", "postgresql://")):
+        # asyncpg is only needed for this backend
+        from database_postgres import PostgresDatabase
+        return PostgresDatabase(url)
+    if url.startswith("sqlite:///"):
+        sqlite_path = url[len("sqlite:///"):]
+    elif url:
+        raise ValueError(f"Unsupported DATABASE_URL scheme: {url.split(':', 1)[0]}")
+    shards = int(os.getenv("DB_SHARDS", 1))
+    if shards > 1:
+        return ShardedDatabase(sqlite_path, shards)
+    return Database(sqlite_path)
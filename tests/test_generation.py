@@ -0,0 +1,52 @@
+"""run_plan: concurrency between independent calls and ordering of dependent ones."""
+import asyncio
+
+import pytest
+
+from generation import GenerationCall, run_plan
+
+DELAY = 0.1
+
+
+def _timed_call(name: str, spans: dict, depends_on=()):
+    """A call that sleeps DELAY, recording its (start, end) loop time and its deps."""
+    async def call(deps):
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await asyncio.sleep(DELAY)
+        spans[name] = (start, loop.time())
+        return {"name": name, "deps": sorted(deps)}
+    return GenerationCall(name, call, tuple(depends_on))
+
+
+def test_independent_calls_overlap(run):
+    spans = {}
+    timings = {}
+    results = run(run_plan([_timed_call("a", spans), _timed_call("b", spans), _timed_call("c", spans)],
+                           timings))
+
+    starts = [start for start, _ in spans.values()]
+    ends = [end for _, end in spans.values()]
+    # All three were running at once, so the plan took about one call's time
+    assert max(starts) < min(ends)
+    assert max(ends) - min(starts) < 2 * DELAY
+    assert set(results) == set(timings) == {"a", "b", "c"}
+
+
+def test_a_call_starts_after_its_dependencies_and_receives_their_results(run):
+    spans = {}
+    results = run(run_plan([
+        _timed_call("summary", spans, depends_on=("before", "after")),
+        _timed_call("before", spans),
+        _timed_call("after", spans),
+    ]))
+
+    assert spans["summary"][0] >= max(spans["before"][1], spans["after"][1])
+    assert results["summary"]["deps"] == ["after", "before"]
+    # The two independent calls still overlapped
+    assert spans["before"][0] < spans["after"][1] and spans["after"][0] < spans["before"][1]
+
+
+def test_an_unknown_dependency_is_rejected(run):
+    with pytest.raises(ValueError, match="missing"):
+        run(run_plan([_timed_call("a", {}, depends_on=("missing",))]))
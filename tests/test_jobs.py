@@ -0,0 +1,106 @@
+"""JobQueue: leasing, takeover of abandoned jobs, and idempotent reruns."""
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from jobs import JobQueue
+from models import Job
+
+
+def _generated(calls: list):
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(200, json={
+            "choices": [{"message": {"content": "generated"}}],
+            "usage": {"prompt_tokens": 900, "completion_tokens": 400, "total_tokens": 1300}
+        })
+    return handler
+
+
+@pytest.fixture
+def make_queue(make_game, monkeypatch):
+    def make(handler, node_id: str = "node-a", lease: float = 60.0) -> JobQueue:
+        monkeypatch.setenv("NODE_ID", node_id)
+        monkeypatch.setenv("JOB_LEASE", str(lease))
+        game = make_game(handler)
+        return JobQueue(game.db, game)
+    return make
+
+
+async def _finished(queue: JobQueue, job_id: str, timeout: float = 5.0) -> Job:
+    deadline = time.monotonic() + timeout
+    while True:
+        job = await queue.get(job_id)
+        if job.status in (Job.SUCCEEDED, Job.FAILED):
+            return job
+        assert time.monotonic() < deadline, f"job {job_id} still {job.status}"
+        await asyncio.sleep(0.01)
+
+
+async def _start_until_finished(queue: JobQueue, job_id: str) -> Job:
+    """Start the queue (claiming whatever it may) and stop it once ``job_id`` is finished."""
+    await queue.start()
+    try:
+        return await _finished(queue, job_id)
+    finally:
+        await queue.stop()
+
+
+def test_a_submitted_job_runs_the_transition(make_queue, run):
+    calls = []
+    queue = make_queue(_generated(calls))
+
+    async def scenario():
+        await queue.start()
+        try:
+            job = await queue.submit("s1", "continue", {})
+            return await _finished(queue, job.job_id)
+        finally:
+            await queue.stop()
+    job = run(scenario())
+
+    assert (job.status, job.status_code) == (Job.SUCCEEDED, 200)
+    assert job.result["next_state"] == "chapter_after"
+    assert job.result["data"]["after_narrative"] == "generated"
+    assert len(calls) == 2
+
+
+def test_start_resumes_own_jobs_but_not_a_live_node_s(make_queue, db, run):
+    queue = make_queue(_generated([]))
+    run(db.create_job("mine", "s1", "continue", {}, owner="node-a"))
+    run(db.create_job("theirs", "s1", "continue", {}, owner="node-b"))
+
+    assert run(_start_until_finished(queue, "mine")).status == Job.SUCCEEDED
+
+    assert run(db.get_job("theirs")).status == Job.QUEUED
+    assert queue.claimed == 1
+
+
+def test_a_job_whose_lease_lapsed_is_taken_over(make_queue, db, run):
+    queue = make_queue(_generated([]), lease=0.05)
+    run(db.create_job("orphan", "s1", "continue", {}, owner="dead-node"))
+    time.sleep(0.1)
+
+    assert run(_start_until_finished(queue, "orphan")).status == Job.SUCCEEDED
+    assert queue.claimed == 1
+
+
+def test_rerunning_a_committed_job_replays_its_transition(make_queue, db, run):
+    calls = []
+    queue = make_queue(_generated(calls), lease=0.05)
+    # A node committed the job's transition, then died before recording the result
+    run(db.create_job("j1", "s1", "continue", {}, owner="dead-node"))
+    run(db.update_job("j1", Job.RUNNING))
+    committed = run(queue.game.transition("s1", "continue", {}, idempotency_key="j1"))
+    log = run(db.get_cost_log("s1"))
+    time.sleep(0.1)
+
+    job = run(_start_until_finished(queue, "j1"))
+
+    assert job.status == Job.SUCCEEDED
+    assert job.result == {**committed, "replayed": True}
+    assert len(calls) == 2
+    assert run(db.get_cost_log("s1")) == log
+    assert run(db.get_session("s1")).state == "chapter_after"
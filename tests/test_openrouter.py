@@ -0,0 +1,321 @@
+"""OpenRouterClient behaviour against a mock upstream (httpx.MockTransport)."""
+import asyncio
+
+import httpx
+import pytest
+
+import openrouter
+from models import calculate_cost
+from openrouter import CircuitBreaker, CircuitOpenError, OpenRouterClient, RateGovernor
+
+MODEL = "anthropic/claude-3-haiku"
+USAGE = {"prompt_tokens": 900, "completion_tokens": 400, "total_tokens": 1300}
+MESSAGES = [{"role": "user", "content": "Who am I?"}]
+
+
+class FakeClock:
+    """Stands in for the ``time`` module inside openrouter; advances only when told."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(openrouter, "time", fake)
+    return fake
+
+
+def _completion(content: str = "ok") -> httpx.Response:
+    return httpx.Response(200, json={"choices": [{"message": {"content": content}}], "usage": USAGE})
+
+
+def _slow_upstream(calls: list, delay: float = 0.05):
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        await asyncio.sleep(delay)
+        return _completion()
+    return handler
+
+
+# Request coalescing
+
+@pytest.mark.parametrize("mode", ["zero", "shared"])
+def test_identical_concurrent_requests_share_one_upstream_call(make_client, run, mode):
+    calls = []
+    client = make_client(_slow_upstream(calls), OPENROUTER_COALESCED_COST=mode)
+
+    async def scenario():
+        return await asyncio.gather(*(
+            client.chat_completion(MESSAGES, temperature=0.0, model=MODEL) for _ in range(5)
+        ))
+    responses = run(scenario())
+
+    assert len(calls) == 1
+    assert client.coalesced_requests == 4
+    assert [r["shared_by"] for r in responses] == [5] * 5
+    assert sum(r["cost"] for r in responses) == pytest.approx(calculate_cost(USAGE, MODEL))
+    if mode == "zero":
+        assert sorted(r["cost"] > 0 for r in responses) == [False] * 4 + [True]
+
+
+@pytest.mark.parametrize("mode", ["zero", "shared"])
+def test_cancelled_waiters_take_no_share_of_the_cost(make_client, run, mode):
+    calls = []
+    client = make_client(_slow_upstream(calls), OPENROUTER_COALESCED_COST=mode)
+
+    async def scenario():
+        tasks = [asyncio.create_task(client.chat_completion(MESSAGES, temperature=0.0, model=MODEL))
+                 for _ in range(4)]
+        await asyncio.sleep(0.01)
+        # The leader's caller and one joiner give up; the call carries on for the rest
+        tasks[0].cancel()
+        tasks[2].cancel()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        return [r for r in results if not isinstance(r, BaseException)]
+    responses = run(scenario())
+
+    assert len(calls) == 1
+    assert len(responses) == 2
+    assert [r["shared_by"] for r in responses] == [2, 2]
+    assert sum(r["cost"] for r in responses) == pytest.approx(calculate_cost(USAGE, MODEL))
+
+
+def test_requests_above_the_coalescing_temperature_are_not_shared(make_client, run):
+    calls = []
+    client = make_client(_slow_upstream(calls))
+
+    async def scenario():
+        return await asyncio.gather(*(
+            client.chat_completion(MESSAGES, temperature=0.9, model=MODEL) for _ in range(3)
+        ))
+    responses = run(scenario())
+
+    assert len(calls) == 3
+    assert all(r["cost"] == pytest.approx(calculate_cost(USAGE, MODEL)) for r in responses)
+
+
+# Rate governor
+
+def _governor(rpm: int = 0, tpm: int = 0, limit: int = 8, max_limit: int = 64) -> RateGovernor:
+    return RateGovernor(rpm, tpm, limit, max_limit, latency_target=10.0)
+
+
+def test_request_bucket_admits_rpm_then_waits_for_refill(clock):
+    governor = _governor(rpm=2)
+
+    assert governor._admit(0) == 0
+    assert governor._admit(0) == 0
+    assert governor._admit(0) == pytest.approx(30.0)
+
+    clock.advance(30.0)
+    assert governor._admit(0) == 0
+
+
+def test_token_bucket_reserves_estimates_and_settles_usage(clock):
+    governor = _governor(tpm=1000)
+
+    assert governor._admit(800) == 0
+    assert governor._admit(400) == pytest.approx(12.0)
+
+    # The call used 300 of its 800 reserved tokens; the rest go back
+    governor.release(800, latency=1.0, used_tokens=300)
+    assert governor._admit(400) == 0
+
+
+def test_concurrency_limit_grows_additively_and_shrinks_multiplicatively(clock):
+    governor = _governor(limit=2)
+
+    assert governor._admit(0) == 0
+    assert governor._admit(0) == 0
+    assert governor._admit(0) is None
+
+    governor.release(0, latency=1.0)
+    assert governor.limit == pytest.approx(2.5)
+    governor.release(0, latency=20.0)
+    assert governor.limit == pytest.approx(2.25)
+
+    governor.limit = 8.0
+    governor.release(0, throttled=True)
+    assert governor.limit == pytest.approx(4.0)
+
+
+def test_retry_after_pauses_admission_and_halves_once_per_window(clock):
+    governor = _governor(limit=8)
+    for _ in range(3):
+        assert governor._admit(0) == 0
+
+    governor.release(0, throttled=True, retry_after=5.0)
+    governor.release(0, throttled=True, retry_after=5.0)
+    assert governor.limit == pytest.approx(4.0)
+    assert governor.blocked()
+    assert governor._admit(0) == pytest.approx(5.0)
+
+    clock.advance(5.0)
+    assert not governor.blocked()
+    assert governor._admit(0) == 0
+
+
+def test_a_429_is_retried_after_its_retry_after(make_client, run):
+    sent = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        sent.append(asyncio.get_running_loop().time())
+        if len(sent) == 1:
+            return httpx.Response(429, headers={"Retry-After": "0.2"})
+        return _completion()
+
+    client = make_client(handler)
+    response = run(client.chat_completion(MESSAGES, model=MODEL))
+
+    assert response["content"] == "ok"
+    assert len(sent) == 2
+    assert sent[1] - sent[0] >= 0.2
+    stats = client.governor(MODEL).stats()
+    assert stats["throttled"] == 1
+    assert stats["concurrency_limit"] == pytest.approx(4.25)
+
+
+# Hedging
+
+def test_a_slow_call_is_hedged_and_the_loser_billed_an_estimate(make_client, run):
+    sent = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        sent.append(request)
+        # The primary stalls; the hedge answers at once
+        await asyncio.sleep(5.0 if len(sent) == 1 else 0.0)
+        return _completion("hedge")
+
+    client = make_client(handler, OPENROUTER_HEDGE=1, OPENROUTER_HEDGE_DELAY=0.05)
+    response = run(client.chat_completion(MESSAGES, temperature=0.9, model=MODEL))
+
+    assert response["content"] == "hedge"
+    assert response["hedged"] is True
+    assert (client.hedges_fired, client.hedge_wins) == (1, 1)
+    [loser] = response["extra_costs"]
+    assert loser["estimated"] is True
+    assert loser["model"] == MODEL
+    assert loser["usage"]["completion_tokens"] == 0
+    assert loser["cost"] == pytest.approx(calculate_cost(loser["usage"], MODEL))
+
+
+def test_no_hedge_fires_while_the_governor_waits_out_a_retry_after(make_client, run):
+    sent = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        sent.append(request)
+        if len(sent) == 1:
+            return httpx.Response(429, headers={"Retry-After": "0.3"})
+        return _completion()
+
+    client = make_client(handler, OPENROUTER_HEDGE=1, OPENROUTER_HEDGE_DELAY=0.05)
+    response = run(client.chat_completion(MESSAGES, temperature=0.9, model=MODEL))
+
+    # The budget ran out during the Retry-After; the only retry is the primary's
+    assert response["content"] == "ok"
+    assert "hedged" not in response
+    assert client.hedges_fired == 0
+    assert len(sent) == 2
+
+
+# Circuit breaker
+
+def test_breaker_opens_after_consecutive_failures_and_fails_fast(clock):
+    breaker = CircuitBreaker(MODEL, failure_threshold=3, cooldown=30.0, half_open_probes=1)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.on_failure()
+    breaker.before_call()
+    breaker.on_success()
+    assert breaker.failures == 0
+
+    for _ in range(3):
+        breaker.before_call()
+        breaker.on_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    clock.advance(10.0)
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.before_call()
+    assert error.value.retry_after == pytest.approx(20.0)
+    assert breaker.rejected == 1
+
+
+def test_half_open_probe_closes_on_success_and_reopens_on_failure(clock):
+    breaker = CircuitBreaker(MODEL, failure_threshold=1, cooldown=30.0, half_open_probes=1)
+    breaker.before_call()
+    breaker.on_failure()
+
+    clock.advance(30.0)
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Only one probe at a time
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.on_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    clock.advance(30.0)
+    breaker.before_call()
+    breaker.on_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call()
+
+
+def test_an_abandoned_probe_frees_its_slot(clock):
+    breaker = CircuitBreaker(MODEL, failure_threshold=1, cooldown=30.0, half_open_probes=1)
+    breaker.before_call()
+    breaker.on_failure()
+    clock.advance(30.0)
+
+    breaker.before_call()
+    breaker.on_abandon()
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def _half_open(client: OpenRouterClient) -> CircuitBreaker:
+    breaker = client.breaker(MODEL)
+    breaker.state = CircuitBreaker.HALF_OPEN
+    breaker.probes = 0
+    return breaker
+
+
+def test_a_client_error_neither_opens_nor_closes_the_circuit(make_client, run):
+    client = make_client(lambda request: httpx.Response(400, json={"error": "bad request"}))
+    breaker = _half_open(client)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        run(client.chat_completion(MESSAGES, model=MODEL))
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.probes == 0
+
+
+def test_a_throttled_probe_is_abandoned_and_its_retry_closes_the_circuit(make_client, run):
+    sent = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        sent.append(request)
+        if len(sent) == 1:
+            return httpx.Response(429, headers={"Retry-After": "0.01"})
+        return _completion()
+
+    client = make_client(handler)
+    breaker = _half_open(client)
+    run(client.chat_completion(MESSAGES, model=MODEL))
+
+    assert len(sent) == 2
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.failures == 0
@@ -0,0 +1,106 @@
+"""SessionCache: what it caches, when it lets go, and reads racing writes."""
+import asyncio
+
+import pytest
+
+from database import SessionConflictError
+from models import Character, CostEntry
+from session_cache import SessionCache
+
+
+def _character() -> Character:
+    return Character(name="Ada", order="atelier", archetype="Maker", backstory={}, current_chapter=1)
+
+
+def _cost(cost: float) -> CostEntry:
+    return CostEntry("chapter_after", 100, 50, cost, "anthropic/claude-3-haiku", timestamp=None)
+
+
+@pytest.fixture
+def cache(db):
+    return SessionCache(db)
+
+
+def test_probing_unknown_sessions_caches_nothing(cache, run):
+    for session_id in ("nope-1", "nope-2"):
+        assert run(cache.get_session(session_id)) is None
+        assert run(cache.get_character(session_id)) is None
+        assert run(cache.get_total_cost(session_id)) == 0.0
+
+    assert cache.stats()["entries"] == 0
+
+
+def test_reads_are_served_from_memory_until_the_session_is_deleted(cache, run):
+    run(cache.create_session("s1", "welcome", {"current_chapter": 1}))
+    assert run(cache.get_character("s1")) is None
+    assert run(cache.get_total_cost("s1")) == 0.0
+    assert (cache.hits, cache.misses) == (2, 0)
+
+    run(cache.delete_session("s1"))
+    assert cache.stats()["entries"] == 0
+    assert run(cache.get_session("s1")) is None
+
+
+def test_a_stale_entry_fails_its_commit_and_is_dropped(cache, db, run):
+    run(cache.create_session("s1", "welcome", {}))
+
+    # Another node moves the session on behind this cache's back
+    async def elsewhere():
+        async with db.unit_of_work("s1") as uow:
+            uow.update_session("greatness_mirror", {"moved": True})
+    run(elsewhere())
+
+    async def transition():
+        async with cache.unit_of_work("s1") as uow:
+            assert uow.session.state == "welcome"
+            uow.update_session("greatness_mirror", {})
+    with pytest.raises(SessionConflictError):
+        run(transition())
+
+    assert cache.stats()["entries"] == 0
+    assert run(cache.get_session("s1")).data == {"moved": True}
+
+
+def test_a_read_that_raced_a_write_is_not_cached(cache, db, run):
+    run(db.create_session("s1", "welcome", {}))
+    read_done = asyncio.Event()
+    release = asyncio.Event()
+    get_session = db.get_session
+
+    async def slow_get_session(session_id):
+        session = await get_session(session_id)
+        read_done.set()
+        await release.wait()
+        return session
+    db.get_session = slow_get_session
+
+    async def scenario():
+        reader = asyncio.create_task(cache.get_session("s1"))
+        await read_done.wait()
+        await cache.update_session("s1", "greatness_mirror", {})
+        release.set()
+        stale = await reader
+        db.get_session = get_session
+        return stale, await cache.get_session("s1")
+    stale, fresh = run(scenario())
+
+    assert stale.state == "welcome"
+    assert fresh.state == "greatness_mirror"
+    assert cache.hits == 0
+
+
+def test_commit_adds_its_cost_to_cost_logged_meanwhile(cache, db, run):
+    run(cache.create_session("s1", "chapter_before", {}))
+    run(cache.save_character("s1", _character()))
+
+    async def transition():
+        async with cache.unit_of_work("s1") as uow:
+            # A speculative generation logs its cost while this transition runs
+            await cache.insert_cost_log("s1", "chapter_after:speculative", 100, 50, 0.5,
+                                        "anthropic/claude-3-haiku")
+            uow.add_cost(_cost(0.25))
+            uow.update_session("chapter_after", {})
+    run(transition())
+
+    assert run(cache.get_total_cost("s1")) == pytest.approx(0.75)
+    assert run(db.get_total_cost("s1")) == pytest.approx(0.75)
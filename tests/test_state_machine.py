@@ -0,0 +1,96 @@
+"""GameStateMachine transitions over SQLite and a mock upstream."""
+import asyncio
+import json
+
+import httpx
+import pytest
+
+def _sse(*chunks: dict) -> bytes:
+    return b"".join(f"data: {json.dumps(chunk)}\n\n".encode() for chunk in chunks)
+
+
+def _text_chunk(text: str) -> dict:
+    return {"choices": [{"delta": {"content": text}}]}
+
+
+def _generated(calls: list):
+    """An upstream that answers every non-streaming call with "generated"."""
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(200, json={
+            "choices": [{"message": {"content": "generated"}}],
+            "usage": {"prompt_tokens": 900, "completion_tokens": 400, "total_tokens": 1300}
+        })
+    return handler
+
+
+def test_a_stalled_stream_is_reset_billed_and_replaced_by_the_fallback(make_game, db, run):
+    def handler(request: httpx.Request) -> httpx.Response:
+        async def body():
+            yield _sse(_text_chunk("Once upon a time"))
+            # Nothing more arrives within the budget
+            await asyncio.sleep(30)
+        return httpx.Response(200, content=body())
+
+    game = make_game(handler)
+    game.generation_budget = 0.2
+    events = []
+
+    async def on_delta(field, text):
+        events.append((field, text))
+
+    result = run(game.transition("s1", "continue", {}, on_delta=on_delta))
+
+    expected = game.fallback.chapter_after(run(db.get_character("s1")))
+    assert result["data"]["after_narrative"] == expected["after_narrative"]["narrative"]
+    assert result["data"]["transformation_insight"] == expected["transformation_insight"]["narrative"]
+    assert game.fallbacks_used == 1
+
+    # The streamed text is withdrawn before the fallback goes out
+    fields = {"after_narrative", "transformation_insight"}
+    assert {event for event in events[:2]} == {(field, "Once upon a time") for field in fields}
+    assert {event for event in events[2:]} == {(field, None) for field in fields}
+
+    # Both cancelled calls were sent, so both are billed at an estimate
+    log = run(db.get_cost_log("s1"))
+    assert [entry.state for entry in log] == ["chapter_after", "chapter_after"]
+    assert all(entry.completion_tokens == len("Once upon a time") // 4 for entry in log)
+    assert all(entry.prompt_tokens > 0 and entry.cost_usd > 0 for entry in log)
+    assert result["session"]["total_cost"] == pytest.approx(sum(entry.cost_usd for entry in log))
+
+
+def test_a_hung_speculation_gets_the_budget_then_the_transition_generates(make_game, db, run):
+    game = make_game(_generated([]))
+    game.speculative = True
+    game.generation_budget = 0.2
+
+    async def scenario():
+        speculation = asyncio.create_task(asyncio.sleep(30))
+        game._speculations[("s1", "chapter_after", 1)] = speculation
+        result = await game.transition("s1", "continue", {})
+        # The wait was shielded: the speculation is left to finish on its own
+        assert not speculation.done()
+        # (as is the next chapter's, which this transition started)
+        for task in list(game._speculations.values()):
+            task.cancel()
+        return result
+    result = run(scenario())
+
+    assert result["data"]["after_narrative"] == "generated"
+    assert result["data"]["transformation_insight"] == "generated"
+    assert game.fallbacks_used == 0
+    assert [entry.state for entry in run(db.get_cost_log("s1"))] == ["chapter_after", "chapter_after"]
+
+
+def test_a_repeated_idempotency_key_replays_without_generating_again(make_game, db, run):
+    calls = []
+    game = make_game(_generated(calls))
+    first = run(game.transition("s1", "continue", {}, idempotency_key="key-1"))
+    log = run(db.get_cost_log("s1"))
+    second = run(game.transition("s1", "continue", {}, idempotency_key="key-1"))
+
+    assert len(calls) == 2  # the after narrative and the insight, once
+    assert run(db.get_cost_log("s1")) == log
+    assert second.pop("replayed") is True
+    assert second == first
+    assert run(db.get_session("s1")).state == "chapter_after"
@@ -0,0 +1,239 @@
+"""Storage contract: every backend behaves the same for the game's operations."""
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from database import SessionConflictError
+from models import Character, CostEntry, Job, TimelineEvent
+
+
+def _character(chapter: int = 1) -> Character:
+    return Character(
+        name="Ada",
+        order="atelier",
+        archetype="Maker",
+        backstory={"situation": "starting out", "struggle": "doubt"},
+        current_chapter=chapter
+    )
+
+
+def _cost(state: str, cost: float, model: str = "anthropic/claude-3-haiku") -> CostEntry:
+    return CostEntry(state, 100, 50, cost, model, timestamp=None)
+
+
+def test_create_and_get_session(storage, run):
+    created = run(storage.create_session("s1", "welcome", {"current_chapter": 1}))
+    session = run(storage.get_session("s1"))
+
+    assert session.state == "welcome"
+    assert session.data == {"current_chapter": 1}
+    assert session.created_at == created.created_at
+    assert run(storage.get_session("missing")) is None
+
+
+def test_unit_of_work_commits_every_write(storage, run):
+    run(storage.create_session("s1", "chapter_before", {"current_chapter": 1, "before_narrative": "b"}))
+
+    async def transition():
+        async with storage.unit_of_work("s1") as uow:
+            assert uow.session.state == "chapter_before"
+            assert uow.character is None
+            uow.add_cost(_cost("chapter_after", 0.002))
+            uow.add_cost(_cost("chapter_after", 0.001, model="meta-llama/llama-3.1-8b-instruct"))
+            uow.add_timeline_event(TimelineEvent(chapter=1, narrative="after", transformation="insight"))
+            uow.save_character(_character())
+            uow.update_session("chapter_after", {**uow.session.data, "after_narrative": "a"},
+                               delta={"after_narrative": "a"})
+            uow.record_response("key-1", {"success": True, "next_state": "chapter_after"})
+    run(transition())
+
+    session = run(storage.get_session("s1"))
+    assert session.state == "chapter_after"
+    assert session.data == {"current_chapter": 1, "before_narrative": "b", "after_narrative": "a"}
+    assert run(storage.get_character("s1")) == _character()
+    assert [e.narrative for e in run(storage.get_timeline("s1"))] == ["after"]
+    assert run(storage.get_total_cost("s1")) == pytest.approx(0.003)
+    assert run(storage.get_idempotent_response("s1", "key-1")) == {
+        "success": True, "next_state": "chapter_after"
+    }
+
+    summary = run(storage.get_cost_summary("s1"))
+    assert summary["num_api_calls"] == 2
+    assert summary["prompt_tokens"] == 200
+    assert summary["completion_tokens"] == 100
+    assert summary["cost_by_state"] == {"chapter_after": pytest.approx(0.003)}
+    assert summary["cost_by_model"] == {
+        "anthropic/claude-3-haiku": pytest.approx(0.002),
+        "meta-llama/llama-3.1-8b-instruct": pytest.approx(0.001)
+    }
+
+
+def test_unit_of_work_writes_nothing_when_the_block_raises(storage, run):
+    run(storage.create_session("s1", "welcome", {}))
+
+    async def failing_transition():
+        async with storage.unit_of_work("s1") as uow:
+            uow.add_cost(_cost("greatness_mirror", 0.01))
+            uow.update_session("greatness_mirror", {"ready": True})
+            raise RuntimeError("generation failed")
+    with pytest.raises(RuntimeError):
+        run(failing_transition())
+
+    assert run(storage.get_session("s1")).state == "welcome"
+    assert run(storage.get_total_cost("s1")) == 0.0
+
+
+def test_committing_to_a_deleted_session_raises_and_rolls_back(storage, run):
+    run(storage.create_session("s1", "welcome", {}))
+    uow = run(storage.load_work("s1"))
+    run(storage.delete_session("s1"))
+
+    uow.add_cost(_cost("greatness_mirror", 0.01))
+    uow.update_session("greatness_mirror", {"ready": True})
+    with pytest.raises(ValueError):
+        run(storage.commit_work(uow))
+
+    assert run(storage.get_session("s1")) is None
+    assert run(storage.get_cost_log("s1")) == []
+
+
+def test_concurrent_commits_to_one_session_conflict(storage, run):
+    run(storage.create_session("s1", "chapter_before", {"current_chapter": 1}))
+    first, second = run(storage.load_work("s1")), run(storage.load_work("s1"))
+    for uow, text in ((first, "first"), (second, "second")):
+        uow.add_cost(_cost("chapter_after", 0.01))
+        uow.update_session("chapter_after", {"after_narrative": text}, delta={"after_narrative": text})
+
+    async def both():
+        return await asyncio.gather(storage.commit_work(first), storage.commit_work(second),
+                                    return_exceptions=True)
+    outcomes = run(both())
+
+    # Exactly one wins, whichever reached the database first
+    assert sorted(type(outcome).__name__ for outcome in outcomes) == ["NoneType", "SessionConflictError"]
+    winner = "first" if outcomes[0] is None else "second"
+    assert run(storage.get_session("s1")).data["after_narrative"] == winner
+    assert run(storage.get_total_cost("s1")) == pytest.approx(0.01)
+    assert len(run(storage.get_session_history("s1"))) == 2
+
+    # A unit of work loaded after the commit goes through
+    third = run(storage.load_work("s1"))
+    third.update_session("chapter_before", {"current_chapter": 2}, delta={"current_chapter": 2})
+    run(storage.commit_work(third))
+    assert run(storage.get_session("s1")).state == "chapter_before"
+
+
+def test_a_stored_idempotency_key_fails_a_second_commit(storage, run):
+    run(storage.create_session("s1", "welcome", {}))
+    for response in ({"attempt": 1}, {"attempt": 2}):
+        uow = run(storage.load_work("s1"))
+        uow.add_cost(_cost("greatness_mirror", 0.01))
+        uow.update_session("greatness_mirror", response)
+        uow.record_response("key-1", response)
+        if response["attempt"] == 1:
+            run(storage.commit_work(uow))
+        else:
+            with pytest.raises(SessionConflictError):
+                run(storage.commit_work(uow))
+
+    assert run(storage.get_idempotent_response("s1", "key-1")) == {"attempt": 1}
+    assert run(storage.get_session("s1")).data == {"attempt": 1}
+    assert run(storage.get_total_cost("s1")) == pytest.approx(0.01)
+
+
+def test_session_data_replays_from_snapshots_and_deltas(storage, run):
+    run(storage.create_session("s1", "welcome", {"current_chapter": 1}))
+    for step in range(20):
+        async def transition():
+            async with storage.unit_of_work("s1") as uow:
+                uow.update_session("chapter_before", {**uow.session.data, f"k{step}": step},
+                                   delta={f"k{step}": step})
+        run(transition())
+
+    session = run(storage.get_session("s1"))
+    assert session.data == {"current_chapter": 1, **{f"k{i}": i for i in range(20)}}
+    assert [event.seq for event in run(storage.get_session_history("s1"))] == list(range(21))
+
+    # A full update without a delta replaces the data outright
+    run(storage.update_session("s1", "completion", {"current_chapter": 8}))
+    assert run(storage.get_session("s1")).data == {"current_chapter": 8}
+
+
+def test_delete_session_removes_its_rows(storage, run):
+    run(storage.create_session("s1", "welcome", {}))
+    run(storage.create_session("s2", "welcome", {}))
+    run(storage.insert_cost_log("s1", "greatness_mirror", 10, 5, 0.01, "anthropic/claude-3-haiku"))
+    run(storage.save_character("s1", _character()))
+    run(storage.add_timeline_event("s1", TimelineEvent(chapter=1, narrative="n", transformation="t")))
+    run(storage.save_pending_result("s1", "chapter_after", 1, {"after_narrative": {}}))
+
+    run(storage.delete_session("s1"))
+
+    assert run(storage.get_session("s1")) is None
+    assert run(storage.get_character("s1")) is None
+    assert run(storage.get_timeline("s1")) == []
+    assert run(storage.get_total_cost("s1")) == 0.0
+    assert run(storage.get_pending_result("s1", "chapter_after", 1)) is None
+    assert run(storage.get_session("s2")) is not None
+
+
+def test_pending_results_and_mirror_caches(storage, run):
+    run(storage.create_session("s1", "chapter_before", {}))
+    run(storage.save_pending_result("s1", "chapter_after", 1, {"after_narrative": {"narrative": "x"}}))
+    assert run(storage.get_pending_result("s1", "chapter_after", 1)) == {
+        "after_narrative": {"narrative": "x"}
+    }
+    assert run(storage.get_pending_result("s1", "chapter_after", 2)) is None
+
+    analysis = {"order": "zen", "archetypes": ["Sage"], "explanation": "e", "traits": []}
+    run(storage.put_mirror_cache("v1:m:ada", analysis, max_entries=10))
+    cached, created_at = run(storage.get_mirror_cache("v1:m:ada", 0.0))
+    assert cached == analysis
+    assert run(storage.get_mirror_cache("v1:m:ada", created_at + 1)) is None
+
+    run(storage.put_mirror_precomputed([("ada lovelace", 1, "Ada Lovelace", "m", analysis)]))
+    assert run(storage.get_mirror_precomputed("ada lovelace", 1, "m")) == analysis
+    assert run(storage.get_mirror_precomputed("ada lovelace", 1, "other")) is None
+    assert run(storage.get_mirror_precomputed_keys(1, "m")) == ["ada lovelace"]
+    assert run(storage.get_mirror_precomputed_keys(1, "other")) == []
+
+
+def test_jobs_are_leased_to_their_node(storage, run):
+    job = run(storage.create_job("j1", "s1", "continue", {"x": 1}, owner="node-a"))
+    assert job.status == Job.QUEUED
+    now = time.time()
+
+    # Another node can't take a job whose lease is fresh
+    assert run(storage.claim_jobs("node-b", stale_before=now - 60)) == []
+    # Its own node takes it back after a restart
+    assert [j.job_id for j in run(storage.claim_jobs("node-a", stale_before=now - 60))] == ["j1"]
+    # Once the lease lapses, any node may claim it
+    claimed = run(storage.claim_jobs("node-b", stale_before=time.time() + 1))
+    assert [(j.job_id, j.input_data) for j in claimed] == [("j1", {"x": 1})]
+    assert run(storage.claim_jobs("node-a", stale_before=now - 60)) == []
+
+    run(storage.update_job("j1", Job.SUCCEEDED, result={"success": True}, status_code=200))
+    finished = run(storage.get_job("j1"))
+    assert (finished.status, finished.result, finished.status_code) == (
+        Job.SUCCEEDED, {"success": True}, 200
+    )
+    assert run(storage.claim_jobs("node-b", stale_before=time.time() + 1)) == []
+
+
+def test_expire_and_archive_idle_sessions(storage, run):
+    run(storage.create_session("idle", "chapter_before", {}))
+    run(storage.create_session("done", "sales_page", {"sales_page": {"headline": "h"}}))
+    run(storage.insert_cost_log("done", "sales_page", 10, 5, 0.02, "anthropic/claude-3-haiku"))
+    later = (datetime.utcnow() + timedelta(seconds=1)).isoformat()
+
+    archived, _ = run(storage.archive_sessions("sales_page", later, limit=10))
+    expired, _ = run(storage.expire_sessions(later, "sales_page", limit=10))
+
+    assert archived == ["done"]
+    assert expired == ["idle"]
+    assert run(storage.get_session("done")) is None
+    archive = run(storage.get_archived_session("done"))
+    assert archive["sessions"][0]["state"] == "sales_page"
+    assert archive["session_costs"][0]["total_cost_usd"] == pytest.approx(0.02)
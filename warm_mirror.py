@@ -0,0 +1,104 @@
+"""Pre-warm Greatness Mirror analyses for popular admired persons.
+
+Usage:
+    python warm_mirror.py names.txt
+    cat names.txt | python warm_mirror.py - --concurrency 16
+
+Reads one name per line (blank lines and lines starting with '#' are
+skipped), runs the Greatness Mirror prompt for each with bounded
+concurrency and bulk-loads the parsed analyses into mirror_precomputed
+under OPENROUTER_MODEL, which the game consults before calling the LLM.
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+from typing import List
+
+from storage import Storage, create_storage
+from mirror_cache import normalize_person
+from openrouter import OpenRouterClient
+import prompts
+
+
+def read_names(source: str) -> List[str]:
+    """Read names from a file path, or stdin when source is '-'."""
+    stream = sys.stdin if source == "-" else open(source, encoding="utf-8")
+    with stream:
+        lines = [line.strip() for line in stream]
+    return [line for line in lines if line and not line.startswith("#")]
+
+
+async def warm(names: List[str], db: Storage, openrouter: OpenRouterClient,
+               concurrency: int, force: bool) -> int:
+    """Analyze and store names; returns the number of failures."""
+    version = prompts.MIRROR_PROMPT_VERSION
+    # Stored under the requested model, which is what the game looks up
+    model = openrouter.default_model
+
+    # One analysis per normalized name, skipping those already warmed
+    unique = {}
+    for name in names:
+        unique.setdefault(normalize_person(name), name)
+    if not force:
+        for key in await db.get_mirror_precomputed_keys(version, model):
+            unique.pop(key, None)
+
+    print(f"Warming {len(unique)} names with concurrency {concurrency}")
+    semaphore = asyncio.Semaphore(concurrency)
+    rows = []
+    failures = 0
+    total_cost = 0.0
+
+    async def analyze(key: str, name: str):
+        nonlocal failures, total_cost
+        async with semaphore:
+            try:
+                response = await openrouter.analyze_person(
+                    name, prompts.get_greatness_mirror_prompt(name)
+                )
+            except Exception as e:
+                failures += 1
+                print(f"  FAILED {name}: {e}")
+                return
+
+        total_cost += response['cost'] + sum(e['cost'] for e in response['extra_costs'])
+        analysis = {
+            'order': response['order'],
+            'archetypes': response['archetypes'],
+            'explanation': response['explanation'],
+            'traits': response['traits']
+        }
+        rows.append((key, version, name, model, analysis))
+        print(f"  {name}: {analysis['order']}")
+
+    await asyncio.gather(*(analyze(key, name) for key, name in unique.items()))
+
+    if rows:
+        await db.put_mirror_precomputed(rows)
+
+    print(f"Stored {len(rows)} analyses, {failures} failed, cost ${total_cost:.4f}")
+    return failures
+
+
+async def main(args) -> int:
+    names = read_names(args.source)
+    Path(args.db).parent.mkdir(parents=True, exist_ok=True)
+    db = create_storage(args.db)
+    await db.connect()
+    openrouter = OpenRouterClient()
+    try:
+        return await warm(names, db, openrouter, args.concurrency, args.force)
+    finally:
+        await openrouter.aclose()
+        await db.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-warm Greatness Mirror analyses")
+    parser.add_argument("source", help="file with one name per line, or - for stdin")
+    parser.add_argument("--concurrency", type=int, default=8, help="parallel LLM calls (default 8)")
+    parser.add_argument("--db", default="data/game.db", help="SQLite database path when DATABASE_URL is unset (default data/game.db)")
+    parser.add_argument("--force", action="store_true", help="re-analyze names already warmed")
+    failed = asyncio.run(main(parser.parse_args()))
+    sys.exit(1 if failed else 0)